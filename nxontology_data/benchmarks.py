@@ -0,0 +1,466 @@
+"""
+Benchmarks of pipeline hot paths on the MeSH testing fixture
+and synthetic inputs generated by `nxontology_data.synthetic`.
+Run like `poetry run nxontology_data benchmark`.
+"""
+
+import atexit
+import concurrent.futures
+import fnmatch
+import functools
+import http.client
+import json
+import logging
+import random
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import pandas as pd
+import rdflib
+from nxontology import NXOntology
+
+from nxontology_data.cache import get_cache_dir
+from nxontology_data.closure import compute_closure
+from nxontology_data.hgnc.hgnc import HgncGeneGroupNxoLoader
+from nxontology_data.mesh.mesh import MeshLoader
+from nxontology_data.pubchem.classifications import PubchemClassificationApi
+from nxontology_data.serve import LookupServer, OutputIndexes
+from nxontology_data.similarity import SimilarityIndex, compute_similarities
+from nxontology_data.synthetic import (
+    SyntheticShape,
+    create_hgnc_tables,
+    iter_edges,
+    write_mesh_rdf,
+    write_pubchem_hierarchy,
+)
+from nxontology_data.utils import sparql_results_to_df, write_dataframe, write_ontology
+
+logger = logging.getLogger(__name__)
+
+MESH_FIXTURE_DIR = Path(__file__).parent.joinpath("mesh", "tests", "rdf-2020-subset")
+
+
+@dataclass
+class Benchmark:
+    """
+    Named benchmark of func, which is called with the result of setup.
+    setup receives the scale of synthetic inputs and is not timed.
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    setup: Callable[[int], Any]
+    repeat: int = 3
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    seconds: float
+    """Minimum wall time over repeats."""
+    baseline_seconds: float | None = None
+
+    @property
+    def ratio(self) -> float | None:
+        if not self.baseline_seconds:
+            return None
+        return self.seconds / self.baseline_seconds
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def register(
+    name: str, setup: Callable[[int], Any], repeat: int = 3
+) -> Callable[[Callable[[Any], Any]], Callable[[Any], Any]]:
+    """Decorator to register a benchmark function in BENCHMARKS."""
+
+    def decorator(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name!r} already exists.")
+        BENCHMARKS[name] = Benchmark(name=name, func=func, setup=setup, repeat=repeat)
+        return func
+
+    return decorator
+
+
+def get_baseline_path() -> Path:
+    """Default location of benchmark baselines, which are specific to a machine."""
+    return get_cache_dir().joinpath("benchmarks", "baseline.json")
+
+
+# bypass the cache of parsed graphs, such that parsing can be benchmarked
+_read_mesh_rdf_files = MeshLoader._read_mesh_rdf_files.__wrapped__
+
+
+@functools.cache
+def _read_fixture_rdf() -> rdflib.Graph:
+    return _read_mesh_rdf_files(
+        MESH_FIXTURE_DIR.joinpath("vocabulary_1.0.0.ttl").as_posix(),
+        MESH_FIXTURE_DIR.joinpath("mesh2020-subset.nt").as_posix(),
+        None,
+    )
+
+
+@functools.cache
+def _get_fixture_tables() -> tuple[pd.DataFrame, pd.DataFrame]:
+    rdf = _read_fixture_rdf()
+    return MeshLoader.get_identifier_df(rdf), MeshLoader.get_edge_df(rdf)
+
+
+def get_synthetic_shape(scale: int) -> SyntheticShape:
+    return SyntheticShape(n_nodes=scale, n_roots=max(1, scale // 1000))
+
+
+@functools.cache
+def _get_synthetic_dir(scale: int) -> Path:
+    """Directory of synthetic source files, which is removed when the process exits."""
+    tmp_dir = tempfile.TemporaryDirectory()
+    atexit.register(tmp_dir.cleanup)
+    directory = Path(tmp_dir.name)
+    shape = get_synthetic_shape(scale)
+    write_mesh_rdf(directory.joinpath("mesh"), shape)
+    write_pubchem_hierarchy(directory.joinpath("pubchem.json"), shape)
+    return directory
+
+
+@functools.cache
+def _read_synthetic_rdf(scale: int) -> rdflib.Graph:
+    mesh_dir = _get_synthetic_dir(scale).joinpath("mesh")
+    return _read_mesh_rdf_files(
+        mesh_dir.joinpath("vocabulary_1.0.0.ttl").as_posix(),
+        mesh_dir.joinpath("mesh2020.nt").as_posix(),
+        None,
+    )
+
+
+@functools.cache
+def _get_synthetic_tables(scale: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    MeSH-shaped identifier and edge tables for a synthetic ontology of scale nodes,
+    built directly rather than by querying synthetic RDF, which is slow at scale.
+    """
+    shape = get_synthetic_shape(scale)
+    mesh_ids = [f"D{i:09d}" for i in range(shape.n_nodes)]
+    id_df = pd.DataFrame(
+        {
+            "mesh_id": mesh_ids,
+            "mesh_class": "TopicalDescriptor",
+            "mesh_uri": [f"http://id.nlm.nih.gov/mesh/2020/{x}" for x in mesh_ids],
+            "mesh_label": [f"Term {i}" for i in range(shape.n_nodes)],
+            "mesh_date_created": "2000-01-01",
+            "mesh_date_revised": "2020-01-01",
+            "mesh_date_established": "2000-01-01",
+            "mesh_frequency": None,
+            "mesh_description": "Synthetic description " * 5,
+            "mesh_nlm_classification": None,
+            "tree_numbers": [
+                [f"C{i:02d}"] if i < shape.n_roots else [] for i in range(shape.n_nodes)
+            ],
+        }
+    )
+    edge_df = pd.DataFrame(
+        [(mesh_ids[parent], mesh_ids[child]) for parent, child in iter_edges(shape)],
+        columns=["parent_id", "child_id"],
+    ).assign(
+        relationship_type="broaderDescriptor",
+        parent_qualified_id=lambda df: df["parent_id"],
+        parent_qualifier_id=None,
+    )
+    return id_df, edge_df
+
+
+@functools.cache
+def _get_synthetic_nxo(n_nodes: int) -> NXOntology[str]:
+    nxo = MeshLoader.create_nxo_from_tables(*_get_synthetic_tables(n_nodes), "2020")
+    nxo.freeze()
+    return nxo
+
+
+def _fixture_rdf(scale: int) -> rdflib.Graph:
+    return _read_fixture_rdf()
+
+
+def _synthetic_nxo(scale: int) -> NXOntology[str]:
+    return _get_synthetic_nxo(scale)
+
+
+@register("mesh_fixture:parse", setup=lambda scale: None)
+def _parse(_: None) -> None:
+    _read_fixture_rdf.__wrapped__()
+
+
+def _run_query(rdf: rdflib.Graph, query: str) -> None:
+    list(rdf.query(query))
+
+
+def _register_query_benchmarks() -> None:
+    for path in sorted(MESH_FIXTURE_DIR.parent.parent.joinpath("queries").glob("*.rq")):
+        register(f"mesh_fixture:query:{path.stem}", setup=_fixture_rdf)(
+            functools.partial(_run_query, query=path.read_text())
+        )
+
+
+_register_query_benchmarks()
+
+
+@register(
+    "mesh_fixture:sparql_results_to_df",
+    setup=lambda scale: _read_fixture_rdf().query(MeshLoader._get_query("identifiers")),
+)
+def _sparql_results_to_df(results: Any) -> None:
+    sparql_results_to_df(results)
+
+
+@register("mesh_fixture:create_nxo", setup=lambda scale: _get_fixture_tables())
+def _fixture_create_nxo(tables: tuple[pd.DataFrame, pd.DataFrame]) -> None:
+    MeshLoader.create_nxo_from_tables(*tables, year_yyyy="2020")
+
+
+@register("synthetic:create_nxo", setup=_get_synthetic_tables)
+def _synthetic_create_nxo(tables: tuple[pd.DataFrame, pd.DataFrame]) -> None:
+    MeshLoader.create_nxo_from_tables(*tables, year_yyyy="2020")
+
+
+@register("synthetic:descendant_closure", setup=_synthetic_nxo, repeat=1)
+def _descendant_closure(nxo: NXOntology[str]) -> None:
+    # traverse like Node_Info.descendants, which is cached on frozen ontologies
+    for node in nxo.graph:
+        nx.descendants(nxo.graph, node)
+
+
+@register("synthetic:create_topical_descriptor_nxo", setup=_synthetic_nxo)
+def _derived_nxo(nxo: NXOntology[str]) -> None:
+    # descendants are cached on the frozen ontology after the first repeat,
+    # so the minimum time measures building the derived graph
+    MeshLoader.create_topical_descriptor_nxo(nxo)
+
+
+def _similarity_pairs(
+    scale: int,
+) -> tuple[SimilarityIndex, list[str], list[str]]:
+    nxo = _get_synthetic_nxo(scale)
+    rng = random.Random(0)
+    nodes = sorted(nxo.graph)
+    nodes_0 = rng.choices(nodes, k=100_000)
+    nodes_1 = rng.choices(nodes, k=100_000)
+    return SimilarityIndex.from_closure(compute_closure(nxo)), nodes_0, nodes_1
+
+
+@register("synthetic:similarity", setup=_similarity_pairs)
+def _similarity(pairs: tuple[SimilarityIndex, list[str], list[str]]) -> None:
+    compute_similarities(*pairs)
+
+
+@dataclass
+class _ServeLoad:
+    port: int
+    requests: list[bytes]
+    """Bodies of the requests sent by each client."""
+    n_clients: int
+
+
+def _serve_load(scale: int) -> _ServeLoad:
+    """Serve the closure of a synthetic ontology until the process exits."""
+    tmp_dir = tempfile.TemporaryDirectory()
+    atexit.register(tmp_dir.cleanup)
+    output_dir = Path(tmp_dir.name).joinpath("mesh")
+    output_dir.mkdir()
+    nxo = _get_synthetic_nxo(scale)
+    write_ontology(nxo, output_dir, closure=True)
+    server = LookupServer(OutputIndexes.load(output_dir.parent), ("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    atexit.register(server.shutdown)
+    rng = random.Random(0)
+    nodes = sorted(nxo.graph)
+    requests = [
+        json.dumps(
+            {
+                "ontology": nxo.name,
+                "ids": rng.choices(nodes, k=100),
+            }
+        ).encode()
+        for _ in range(25)
+    ]
+    return _ServeLoad(port=server.server_address[1], requests=requests, n_clients=8)
+
+
+def _send_requests(port: int, requests: list[bytes]) -> None:
+    """Send requests on one kept-alive connection."""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    try:
+        for endpoint in ["/ancestors", "/descendants"]:
+            for body in requests:
+                connection.request("POST", endpoint, body=body)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"{endpoint} returned {response.status}")
+    finally:
+        connection.close()
+
+
+@register("synthetic:serve", setup=_serve_load)
+def _serve(load: _ServeLoad) -> None:
+    # concurrent clients sending batches of ancestor and descendant lookups
+    with concurrent.futures.ThreadPoolExecutor(max_workers=load.n_clients) as executor:
+        futures = [
+            executor.submit(_send_requests, load.port, load.requests)
+            for _ in range(load.n_clients)
+        ]
+        for future in futures:
+            future.result()
+
+
+@register("synthetic:write_ontology", setup=_synthetic_nxo, repeat=1)
+def _write_ontology(nxo: NXOntology[str]) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_ontology(nxo, Path(tmp_dir))
+
+
+@register("synthetic:mesh_parse", setup=lambda scale: scale, repeat=1)
+def _synthetic_parse(scale: int) -> None:
+    _read_synthetic_rdf.__wrapped__(scale)
+
+
+@register("synthetic:mesh_query_tables", setup=_read_synthetic_rdf, repeat=1)
+def _synthetic_query_tables(rdf: rdflib.Graph) -> None:
+    MeshLoader.get_identifier_df(rdf)
+    MeshLoader.get_edge_df(rdf)
+
+
+@register(
+    "synthetic:pubchem_create_nxo",
+    setup=lambda scale: _get_synthetic_dir(scale).joinpath("pubchem.json"),
+)
+def _pubchem_create_nxo(path: Path) -> None:
+    PubchemClassificationApi.create_nxo_from_path(path)
+
+
+@register(
+    "synthetic:hgnc_create_nxo",
+    setup=lambda scale: create_hgnc_tables(get_synthetic_shape(scale)),
+    repeat=1,
+)
+def _hgnc_create_nxo(tables: dict[str, pd.DataFrame]) -> None:
+    HgncGeneGroupNxoLoader._create_nxo_from_tables(tables)
+
+
+@register(
+    "synthetic:write_dataframe", setup=lambda scale: _get_synthetic_tables(scale)[0]
+)
+def _write_dataframe(df: pd.DataFrame) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_dataframe(df, Path(tmp_dir).joinpath("df.json.gz"))
+
+
+def run_benchmarks(
+    patterns: list[str] | None = None, scale: int = 10_000
+) -> list[BenchmarkResult]:
+    """
+    Run registered benchmarks whose names match any of patterns (default: all),
+    such as `synthetic:*`, with synthetic inputs of scale nodes.
+    """
+    results = []
+    for benchmark in BENCHMARKS.values():
+        if patterns and not any(
+            fnmatch.fnmatchcase(benchmark.name, pattern) for pattern in patterns
+        ):
+            continue
+        logger.info(f"Running benchmark {benchmark.name}")
+        state = benchmark.setup(scale)
+        seconds = []
+        for _ in range(benchmark.repeat):
+            start = time.perf_counter()
+            benchmark.func(state)
+            seconds.append(time.perf_counter() - start)
+        results.append(BenchmarkResult(benchmark.name, min(seconds)))
+    return results
+
+
+def compare_to_baseline(
+    results: list[BenchmarkResult],
+    baseline: dict[str, float],
+    tolerance: float = 0.25,
+    min_seconds: float = 0.01,
+) -> list[BenchmarkResult]:
+    """
+    Set baseline_seconds on results and return the regressions,
+    which are results slower than their baseline by more than tolerance (a fraction)
+    and by more than min_seconds, to ignore noise in very fast benchmarks.
+    """
+    regressions = []
+    for result in results:
+        result.baseline_seconds = baseline.get(result.name)
+        if result.baseline_seconds is None:
+            continue
+        slowdown = result.seconds - result.baseline_seconds
+        if slowdown > tolerance * result.baseline_seconds and slowdown > min_seconds:
+            regressions.append(result)
+    return regressions
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    """Format benchmark results and their ratio to the baseline as a text table."""
+    name_width = max([len("benchmark"), *(len(result.name) for result in results)])
+    lines = [
+        f"{'benchmark':<{name_width}}  {'seconds':>9}  {'baseline':>9}  {'ratio':>6}"
+    ]
+    for result in results:
+        baseline = (
+            "" if result.baseline_seconds is None else f"{result.baseline_seconds:.4f}"
+        )
+        ratio = "" if result.ratio is None else f"{result.ratio:.2f}"
+        lines.append(
+            f"{result.name:<{name_width}}  {result.seconds:>9.4f}  {baseline:>9}  {ratio:>6}"
+        )
+    return "\n".join(lines)
+
+
+def run_benchmark_command(
+    patterns: str | list[str] | None = None,
+    scale: int = 10_000,
+    baseline: str | None = None,
+    save_baseline: bool = False,
+    tolerance: float = 0.25,
+) -> None:
+    """
+    Run benchmarks and compare them to a baseline from a previous run on this machine.
+    patterns: comma-separated benchmark names or glob patterns (default: all).
+    scale: number of nodes in synthetic inputs. Baselines are only compared at the same scale.
+    baseline: path of the baseline JSON (default: in the cache directory).
+    save_baseline: write the results as the new baseline.
+    tolerance: fractional slowdown relative to the baseline that fails the check.
+    """
+    if isinstance(patterns, str):
+        patterns = patterns.split(",")
+    baseline_path = Path(baseline) if baseline else get_baseline_path()
+    results = run_benchmarks(patterns, scale=scale)
+    baseline_data: dict[str, Any] = {}
+    if baseline_path.exists():
+        baseline_data = json.loads(baseline_path.read_text())
+    if baseline_data.get("scale") != scale:
+        baseline_data = {}
+    regressions = compare_to_baseline(
+        results, baseline_data.get("seconds", {}), tolerance=tolerance
+    )
+    print(format_results(results))
+    if save_baseline:
+        seconds = baseline_data.get("seconds", {})
+        seconds.update({result.name: result.seconds for result in results})
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(
+            json.dumps({"scale": scale, "seconds": seconds}, indent=2) + "\n"
+        )
+        logger.info(f"Wrote benchmark baseline to {baseline_path}")
+    elif regressions:
+        raise RuntimeError(
+            f"Benchmarks slower than baseline by more than {tolerance:.0%}: "
+            + ", ".join(result.name for result in regressions)
+        )
@@ -0,0 +1,343 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import requests
+import urllib3
+
+from nxontology_data.utils import REQUEST_TIMEOUT, get_requests_session
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineCacheMiss(FileNotFoundError):
+    """Raised when a download is required but the cache is in offline mode."""
+
+
+@dataclass
+class CacheEntry:
+    """Reference from a source URL to a content-addressed object in the cache."""
+
+    url: str
+    sha256: str
+    size: int
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched: float = 0.0
+    accessed: float = 0.0
+
+
+def get_cache_dir() -> Path:
+    """
+    Directory for cached source downloads.
+    Set the NXONTOLOGY_DATA_CACHE_DIR environment variable to override.
+    """
+    default = Path.home().joinpath(".cache", "nxontology_data")
+    return Path(os.environ.get("NXONTOLOGY_DATA_CACHE_DIR", default))
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in {"1", "true", "yes"}
+
+
+def _sha256_hexdigest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def get_file_sha256(path: Path) -> str:
+    """Hexadecimal SHA-256 digest of a file's content."""
+    sha256 = hashlib.sha256()
+    with path.open("rb") as read_file:
+        for chunk in iter(lambda: read_file.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _write_json_atomic(path: Path, data: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, suffix=".tmp", delete=False
+    ) as tmp:
+        json.dump(data, tmp, indent=2)
+    os.replace(tmp.name, path)
+
+
+class SourceCache:
+    """
+    Content-addressed cache for raw source downloads shared by all sources.
+    Files are stored once under `objects/` by the SHA-256 of their content,
+    with one reference file per URL under `refs/` recording validators
+    (ETag / Last-Modified) used to revalidate with conditional requests.
+    Interrupted downloads are kept under `partial/` and resumed with range requests.
+    When the total size of objects exceeds max_size_gb,
+    the least recently accessed objects are evicted.
+    In offline mode, only cached files are returned and no requests are made.
+    """
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        max_size_gb: float | None = None,
+        offline: bool | None = None,
+    ) -> None:
+        self.root = root or get_cache_dir()
+        if max_size_gb is None:
+            max_size_gb = float(os.environ.get("NXONTOLOGY_DATA_CACHE_MAX_GB", 20))
+        self.max_size_bytes = int(max_size_gb * 1e9)
+        if offline is None:
+            offline = _env_flag("NXONTOLOGY_DATA_OFFLINE")
+        self.offline = offline
+        self._evict_lock = threading.Lock()
+
+    def _ref_path(self, key: str) -> Path:
+        return self.root.joinpath("refs", f"{_sha256_hexdigest(key)}.json")
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.root.joinpath("objects", sha256[:2], sha256)
+
+    def _partial_path(self, key: str) -> Path:
+        return self.root.joinpath("partial", _sha256_hexdigest(key))
+
+    @staticmethod
+    def get_key(url: str, params: dict[str, Any] | None = None) -> str:
+        """Cache key for a URL and query parameters, which is the full request URL."""
+        if not params:
+            return url
+        prepared_url = requests.Request("GET", url, params=params).prepare().url
+        assert isinstance(prepared_url, str)
+        return prepared_url
+
+    def get_entry(self, key: str) -> CacheEntry | None:
+        """Return the entry for key if both its reference and object exist."""
+        try:
+            entry = CacheEntry(**json.loads(self._ref_path(key).read_text()))
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            return None
+        if not self._object_path(entry.sha256).exists():
+            return None
+        return entry
+
+    def fetch(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        revalidate: bool = True,
+        session: requests.Session | None = None,
+    ) -> Path:
+        """
+        Return a local path to the content of url, downloading only when required.
+        With revalidate, a cached file is revalidated with the server using a conditional request.
+        Without revalidate (e.g. for immutable release URLs), a cached file is returned as is.
+        The returned path has no file extension,
+        so readers must be told the file format and compression.
+        The content is stored exactly as transferred,
+        without decoding any Content-Encoding applied by the server.
+        """
+        key = self.get_key(url, params)
+        entry = self.get_entry(key)
+        if entry is not None and (self.offline or not revalidate):
+            logger.info(f"Using cached {key}")
+            path = self._touch(key, entry)
+        elif self.offline:
+            raise OfflineCacheMiss(f"{key} is not cached and offline mode is enabled.")
+        else:
+            path = self._download(key, entry, session or get_requests_session())
+        return path
+
+    def _touch(self, key: str, entry: CacheEntry) -> Path:
+        entry.accessed = time.time()
+        _write_json_atomic(self._ref_path(key), asdict(entry))
+        return self._object_path(entry.sha256)
+
+    def _download(
+        self,
+        key: str,
+        entry: CacheEntry | None,
+        session: requests.Session,
+        attempts: int = 3,
+    ) -> Path:
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._download_attempt(key, entry, session)
+            # the body is streamed from urllib3, which raises its own errors
+            # when the connection drops or stalls mid-transfer
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                urllib3.exceptions.ProtocolError,
+                urllib3.exceptions.ReadTimeoutError,
+            ) as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(
+                    f"Download of {key} interrupted ({e}), resuming (attempt {attempt + 1} of {attempts})."
+                )
+        raise AssertionError("unreachable")
+
+    def _download_attempt(
+        self, key: str, entry: CacheEntry | None, session: requests.Session
+    ) -> Path:
+        # request the content as stored on the server, so range offsets match stored bytes
+        headers = {"Accept-Encoding": "identity"}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        partial_path = self._partial_path(key)
+        partial_meta_path = partial_path.with_suffix(".json")
+        offset = self._get_resume_offset(partial_path, partial_meta_path, headers)
+        with session.get(
+            key, headers=headers, stream=True, timeout=REQUEST_TIMEOUT
+        ) as response:
+            if response.status_code == 304 and entry is not None:
+                logger.info(f"Cached {key} is up to date.")
+                return self._touch(key, entry)
+            if response.status_code == 416 and offset:
+                # partial download is unusable, so restart from scratch
+                partial_path.unlink()
+                return self._download_attempt(key, entry, session)
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status_code == 206 and response.headers.get(
+                "Content-Range", ""
+            ).startswith(f"bytes {offset}-"):
+                logger.info(f"Resuming download of {key} from byte {offset:,}")
+                mode = "ab"
+            else:
+                logger.info(f"Downloading {key}")
+                mode = "wb"
+                _write_json_atomic(
+                    partial_meta_path, {"etag": etag, "last_modified": last_modified}
+                )
+            with partial_path.open(mode) as write_file:
+                for chunk in response.raw.stream(1 << 20, decode_content=False):
+                    write_file.write(chunk)
+        sha256 = get_file_sha256(partial_path)
+        size = partial_path.stat().st_size
+        object_path = self._object_path(sha256)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(partial_path, object_path)
+        partial_meta_path.unlink(missing_ok=True)
+        now = time.time()
+        entry = CacheEntry(
+            url=key,
+            sha256=sha256,
+            size=size,
+            etag=etag,
+            last_modified=last_modified,
+            fetched=now,
+            accessed=now,
+        )
+        _write_json_atomic(self._ref_path(key), asdict(entry))
+        self.evict(keep={sha256})
+        return object_path
+
+    @staticmethod
+    def _get_resume_offset(
+        partial_path: Path, partial_meta_path: Path, headers: dict[str, str]
+    ) -> int:
+        """
+        Return the byte offset to resume a partial download from,
+        adding range request headers when resuming is possible.
+        """
+        offset = partial_path.stat().st_size if partial_path.exists() else 0
+        if not offset:
+            return 0
+        try:
+            partial_meta = json.loads(partial_meta_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        validator = partial_meta.get("etag") or partial_meta.get("last_modified")
+        if not validator:
+            return 0
+        # With If-Range, the server sends the full content if it changed since the partial download
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+        return offset
+
+    def entries(self) -> list[CacheEntry]:
+        entries = []
+        for ref_path in self.root.joinpath("refs").glob("*.json"):
+            try:
+                entries.append(CacheEntry(**json.loads(ref_path.read_text())))
+            except (FileNotFoundError, json.JSONDecodeError, TypeError):
+                continue
+        return entries
+
+    def evict(self, keep: set[str] | None = None) -> None:
+        """
+        Delete least recently accessed files until the cache fits within max_size_bytes.
+        Both downloaded objects and pipeline stage checkpoints (under `checkpoints/`) count towards the size.
+        Objects whose SHA-256 is in keep are never evicted.
+        Eviction is serialized across threads and tolerates files
+        deleted concurrently by other processes sharing the cache.
+        """
+        keep = keep or set()
+        with self._evict_lock:
+            self._evict(keep)
+
+    def _get_eviction_candidates(self) -> list[tuple[float, int, Path]]:
+        """Return (last accessed, size, path) for evictable files in the cache."""
+        accessed: dict[str, float] = {}
+        for entry in self.entries():
+            accessed[entry.sha256] = max(
+                accessed.get(entry.sha256, 0.0), entry.accessed
+            )
+        object_dir = self.root.joinpath("objects")
+        paths = [
+            *object_dir.glob("*/*"),
+            *self.root.joinpath("checkpoints").rglob("*.pkl"),
+        ]
+        candidates = []
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # deleted concurrently by another process
+                continue
+            # objects are accessed via refs, while checkpoints are touched when loaded
+            if path.is_relative_to(object_dir):
+                last_accessed = accessed.get(path.name, 0.0)
+            else:
+                last_accessed = stat.st_mtime
+            candidates.append((last_accessed, stat.st_size, path))
+        return candidates
+
+    def _evict(self, keep: set[str]) -> None:
+        candidates = self._get_eviction_candidates()
+        total_size = sum(size for _, size, _ in candidates)
+        if total_size <= self.max_size_bytes:
+            return
+        for _, size, path in sorted(candidates):
+            if total_size <= self.max_size_bytes:
+                break
+            if path.name in keep:
+                continue
+            logger.info(f"Evicting {path.relative_to(self.root)} from source cache.")
+            path.unlink(missing_ok=True)
+            total_size -= size
+        for entry in self.entries():
+            if not self._object_path(entry.sha256).exists():
+                self._ref_path(entry.url).unlink(missing_ok=True)
+
+
+@functools.cache
+def get_source_cache() -> SourceCache:
+    """Shared source cache, configured by environment variables."""
+    return SourceCache()
+
+
+def set_offline(offline: bool) -> None:
+    """Enable offline mode for the shared source cache, when offline is True."""
+    if offline:
+        get_source_cache().offline = True
@@ -0,0 +1,149 @@
+"""
+Transitive closure of ontologies as compact sorted integer arrays,
+such that consumers can check subsumption and list ancestors without traversing the graph.
+"""
+
+import logging
+import zipfile
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import numpy as np
+import numpy.typing as npt
+from nxontology import NXOntology
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Closure:
+    """
+    Ancestors of every node in CSR (compressed sparse row) layout.
+    ids are the sorted node identifiers, whose positions are the integer node indices.
+    The ancestors of node i, including itself, are `ancestors[indptr[i]:indptr[i + 1]]`,
+    sorted by index, with the shortest distance from each ancestor to node i in distances.
+    """
+
+    ids: npt.NDArray[np.str_]
+    indptr: npt.NDArray[np.int64]
+    ancestors: npt.NDArray[np.int32]
+    distances: npt.NDArray[np.int16]
+
+    def pair_nodes(self) -> npt.NDArray[np.int64]:
+        """Index of the node whose ancestor is at each position of ancestors."""
+        return np.repeat(np.arange(len(self.ids)), np.diff(self.indptr))
+
+    def index(self, node: str) -> int:
+        """Integer index of node, found by binary search."""
+        i = int(np.searchsorted(self.ids, node))
+        if i == len(self.ids) or self.ids[i] != node:
+            raise KeyError(node)
+        return i
+
+    def get_ancestors(self, node: str) -> dict[str, int]:
+        """Map the ancestors of node, including itself, to their distance from node."""
+        i = self.index(node)
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return dict(
+            zip(
+                self.ids[self.ancestors[start:stop]].tolist(),
+                self.distances[start:stop].tolist(),
+                strict=True,
+            )
+        )
+
+    def is_ancestor(self, node: str, ancestor: str) -> bool:
+        """Whether ancestor subsumes node, which includes node itself."""
+        i, j = self.index(node), self.index(ancestor)
+        row = self.ancestors[self.indptr[i] : self.indptr[i + 1]]
+        k = int(np.searchsorted(row, j))
+        return k < len(row) and row[k] == j
+
+
+def compute_closure(nxo: NXOntology[Any]) -> Closure:
+    """
+    Compute the closure of nxo in one pass over its nodes in topological order,
+    where the ancestors of a node are merged from those of its parents.
+    """
+    graph = nxo.graph
+    ids = np.array(sorted(map(str, graph)), dtype=np.str_)
+    index = {node: i for i, node in enumerate(ids.tolist())}
+    rows: dict[int, tuple[npt.NDArray[np.int32], npt.NDArray[np.int16]]] = {}
+    for node in nx.topological_sort(graph):
+        i = index[str(node)]
+        parents = [rows[index[str(parent)]] for parent in graph.predecessors(node)]
+        ancestors = np.concatenate(
+            [np.array([i], dtype=np.int32), *(row[0] for row in parents)]
+        )
+        distances = np.concatenate(
+            [np.array([0], dtype=np.int16), *(row[1] + 1 for row in parents)]
+        ).astype(np.int16)
+        if parents:
+            # keep the shortest distance to each ancestor
+            order = np.lexsort((distances, ancestors))
+            ancestors, distances = ancestors[order], distances[order]
+            first = np.ones(len(ancestors), dtype=bool)
+            first[1:] = ancestors[1:] != ancestors[:-1]
+            ancestors, distances = ancestors[first], distances[first]
+        rows[i] = ancestors, distances
+    lengths = np.array([len(rows[i][0]) for i in range(len(ids))], dtype=np.int64)
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    closure = Closure(
+        ids=ids,
+        indptr=indptr,
+        ancestors=np.concatenate(
+            [rows[i][0] for i in range(len(ids))] or [np.array([], dtype=np.int32)]
+        ),
+        distances=np.concatenate(
+            [rows[i][1] for i in range(len(ids))] or [np.array([], dtype=np.int16)]
+        ),
+    )
+    logger.info(
+        f"Computed closure of {nxo.name} with {len(closure.ancestors):,} ancestor pairs"
+    )
+    return closure
+
+
+def get_closure_path(ontology_path: Path) -> Path:
+    """Path of the closure written next to an ontology like `mesh.json.gz`."""
+    name = ontology_path.name.split(".", 1)[0]
+    return ontology_path.with_name(f"{name}_closure.npz")
+
+
+def write_npz(arrays: Mapping[str, npt.NDArray[Any]], path: Path) -> Path:
+    """
+    Write arrays to an `.npz` file readable with `numpy.load`,
+    with fixed timestamps such that the file only changes with its content.
+    """
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for name, array in arrays.items():
+            info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with zip_file.open(info, "w", force_zip64=True) as write_file:
+                np.lib.format.write_array(  # type: ignore [no-untyped-call]
+                    write_file, array, allow_pickle=False
+                )
+    return path
+
+
+def write_closure(closure: Closure, path: Path) -> Path:
+    """Write closure to an `.npz` file with `write_npz`."""
+    write_npz(
+        {field.name: getattr(closure, field.name) for field in fields(closure)}, path
+    )
+    logger.info(f"Wrote closure to {path}")
+    return path
+
+
+def read_closure(path: Path) -> Closure:
+    with np.load(path, allow_pickle=False) as arrays:
+        return Closure(
+            ids=arrays["ids"],
+            indptr=arrays["indptr"],
+            ancestors=arrays["ancestors"],
+            distances=arrays["distances"],
+        )
@@ -3,11 +3,16 @@ import logging
 import fire
 from nxontology import NXOntology
 
-from nxontology_data.efo.efo import process_efo_all
+from nxontology_data.benchmarks import run_benchmark_command
+from nxontology_data.efo.diff import diff_efo_builds
+from nxontology_data.efo.efo import process_efo, process_efo_all
 from nxontology_data.hgnc.hgnc import HgncGeneGroupNxoLoader
 from nxontology_data.mesh.mesh import MeshLoader
 from nxontology_data.pubchem.classifications import export_all_heirarchies
+from nxontology_data.scheduler import Task, format_report, run_tasks
+from nxontology_data.serve import serve
 from nxontology_data.utils import get_source_output_dir, write_ontology
+from nxontology_data.xref_index import export_xref_index, get_xref_index_inputs
 
 
 def write_test_output() -> None:
@@ -18,6 +23,75 @@ def write_test_output() -> None:
     write_ontology(nxo, output_dir)
 
 
+def build_all(
+    sources: str | list[str] | None = None,
+    efo_version: str | None = "current",
+    mesh_year: str | None = None,
+    offline: bool = False,
+    resume: bool = False,
+    max_workers: int | None = None,
+    memory_gb: float | None = None,
+) -> None:
+    """
+    Build multiple sources in parallel processes and print a timing report.
+    When MeSH or an EFO build succeeds and both are built, their xref index is exported.
+    sources: task names to build (default: all). Options are efo, efo_otar_profile, hgnc, mesh, and pubchem.
+    max_workers: maximum number of concurrent processes (default: number of CPUs).
+    memory_gb: memory budget for concurrent tasks (default: 80% of physical memory).
+    """
+    tasks = [
+        # MeSH is the longest task, so start it first
+        Task(
+            name="mesh",
+            func=MeshLoader.export_mesh_outputs,
+            kwargs={"year_yyyy": mesh_year, "offline": offline, "resume": resume},
+            memory_gb=16.0,
+        ),
+        *(
+            Task(
+                name=name,
+                func=process_efo,
+                kwargs={
+                    "name": name,
+                    "version": efo_version,
+                    "offline": offline,
+                    "resume": resume,
+                },
+                memory_gb=task_memory_gb,
+            )
+            for name, task_memory_gb in [("efo", 6.0), ("efo_otar_profile", 8.0)]
+        ),
+        Task(
+            name="hgnc",
+            func=HgncGeneGroupNxoLoader.export_hgnc_outputs,
+            kwargs={"offline": offline},
+            memory_gb=1.0,
+        ),
+        Task(
+            name="pubchem",
+            func=export_all_heirarchies,
+            kwargs={"offline": offline},
+            memory_gb=2.0,
+        ),
+    ]
+    if sources is not None:
+        if isinstance(sources, str):
+            sources = sources.split(",")
+        unknown = set(sources) - {task.name for task in tasks}
+        if unknown:
+            raise ValueError(f"Unknown sources: {sorted(unknown)}")
+        tasks = [task for task in tasks if task.name in sources]
+    results = run_tasks(tasks, max_workers=max_workers, memory_gb=memory_gb)
+    print(format_report(results))
+    succeeded = {result.name for result in results if result.status == "succeeded"}
+    for efo_name in ["efo", "efo_otar_profile"]:
+        if succeeded & {"mesh", efo_name} and get_xref_index_inputs(efo_name):
+            export_xref_index(efo_name, resume=resume)
+    failed = [result.name for result in results if result.status != "succeeded"]
+    if failed:
+        raise RuntimeError(f"Building failed for {failed}")
+
+
 def cli() -> None:
     """
     Run like `poetry run nxontology_data`
@@ -25,10 +99,16 @@ def cli() -> None:
     logging.basicConfig()
     logging.getLogger().setLevel(logging.INFO)
     commands = {
+        "all": build_all,
+        "benchmark": run_benchmark_command,
         "efo": process_efo_all,
+        "efo_diff": diff_efo_builds,
         "hgnc": HgncGeneGroupNxoLoader.export_hgnc_outputs,
         "mesh": MeshLoader.export_mesh_outputs,
+        "mesh_batch": MeshLoader.export_mesh_batch,
         "pubchem": export_all_heirarchies,
+        "serve": serve,
         "test": write_test_output,
+        "xref_index": export_xref_index,
     }
     fire.Fire(commands)
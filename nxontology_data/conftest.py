@@ -0,0 +1,156 @@
+import hashlib
+import threading
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from nxontology_data.cache import get_source_cache
+
+Route = Callable[[dict[str, list[str]]], tuple[int, bytes]]
+"""Function of the parsed query string returning a status code and response body."""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def do_GET(self) -> None:
+        local = self.server.local
+        url = urlsplit(self.path)
+        with local._lock:
+            local.requests.append(self.path)
+            local.request_headers.append(dict(self.headers))
+        if url.path in local.files:
+            self._send_file(local.files[url.path])
+            return
+        route = local.routes.get(url.path)
+        if route is None:
+            status, body = 404, b"not found"
+        else:
+            status, body = route(parse_qs(url.query))
+        self._send(status, body)
+
+    def _send(
+        self, status: int, body: bytes, headers: dict[str, str] | None = None
+    ) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        truncate_at = (
+            self.server.local._pop_truncation(self.path) if status == 200 else None
+        )
+        if truncate_at is not None:
+            # the full length was sent, but the connection closes partway through the body
+            self.wfile.write(body[:truncate_at])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def _send_file(self, body: bytes) -> None:
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", headers)
+            return
+        range_ = self.headers.get("Range", "")
+        if range_.startswith("bytes=") and self.headers.get("If-Range") == etag:
+            start = int(range_.removeprefix("bytes=").split("-")[0])
+            if start >= len(body):
+                self._send(416, b"", headers)
+                return
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            self._send(206, body[start:], headers)
+            return
+        self._send(200, body, headers)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    local: "LocalHttpServer"
+
+
+class LocalHttpServer:
+    """
+    Local HTTP stand-in for remote data sources.
+    Register responses for URL paths with `add_route` and point loaders at `url`.
+    Files registered with `add_file` are served with ETag validators
+    and support conditional and range requests.
+    Successful responses to paths registered with `truncate` are cut short.
+    """
+
+    def __init__(self) -> None:
+        self.routes: dict[str, Route] = {}
+        self.files: dict[str, bytes] = {}
+        self.truncations: dict[str, tuple[int, int]] = {}
+        self.requests: list[str] = []
+        self.request_headers: list[dict[str, str]] = []
+        self._lock = threading.Lock()
+        self._httpd = _Server(("127.0.0.1", 0), _Handler)
+        self._httpd.local = self
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def add_route(self, path: str, route: Route | bytes) -> None:
+        if isinstance(route, bytes):
+            body = route
+
+            def static_route(query: dict[str, list[str]]) -> tuple[int, bytes]:
+                return 200, body
+
+            route = static_route
+        self.routes[path] = route
+
+    def add_file(self, path: str, body: bytes) -> None:
+        self.files[path] = body
+
+    def truncate(self, path: str, at: int, times: int = 1) -> None:
+        """
+        Close the connection after `at` bytes of the body of the next `times` successful responses
+        to path, which includes the query string, such as `/data?id=1`.
+        """
+        with self._lock:
+            self.truncations[path] = at, times
+
+    def _pop_truncation(self, path: str) -> int | None:
+        with self._lock:
+            if path not in self.truncations:
+                return None
+            at, times = self.truncations[path]
+            if times > 1:
+                self.truncations[path] = at, times - 1
+            else:
+                del self.truncations[path]
+            return at
+
+    def start(self) -> None:
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def http_server() -> Iterator[LocalHttpServer]:
+    server = LocalHttpServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def source_cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """Isolate the shared source cache in a temporary directory for each test."""
+    cache_dir = tmp_path.joinpath("source_cache")
+    monkeypatch.setenv("NXONTOLOGY_DATA_CACHE_DIR", cache_dir.as_posix())
+    monkeypatch.delenv("NXONTOLOGY_DATA_OFFLINE", raising=False)
+    get_source_cache.cache_clear()
+    yield cache_dir
+    get_source_cache.cache_clear()
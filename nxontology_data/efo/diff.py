@@ -0,0 +1,164 @@
+"""
+Compare EFO builds by the content hashes of their nodes,
+reading node-link JSON outputs as streams rather than loading them with NetworkX.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from nxontology import NXOntology
+
+from nxontology_data.json_stream import JsonStreamReader
+from nxontology_data.utils import get_source_output_dir, write_dataframe
+
+logger = logging.getLogger(__name__)
+
+_unhashed_keys = {"id", "content_hash"}
+"""Node-link keys that are not part of the content of a node."""
+
+
+def node_content_hash(node: Mapping[str, Any]) -> str:
+    """
+    Stable hash of the attributes of a node record, such as from `EfoProcessor.get_nodes`,
+    that does not depend on the order of keys.
+    """
+    content = {k: v for k, v in node.items() if k not in _unhashed_keys}
+    text = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def ontology_content_hash(nxo: NXOntology[str]) -> str:
+    """
+    Hash of the name, nodes, node attributes, and edges of nxo,
+    that does not depend on the order in which nodes and edges were added.
+    """
+    sha256 = hashlib.sha256(f"{nxo.name}\n".encode())
+    for node, data in sorted(nxo.graph.nodes(data=True)):
+        sha256.update(f"{node} {node_content_hash(data)}\n".encode())
+    for parent, child in sorted(nxo.graph.edges):
+        sha256.update(f"{parent} {child}\n".encode())
+    return sha256.hexdigest()
+
+
+@dataclass
+class NodeLinkSummary:
+    """
+    Content of a node-link JSON ontology required for diffing.
+    stored_hashes are content hashes written by the build, which older builds lack,
+    whereas computed_hashes are computed from all node attributes.
+    """
+
+    labels: dict[str, str | None] = field(default_factory=dict)
+    stored_hashes: dict[str, str] = field(default_factory=dict)
+    computed_hashes: dict[str, str] = field(default_factory=dict)
+    xrefs: dict[str, frozenset[str]] = field(default_factory=dict)
+    edges: set[tuple[str, str]] = field(default_factory=set)
+
+
+def iter_node_link_array(path: Path, key: str) -> Iterator[dict[str, Any]]:
+    """Stream the items of a top-level array in a node-link JSON file, which may be gzipped."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as read_file:
+        reader = JsonStreamReader(iter(lambda: read_file.read(1 << 16), b""))
+        yield from reader.iter_array_at([key])
+
+
+def read_node_link_summary(path: Path) -> NodeLinkSummary:
+    summary = NodeLinkSummary()
+    for node in iter_node_link_array(path, "nodes"):
+        node_id = node["id"]
+        summary.labels[node_id] = node.get("efo_label")
+        if node.get("content_hash"):
+            summary.stored_hashes[node_id] = node["content_hash"]
+        summary.computed_hashes[node_id] = node_content_hash(node)
+        summary.xrefs[node_id] = frozenset(node.get("xrefs") or [])
+    for link in iter_node_link_array(path, "links"):
+        summary.edges.add((link["source"], link["target"]))
+    logger.info(
+        f"Read {len(summary.labels):,} nodes and {len(summary.edges):,} edges from {path}"
+    )
+    return summary
+
+
+def diff_node_link(
+    old: NodeLinkSummary, new: NodeLinkSummary
+) -> dict[str, pd.DataFrame]:
+    """
+    Diff two builds by joining nodes on their identifiers, in time linear in their size.
+    Nodes are compared by stored content hashes when both builds have them.
+    Returns tables of changed terms, xrefs of added, removed, or modified terms, and edges.
+    """
+    term_rows: list[dict[str, Any]] = []
+    xref_rows: list[dict[str, Any]] = []
+    for node in old.labels.keys() | new.labels.keys():
+        if node not in new.labels:
+            change = "removed"
+        elif node not in old.labels:
+            change = "added"
+        elif node in old.stored_hashes and node in new.stored_hashes:
+            if old.stored_hashes[node] == new.stored_hashes[node]:
+                continue
+            change = "modified"
+        elif old.computed_hashes[node] == new.computed_hashes[node]:
+            continue
+        else:
+            change = "modified"
+        label = new.labels.get(node, old.labels.get(node))
+        term_rows.append({"efo_id": node, "efo_label": label, "change": change})
+        old_xrefs = old.xrefs.get(node, frozenset())
+        new_xrefs = new.xrefs.get(node, frozenset())
+        xref_rows.extend(
+            {"efo_id": node, "xref_id": xref, "change": "removed"}
+            for xref in old_xrefs - new_xrefs
+        )
+        xref_rows.extend(
+            {"efo_id": node, "xref_id": xref, "change": "added"}
+            for xref in new_xrefs - old_xrefs
+        )
+    edge_rows = [
+        {"parent_id": parent, "child_id": child, "change": "removed"}
+        for parent, child in old.edges - new.edges
+    ]
+    edge_rows.extend(
+        {"parent_id": parent, "child_id": child, "change": "added"}
+        for parent, child in new.edges - old.edges
+    )
+    return {
+        "terms": pd.DataFrame(
+            term_rows, columns=["efo_id", "efo_label", "change"]
+        ).sort_values(["efo_id"], ignore_index=True),
+        "xrefs": pd.DataFrame(
+            xref_rows, columns=["efo_id", "xref_id", "change"]
+        ).sort_values(["efo_id", "xref_id"], ignore_index=True),
+        "edges": pd.DataFrame(
+            edge_rows, columns=["parent_id", "child_id", "change"]
+        ).sort_values(["parent_id", "child_id"], ignore_index=True),
+    }
+
+
+def diff_efo_builds(
+    old: str, new: str, output_dir: str | None = None, name: str = "efo_diff"
+) -> None:
+    """
+    Compare two EFO builds, such as efo_otar_profile.json from two releases,
+    writing tables of changed terms, xrefs, and edges to output_dir (default: output/efo)
+    named like `{name}_terms.json.gz`.
+    """
+    diffs = diff_node_link(
+        read_node_link_summary(Path(old)), read_node_link_summary(Path(new))
+    )
+    output_path = (
+        get_source_output_dir("efo") if output_dir is None else Path(output_dir)
+    )
+    output_path.mkdir(parents=True, exist_ok=True)
+    for table, df in diffs.items():
+        write_dataframe(df, output_path.joinpath(f"{name}_{table}.json.gz"))
+        counts = df["change"].value_counts().to_dict()
+        logger.info(f"{table}: {counts or 'no changes'}")
@@ -0,0 +1,117 @@
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+from nxontology import NXOntology
+
+from nxontology_data.efo.diff import (
+    diff_efo_builds,
+    node_content_hash,
+    ontology_content_hash,
+    read_node_link_summary,
+)
+from nxontology_data.utils import write_ontology
+
+
+def create_nxo(
+    nodes: list[dict[str, Any]], edges: list[tuple[str, str]]
+) -> NXOntology[str]:
+    nxo: NXOntology[str] = NXOntology()
+    nxo.graph.graph["name"] = "efo"
+    for node in nodes:
+        nxo.add_node(node["efo_id"], **node, content_hash=node_content_hash(node))
+    nxo.graph.add_edges_from(edges)
+    return nxo
+
+
+def test_node_content_hash() -> None:
+    node = {"efo_id": "EFO:1", "efo_label": "a", "xrefs": ["MONDO:1"]}
+    assert node_content_hash(node) == node_content_hash(dict(reversed(node.items())))
+    assert node_content_hash(node) == node_content_hash({**node, "id": "EFO:1"})
+    assert node_content_hash(node) != node_content_hash({**node, "efo_label": "b"})
+
+
+def test_ontology_content_hash() -> None:
+    nodes: list[dict[str, Any]] = [
+        {"efo_id": "EFO:1", "efo_label": "root"},
+        {"efo_id": "EFO:2", "efo_label": "disease"},
+        {"efo_id": "EFO:3", "efo_label": "other disease"},
+    ]
+    edges = [("EFO:1", "EFO:2"), ("EFO:1", "EFO:3")]
+    content_hash = ontology_content_hash(create_nxo(nodes, edges))
+    assert content_hash == ontology_content_hash(create_nxo(nodes[::-1], edges[::-1]))
+    assert content_hash != ontology_content_hash(create_nxo(nodes, edges[:1]))
+    nodes[2] = {**nodes[2], "efo_label": "renamed"}
+    assert content_hash != ontology_content_hash(create_nxo(nodes, edges))
+
+
+def test_diff_efo_builds(tmp_path: Path) -> None:
+    old_nodes: list[dict[str, Any]] = [
+        {"efo_id": "EFO:1", "efo_label": "root", "xrefs": None},
+        {"efo_id": "EFO:2", "efo_label": "disease", "xrefs": ["MONDO:2"]},
+        {"efo_id": "EFO:3", "efo_label": "obsolete", "xrefs": ["MONDO:3"]},
+    ]
+    new_nodes: list[dict[str, Any]] = [
+        old_nodes[0],
+        {"efo_id": "EFO:2", "efo_label": "disease", "xrefs": ["MESH:D2"]},
+        {"efo_id": "EFO:4", "efo_label": "new", "xrefs": None},
+    ]
+    old_dir, new_dir = tmp_path.joinpath("old"), tmp_path.joinpath("new")
+    old_dir.mkdir()
+    new_dir.mkdir()
+    old_path = write_ontology(
+        create_nxo(old_nodes, [("EFO:1", "EFO:2"), ("EFO:1", "EFO:3")]), old_dir
+    )
+    new_path = write_ontology(
+        create_nxo(new_nodes, [("EFO:1", "EFO:2"), ("EFO:2", "EFO:4")]),
+        new_dir,
+        compression_threshold_mb=0,
+    )
+    assert new_path.suffix == ".gz"
+    assert len(read_node_link_summary(new_path).stored_hashes) == 3
+    diff_efo_builds(old_path.as_posix(), new_path.as_posix(), tmp_path.as_posix())
+    terms = pd.read_json(tmp_path.joinpath("efo_diff_terms.json.gz"))
+    assert terms[["efo_id", "change"]].values.tolist() == [
+        ["EFO:2", "modified"],
+        ["EFO:3", "removed"],
+        ["EFO:4", "added"],
+    ]
+    xrefs = pd.read_json(tmp_path.joinpath("efo_diff_xrefs.json.gz"))
+    assert xrefs.values.tolist() == [
+        ["EFO:2", "MESH:D2", "added"],
+        ["EFO:2", "MONDO:2", "removed"],
+        ["EFO:3", "MONDO:3", "removed"],
+    ]
+    edges = pd.read_json(tmp_path.joinpath("efo_diff_edges.json.gz"))
+    assert edges.values.tolist() == [
+        ["EFO:1", "EFO:3", "removed"],
+        ["EFO:2", "EFO:4", "added"],
+    ]
+
+
+def test_diff_disease_precision(tmp_path: Path) -> None:
+    """Stored hashes of slim builds cover disease precision, which is set after get_nodes."""
+    # efo imports nxontology-ml, which is installed from git
+    pytest.importorskip("nxontology_ml")
+    from nxontology_data.efo.efo import EfoProcessor
+
+    nodes: list[dict[str, Any]] = [
+        {"efo_id": "EFO:1", "efo_label": "root"},
+        {"efo_id": "EFO:2", "efo_label": "disease"},
+    ]
+    paths: list[str] = []
+    for name, precision in [("old", "high"), ("new", "low")]:
+        nxo = create_nxo(nodes, [("EFO:1", "EFO:2")])
+        EfoProcessor.set_disease_precision(
+            nxo, pd.DataFrame({"identifier": ["EFO:2"], "precision": [precision]})
+        )
+        assert nxo.graph.nodes["EFO:2"]["content_hash"] == node_content_hash(
+            nxo.graph.nodes["EFO:2"]
+        )
+        output_dir = tmp_path.joinpath(name)
+        output_dir.mkdir()
+        paths.append(write_ontology(nxo, output_dir).as_posix())
+    diff_efo_builds(paths[0], paths[1], tmp_path.as_posix())
+    terms = pd.read_json(tmp_path.joinpath("efo_diff_terms.json.gz"))
+    assert terms[["efo_id", "change"]].values.tolist() == [["EFO:2", "modified"]]
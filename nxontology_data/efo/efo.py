@@ -1,4 +1,6 @@
 import functools
+import importlib.metadata
+import inspect
 import json
 import logging
 import re
@@ -15,8 +17,22 @@ import rdflib
 from nxontology import NXOntology
 from nxontology_ml.model.predict import train_predict as nxontology_ml_train_predict
 
+from nxontology_data import node_data, replacement, utils
+from nxontology_data.cache import get_file_sha256, get_source_cache, set_offline
+from nxontology_data.closure import compute_closure, write_closure
+from nxontology_data.efo.diff import node_content_hash, ontology_content_hash
+from nxontology_data.instrumentation import instrumented, measure, record_run
+from nxontology_data.label_index import normalize_label, write_label_index
+from nxontology_data.node_data import derive_ontology
+from nxontology_data.node_metrics import compute_node_metrics
+from nxontology_data.replacement import resolve_replacements
+from nxontology_data.stages import Pipeline, Stage, get_checkpoint_dir
 from nxontology_data.utils import (
+    count_ontology,
+    df_to_records,
     get_source_output_dir,
+    group_records,
+    group_values,
     normalize_parsed_curie,
     sparql_results_to_df,
     write_dataframe,
@@ -26,6 +42,18 @@ from nxontology_data.utils import (
 logger = logging.getLogger(__name__)
 
 
+def get_nxontology_ml_version() -> str:
+    """Version of nxontology-ml, including the commit when installed from git."""
+    distribution = importlib.metadata.distribution("nxontology-ml")
+    version = distribution.version
+    direct_url = distribution.read_text("direct_url.json")
+    if direct_url:
+        commit_id = json.loads(direct_url).get("vcs_info", {}).get("commit_id")
+        if commit_id:
+            version += f"+{commit_id}"
+    return version
+
+
 class EfoProcessor:
     name: str
     version: str
@@ -64,10 +92,12 @@ class EfoProcessor:
 
     def download_owl(self) -> Path:
         """
-        Download an EFO release file from GitHub with compression.
+        Download an EFO release file from GitHub via the source cache,
+        and write it to owl_path with compression.
         """
-        logger.info(f"Downloading {self.owl_url} to {self.owl_path}")
-        with fsspec.open(self.owl_url, mode="rb") as src, fsspec.open(
+        cached_path = get_source_cache().fetch(self.owl_url)
+        logger.info(f"Compressing {self.owl_url} to {self.owl_path}")
+        with cached_path.open(mode="rb") as src, fsspec.open(
             self.owl_path, mode="wb", compression="infer"
         ) as dst:
             shutil.copyfileobj(src, dst)
@@ -101,6 +131,7 @@ class EfoProcessor:
         return version
 
     @functools.cache  # noqa: B019
+    @instrumented(count=lambda rdf: {"triples": len(rdf)})
     def load_rdf(self) -> rdflib.graph.Graph:
         """
         Read raw EFO ontology as RDF graph.
@@ -129,8 +160,11 @@ class EfoProcessor:
         if cache and not hasattr(rdf, "cached_query"):
             rdf.cached_query = functools.cache(rdf.query)
         query = self._get_query(name)
-        results = (rdf.cached_query if cache else rdf.query)(query)
-        return sparql_results_to_df(results)
+        with measure(f"run_query:{name}") as step:
+            results = (rdf.cached_query if cache else rdf.query)(query)
+            df = sparql_results_to_df(results)
+            step.counts["rows"] = len(df)
+        return df
 
     def get_terms_df(self) -> pd.DataFrame:
         return self.run_query("terms", cache=True)
@@ -173,7 +207,7 @@ class EfoProcessor:
             )
         )
 
-    def get_synonyms(self) -> dict[str, dict[str, str]]:
+    def get_synonyms(self) -> dict[str, list[dict[str, str]]]:
         synonym_scopes = {
             "hasExactSynonym": "exact",
             "hasNarrowSynonym": "narrow",
@@ -188,16 +222,26 @@ class EfoProcessor:
             .drop_duplicates()
             .sort_values(["efo_id", "name", "scope"])
         )
-        return {
-            k: v[["name", "scope"]].to_dict(orient="records")
-            for k, v in df.groupby("efo_id")
-        }
+        return group_records(df, "efo_id", ["name", "scope"])
+
+    @staticmethod
+    def _group_sorted_unique(
+        df: pd.DataFrame, by: str, column: str
+    ) -> dict[str, list[str]]:
+        """
+        Group the sorted unique non-missing values of column by the value of column by,
+        with an empty list for keys that only have missing values.
+        """
+        values = group_values(
+            df[[by, column]].dropna().drop_duplicates().sort_values([by, column]),
+            by,
+            column,
+        )
+        return {key: values.get(key, []) for key in sorted(set(df[by].dropna()))}
 
     def get_subsets(self) -> dict[str, list[str]]:
         df = self.run_query("subsets", cache=True)
-        return {
-            k: sorted(set(v["subset_id"].dropna())) for k, v in df.groupby("efo_id")
-        }
+        return self._group_sorted_unique(df, "efo_id", "subset_id")
 
     def get_xrefs_df(self) -> pd.DataFrame:
         xref_df = self.run_query("xrefs", cache=True)
@@ -234,87 +278,117 @@ class EfoProcessor:
             f"Loaded alternative IDs: old_to_new now contains {len(old_to_new):,} items."
         )
 
-        def update_term(old_term: str) -> str:
-            new_term = old_to_new.get(old_term)
-            if new_term is None:
-                return old_term
-            return update_term(new_term)
-
-        current_to_old: dict[str, set[str]] = {}
-        for old_term, new_term in old_to_new.items():
-            if old_term in current_terms:
-                # not expected to happen
-                continue
-            newest_term = update_term(new_term)
-            if newest_term in current_terms:
-                current_to_old.setdefault(new_term, set()).add(old_term)
+        current_to_old = resolve_replacements(old_to_new).get_replaced_terms(
+            current_terms
+        )
         logger.info(
             f"{len(current_to_old):,} current terms have 1 or more replaced/alternative terms."
         )
-        return {k: sorted(v) for k, v in current_to_old.items()}
-
-    def get_xref_details(self) -> dict[str, dict[str, str | list[str] | None]]:
-        xrefs = self.get_xrefs_df()[["efo_id", "xref_bioregistry"]].rename(
-            columns={"xref_bioregistry": "xref_id"}
+        return current_to_old
+
+    def get_xrefs(self) -> dict[str, list[str]]:
+        """Get a mapping from EFO terms to their sorted unique xrefs, excluding the term itself."""
+        return self._group_sorted_unique(
+            self.get_xrefs_df().query("efo_id != xref_bioregistry"),
+            "efo_id",
+            "xref_bioregistry",
         )
 
-        xref_sources = (
-            self.get_xref_sources_df()
-            .assign(
-                xref_id=lambda df: df["xref"]
-                .str.split(":", expand=True)
-                .apply(
-                    lambda row: normalize_parsed_curie(
-                        xref_prefix=row[0],
-                        xref_accession=row[1],
-                        collapse_orphanet=True,
-                    ),
-                    axis="columns",
-                )
-            )
-            .groupby(["efo_id", "xref_id"])["axiom_source"]
-            .apply(list)
-            .reset_index()
-            .rename(columns={"axiom_source": "sources"})
-        )
-
-        def get_relation(x: list[str]) -> str | None:
-            if "skos:exactMatch" in x or "mondo:exactMatch" in x:
-                return "skos:exactMatch"
-            if "skos:closeMatch" in x or "mondo:closeMatch" in x:
-                return "skos:closeMatch"
-            return None
-
-        mapping_properties = (
-            self.get_mapping_properties_df()
-            .groupby(["efo_id", "xref_id"])["mapping_property_id"]
-            .apply(list)
-            .reset_index()
-            .rename(columns={"mapping_property_id": "mapping_properties"})
-            .assign(
-                relation=lambda x: x["mapping_properties"].apply(get_relation),
+    @staticmethod
+    def _get_xref_relation(mapping_properties: list[str]) -> str | None:
+        if (
+            "skos:exactMatch" in mapping_properties
+            or "mondo:exactMatch" in mapping_properties
+        ):
+            return "skos:exactMatch"
+        if (
+            "skos:closeMatch" in mapping_properties
+            or "mondo:closeMatch" in mapping_properties
+        ):
+            return "skos:closeMatch"
+        return None
+
+    def get_xref_details(self) -> dict[str, list[dict[str, str | list[str] | None]]]:
+        """
+        Get xrefs of EFO terms with their mapping relation and axiom sources,
+        combining xrefs, mapping properties, and xref sources by (efo_id, xref_id)
+        in a single pass over each table. Details are sorted by xref_id,
+        where each xref occurs once per row in the xrefs table or once if only in other tables.
+        """
+        xref_sources = self.get_xref_sources_df().assign(
+            xref_id=lambda df: df["xref"]
+            .str.split(":", expand=True)
+            .apply(
+                lambda row: normalize_parsed_curie(
+                    xref_prefix=row[0],
+                    xref_accession=row[1],
+                    collapse_orphanet=True,
+                ),
+                axis="columns",
             )
         )
+        # (efo_id, xref_id) -> [number of xrefs rows, mapping properties, sources]
+        pairs: dict[tuple[str, str], list[Any]] = {}
+
+        def add_pairs(df: pd.DataFrame, column: str | None, index: int) -> None:
+            df = df.dropna(subset=["efo_id", "xref_id"]).query("efo_id != xref_id")
+            if column is None:
+                for key in zip(df["efo_id"], df["xref_id"], strict=True):
+                    pairs.setdefault(key, [0, None, None])[0] += 1
+                return
+            for record in df_to_records(df, ["efo_id", "xref_id", column]):
+                pair = pairs.setdefault(
+                    (record["efo_id"], record["xref_id"]), [0, None, None]
+                )
+                if pair[index] is None:
+                    pair[index] = []
+                pair[index].append(record[column])
+
+        add_pairs(
+            self.get_xrefs_df().rename(columns={"xref_bioregistry": "xref_id"}),
+            None,
+            0,
+        )
+        add_pairs(self.get_mapping_properties_df(), "mapping_property_id", 1)
+        add_pairs(xref_sources, "axiom_source", 2)
+        xref_details: dict[str, list[dict[str, str | list[str] | None]]] = {}
+        for (efo_id, xref_id), (n_rows, mapping_properties, sources) in sorted(
+            pairs.items()
+        ):
+            detail = {
+                "xref_id": xref_id,
+                "relation": (
+                    self._get_xref_relation(mapping_properties)
+                    if mapping_properties is not None
+                    else None
+                ),
+                "sources": sources,
+            }
+            xref_details.setdefault(efo_id, []).extend(
+                dict(detail) for _ in range(max(n_rows, 1))
+            )
+        return xref_details
 
-        xref_details = (
-            xrefs.merge(
-                mapping_properties,
-                how="outer",
-                on=["efo_id", "xref_id"],
+    @staticmethod
+    def get_label_df(nodes: list[dict[str, Any]]) -> pd.DataFrame:
+        """
+        Get the labels and synonyms of EFO terms from `get_nodes`
+        for `write_label_index`, tagged `label` or by synonym scope.
+        """
+        rows = []
+        for node in nodes:
+            rows.append(
+                {"label": node["efo_label"], "id": node["efo_id"], "tag": "label"}
             )
-            .merge(
-                xref_sources,
-                how="outer",
-                on=["efo_id", "xref_id"],
+            rows.extend(
+                {
+                    "label": synonym["name"],
+                    "id": node["efo_id"],
+                    "tag": synonym["scope"],
+                }
+                for synonym in node["synonyms"] or []
             )
-            .query("efo_id != xref_id")
-            .dropna(subset=["xref_id"])
-        )
-
-        return {
-            k: v[["xref_id", "relation", "sources"]].to_dict(orient="records")
-            for k, v in xref_details.groupby("efo_id")
-        }
+        return pd.DataFrame(rows, columns=["label", "id", "tag"])
 
     @classmethod
     def _add_unique_node_labels(cls, terms_df: pd.DataFrame) -> pd.DataFrame:
@@ -337,24 +411,42 @@ class EfoProcessor:
         )
         return terms_df
 
+    @instrumented(count=lambda nodes: {"nodes": len(nodes)})
     def get_nodes(self) -> list[dict[str, Any]]:
+        """
+        Get node records of EFO terms with their nested attributes.
+        Node dicts are created once from the columns of the terms table
+        and nested attributes are looked up from mappings created by sort-based grouping.
+        """
         logger.info("Generating nodes")
         node_df = self.get_terms_df()
         node_df = self._add_unique_node_labels(node_df)
-        node_df["synonyms"] = node_df.efo_id.map(self.get_synonyms())
-        node_df["replaces"] = node_df.efo_id.map(self.get_replaced_terms())
-        node_df["xrefs"] = node_df.efo_id.map(
-            self.get_xrefs_df()
-            .query("efo_id != xref_bioregistry")
-            .groupby("efo_id")
-            .apply(lambda df: sorted(set(df.xref_bioregistry.dropna())))
-        )
-        node_df["subsets"] = node_df.efo_id.map(self.get_subsets())
-        node_df["xref_details"] = node_df.efo_id.map(self.get_xref_details())
-        # Use .to_json and not .to_dict to convert NaN to None
-        return json.loads(node_df.to_json(orient="records"))  # type: ignore [no-any-return]
+        attributes: dict[str, dict[str, Any]] = {
+            "synonyms": self.get_synonyms(),
+            "replaces": self.get_replaced_terms(),
+            "xrefs": self.get_xrefs(),
+            "subsets": self.get_subsets(),
+            "xref_details": self.get_xref_details(),
+        }
+        nodes = df_to_records(node_df)
+        for node in nodes:
+            for name, mapping in attributes.items():
+                node[name] = mapping.get(node["efo_id"])
+            node["content_hash"] = node_content_hash(node)
+        return nodes
 
     def create_nxo(self) -> NXOntology[str]:
+        return self.create_nxo_from_tables(
+            nodes=self.get_nodes(), subclass_df=self.get_subclass_df()
+        )
+
+    @instrumented(count=count_ontology)
+    def create_nxo_from_tables(
+        self, nodes: list[dict[str, Any]], subclass_df: pd.DataFrame
+    ) -> NXOntology[str]:
+        """
+        Create an NXOntology from the outputs of `get_nodes` and `get_subclass_df`.
+        """
         nxo: NXOntology[str] = NXOntology()
         nxo.graph.graph["name"] = self.name
         nxo.graph.graph["version"] = self.owl_version
@@ -364,9 +456,9 @@ class EfoProcessor:
             node_identifier_attribute="{node}",
             node_url_attribute="efo_uri",
         )
-        for data in self.get_nodes():
+        for data in nodes:
             nxo.add_node(data["efo_id"], **data)
-        for edge in self.get_subclass_df().to_dict(orient="records"):
+        for edge in subclass_df.to_dict(orient="records"):
             source = edge["efo_id"]
             target = edge["child_efo_id"]
             try:
@@ -384,38 +476,256 @@ class EfoProcessor:
         Use nxontology-ml to classify nodes in EFO OTAR Slim based on their disease precision.
         Modifies nxo node attributes in place. Returns a pd.DataFrame of the predictions and features.
         """
+        precision_df = self.predict_disease_precision(nxo)
+        self.set_disease_precision(nxo, precision_df)
+        return precision_df
+
+    @staticmethod
+    @instrumented(count=lambda df: {"rows": len(df)})
+    def predict_disease_precision(nxo: NXOntology[str]) -> pd.DataFrame:
+        """
+        Use nxontology-ml to predict the disease precision of nodes in EFO OTAR Slim.
+        Returns a pd.DataFrame of the predictions and features.
+        """
         assert nxo.name == "efo_otar_slim"
         nxo.freeze()
         logger.info("Beginning nxontology-ml disease precision classification.")
-        precision_df = nxontology_ml_train_predict(nxo=nxo)
+        precision_df: pd.DataFrame = nxontology_ml_train_predict(nxo=nxo)
+        return precision_df
+
+    @classmethod
+    def get_cached_precision_stage(
+        cls, nxo: NXOntology[str], content_hash: str
+    ) -> Stage[pd.DataFrame]:
+        """
+        Stage predicting disease precision for nxo (EFO OTAR Slim)
+        that is checkpointed by the content hash of nxo and the nxontology-ml version,
+        rather than the EFO version, such that builds of any EFO release
+        whose slim ontology is unchanged reuse the trained model's predictions and features.
+        """
+        pipeline = Pipeline(get_checkpoint_dir("efo", "nxontology_ml"), resume=True)
+        source = pipeline.source("nxo_slim", content_key=content_hash, value=nxo)
+        return pipeline.stage(
+            "train_predict",
+            cls.predict_disease_precision,
+            source,
+            params={"nxontology_ml": get_nxontology_ml_version()},
+        )
+
+    @staticmethod
+    def set_disease_precision(nxo: NXOntology[str], precision_df: pd.DataFrame) -> None:
+        """
+        Set the disease_precision node attribute from the output of `predict_disease_precision`,
+        updating content_hash to cover it.
+        """
         id_to_precision = {
             row.identifier: row.precision for row in precision_df.itertuples()
         }
         for node, data in nxo.graph.nodes(data=True):
             data["disease_precision"] = id_to_precision.get(node, "non_disease")
-        return precision_df
+            data["content_hash"] = node_content_hash(data)
 
-    def write_outputs(self) -> None:
-        output_dir = get_source_output_dir("efo")
-        nxo = self.create_nxo()
-        write_ontology(nxo, output_dir)
-        write_dataframe(
-            self.get_xrefs_df(), output_dir.joinpath(f"{self.name}_xrefs.json.gz")
-        )
-        write_dataframe(
-            self.get_obsolete_df(), output_dir.joinpath(f"{self.name}_obsolete.json.gz")
-        )
-        if nxo.name == "efo_otar_profile":
-            nxo_slim = self.create_slim_nxo(nxo)
-            # classify EFO node/disease precision using nxontology-ml
-            precision_df = self.classify_disease_precision(nxo_slim)
-            write_dataframe(
-                precision_df,
+    def create_pipeline(self, output_dir: Path, resume: bool = False) -> Pipeline:
+        """
+        Create the pipeline of stages to export outputs from the downloaded OWL file.
+        """
+        pipeline = Pipeline(
+            get_checkpoint_dir("efo", self.name, self.version or "unknown"),
+            resume=resume,
+        )
+        params = {"name": self.name, "version": self.version}
+        source = pipeline.source(
+            "fetch", content_key=get_file_sha256(self.owl_path), value=self.owl_path
+        )
+        rdf = pipeline.stage("parse", self.load_rdf, after=[source], persist=False)
+        # query stages read the RDF graph loaded by the parse stage
+        query_code = [self.run_query, self._get_query]
+        nodes = pipeline.stage(
+            "query_nodes",
+            self.get_nodes,
+            after=[rdf],
+            code=[
+                *query_code,
+                self.get_terms_df,
+                self._add_unique_node_labels,
+                self.get_synonyms,
+                self.get_replaced_terms,
+                # resolution of replacement chains
+                inspect.getsource(replacement),
+                self.get_obsolete_df,
+                self.get_alt_id_df,
+                self.get_subsets,
+                self._group_sorted_unique,
+                self.get_xrefs,
+                self.get_xrefs_df,
+                self.get_xref_details,
+                self._get_xref_relation,
+                df_to_records,
+                group_records,
+                group_values,
+                self.get_xref_sources_df,
+                self.get_mapping_properties_df,
+                normalize_parsed_curie,
+                node_content_hash,
+                *(
+                    self._get_query(name)
+                    for name in [
+                        "terms",
+                        "synonyms",
+                        "terms_obsolete",
+                        "alt_id",
+                        "xrefs",
+                        "subsets",
+                        "xref_sources",
+                        "mapping_properties",
+                    ]
+                ),
+            ],
+            params=params,
+        )
+        subclass_df = pipeline.stage(
+            "query_subclasses",
+            self.get_subclass_df,
+            after=[rdf],
+            code=[*query_code, self._get_query("subclasses")],
+        )
+        xrefs_df = pipeline.stage(
+            "query_xrefs",
+            self.get_xrefs_df,
+            after=[rdf],
+            code=[*query_code, normalize_parsed_curie, self._get_query("xrefs")],
+        )
+        obsolete_df = pipeline.stage(
+            "query_obsolete",
+            self.get_obsolete_df,
+            after=[rdf],
+            code=[*query_code, self._get_query("terms_obsolete")],
+        )
+        nxo = pipeline.stage(
+            "build_nxo",
+            self.create_nxo_from_tables,
+            nodes,
+            subclass_df,
+            params=params,
+        )
+        write_params = {**params, "output_dir": output_dir.as_posix()}
+        pipeline.output(
+            "write_nxo",
+            lambda nxo: write_ontology(
+                nxo, output_dir, closure=True, node_metrics=True
+            ),
+            nxo,
+            code=[write_ontology, compute_closure, write_closure, compute_node_metrics],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_xrefs",
+            lambda df: write_dataframe(
+                df, output_dir.joinpath(f"{self.name}_xrefs.json.gz")
+            ),
+            xrefs_df,
+            code=[write_dataframe],
+            params=write_params,
+        )
+        # partitions by the prefix of EFO terms, such as MONDO, for readers of some terms
+        pipeline.output(
+            "write_xref_partitions",
+            lambda df: write_dataframe(
+                df,
+                output_dir.joinpath(f"{self.name}_xrefs.json.gz"),
+                partition_by="efo_id",
+                partition_key=lambda efo_id: efo_id.split(":", 1)[0],
+            ),
+            xrefs_df,
+            code=[write_dataframe, inspect.getsource(utils)],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_label_index",
+            lambda nodes: write_label_index(
+                self.get_label_df(nodes),
+                output_dir.joinpath(f"{self.name}_label_index.bin"),
+            ),
+            nodes,
+            code=[self.get_label_df, write_label_index, normalize_label],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_obsolete",
+            lambda df: write_dataframe(
+                df, output_dir.joinpath(f"{self.name}_obsolete.json.gz")
+            ),
+            obsolete_df,
+            code=[write_dataframe],
+            params=write_params,
+        )
+        if self.name != "efo_otar_profile":
+            return pipeline
+        nxo_slim = pipeline.stage(
+            "build_nxo_slim",
+            self.create_slim_nxo,
+            nxo,
+            code=[inspect.getsource(node_data)],
+        )
+        nxo_slim_hash = pipeline.stage(
+            "hash_nxo_slim", ontology_content_hash, nxo_slim, code=[node_content_hash]
+        )
+        # classify EFO node/disease precision using nxontology-ml,
+        # which is checkpointed by the content of the slim ontology (not persisted here)
+        precision_df = pipeline.stage(
+            "classify_disease_precision",
+            lambda nxo, content_hash: self.get_cached_precision_stage(
+                nxo, content_hash
+            ).result(),
+            nxo_slim,
+            nxo_slim_hash,
+            code=[self.get_cached_precision_stage, self.predict_disease_precision],
+            params={"nxontology_ml": get_nxontology_ml_version()},
+            persist=False,
+        )
+        pipeline.output(
+            "write_precision_classifications",
+            lambda df: write_dataframe(
+                df,
                 output_dir.joinpath(f"{self.name}_precision_classifications.json.gz"),
-            )
-            write_ontology(nxo_slim, output_dir)
+            ),
+            precision_df,
+            code=[write_dataframe],
+            params=write_params,
+        )
+
+        def write_slim_nxo(
+            nxo_slim: NXOntology[str], precision_df: pd.DataFrame
+        ) -> Path:
+            self.set_disease_precision(nxo_slim, precision_df)
+            return write_ontology(nxo_slim, output_dir, closure=True, node_metrics=True)
+
+        pipeline.output(
+            "write_nxo_slim",
+            write_slim_nxo,
+            nxo_slim,
+            precision_df,
+            code=[
+                self.set_disease_precision,
+                write_ontology,
+                compute_closure,
+                write_closure,
+                compute_node_metrics,
+            ],
+            params=write_params,
+        )
+        return pipeline
+
+    def write_outputs(self, resume: bool = False) -> None:
+        """
+        resume: reuse checkpointed stages from a previous run,
+            rerunning only stages whose inputs or code changed.
+        """
+        output_dir = get_source_output_dir("efo")
+        self.create_pipeline(output_dir=output_dir, resume=resume).run()
 
     @staticmethod
+    @instrumented(count=count_ontology)
     def create_slim_nxo(nxo: NXOntology[str]) -> NXOntology[str]:
         """
         EFO OTAR Slim is created by pruning EFO OTAR Profile to only include therapeutic area terms and their descendants.
@@ -427,9 +737,8 @@ class EfoProcessor:
         for node, data in nxo.graph.nodes(data=True):
             if data.get("therapeutic_area"):
                 otar_slim_nodes |= nxo.node_info(node).descendants
-        nxo_slim: NXOntology[str] = NXOntology(
-            nxo.graph.subgraph(otar_slim_nodes).copy()
-        )
+        # share node attributes with nxo rather than copying them
+        nxo_slim = derive_ontology(nxo, otar_slim_nodes)
         nxo_slim.graph.graph["name"] = "efo_otar_slim"
         nxo_slim.graph.graph["note"] = (
             "EFO OTAR Slim was created from EFO OTAR Profile by nxontology-data."
@@ -438,13 +747,31 @@ class EfoProcessor:
 
 
 def process_efo(
-    name: str = "efo_otar_profile", version: str | None = "current"
+    name: str = "efo_otar_profile",
+    version: str | None = "current",
+    offline: bool = False,
+    resume: bool = False,
 ) -> None:
+    """
+    offline: build from cached source files without network access.
+    resume: reuse checkpointed stages from a previous run.
+    """
+    set_offline(offline)
+    if version is None and get_source_cache().offline:
+        raise ValueError("version must be specified in offline mode.")
     processor = EfoProcessor(name=name, version=version)
-    processor.download_owl()
-    processor.write_outputs()
-
-
-def process_efo_all(version: str | None = "current") -> None:
+    # EFO variants share an output directory, so prefix the report with the variant name
+    output_dir = get_source_output_dir("efo")
+    with record_run(
+        output_dir.joinpath(f"{name}_run_metrics.json"), source=name, version=version
+    ):
+        with measure("fetch"):
+            processor.download_owl()
+        processor.write_outputs(resume=resume)
+
+
+def process_efo_all(
+    version: str | None = "current", offline: bool = False, resume: bool = False
+) -> None:
     for name in "efo", "efo_otar_profile":
-        process_efo(name=name, version=version)
+        process_efo(name=name, version=version, offline=offline, resume=resume)
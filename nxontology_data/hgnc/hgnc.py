@@ -1,14 +1,21 @@
 import json
 import logging
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import pandas as pd
-import requests
 from nxontology import NXOntology
 
-from nxontology_data.utils import get_source_output_dir, write_ontology
+from nxontology_data.cache import get_source_cache, set_offline
+from nxontology_data.instrumentation import instrumented, record_run
+from nxontology_data.utils import (
+    count_ontology,
+    get_requests_session,
+    get_source_output_dir,
+    write_ontology,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -33,34 +40,68 @@ class HgncGeneGroupDownloader:
     SYMBOL_URL = "https://www.genenames.org/cgi-bin/download/custom?col=gd_hgnc_id&col=gd_app_sym&status=Approved&hgnc_dbtag=on&order_by=gd_hgnc_id&format=text&submit=submit"
     """Custom download of gene symbols from HGNC."""
 
+    MAX_WORKERS = 4
+    """Maximum number of concurrent downloads."""
+    _ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+    """Fixed timestamp for archive members, so the zip is reproducible."""
+
+    @classmethod
+    def _get_downloads(cls) -> list[tuple[str, str, bool]]:
+        """
+        Return (archive member name, url, convert tabs to commas) for each file to download.
+        """
+        downloads = [
+            (filename, cls.BASE_URL + filename, False) for filename in cls.FILENAMES
+        ]
+        downloads.append(("gene_symbols.csv", cls.SYMBOL_URL, True))
+        return downloads
+
     @classmethod
-    def download_zip(cls) -> Path:
+    @instrumented()
+    def download_zip(cls, max_workers: int | None = None) -> Path:
         """
         Download all files in genefamily_db_tables to a zip archive.
         Also downloads a custom query for gene symbols.
+        Files are fetched concurrently through the source cache over a shared session with retries,
+        but are written to the archive in a fixed order with fixed timestamps,
+        such that the output does not depend on download completion order.
         """
+        max_workers = max_workers or cls.MAX_WORKERS
         zip_path = get_hgnc_output_dir().joinpath(cls.OUTPUT_FILENAME)
-        # download all files to a zip archive
-        with zipfile.ZipFile(
-            zip_path, mode="w", compression=zipfile.ZIP_DEFLATED
-        ) as zip_file:
-            # genefamily_db_tables downloads
-            for filename in cls.FILENAMES:
-                url = cls.BASE_URL + filename
-                logger.info(f"Downloading {url}")
-                response = requests.get(url)
-                response.raise_for_status()
-                zip_file.writestr(filename, response.content)
-            # custom gene symbol download
-            logger.info(f"Downloading {cls.SYMBOL_URL}")
-            response = requests.get(cls.SYMBOL_URL)
-            response.raise_for_status()
-            zip_file.writestr("gene_symbols.csv", response.text.replace("\t", ","))
+        downloads = cls._get_downloads()
+        cache = get_source_cache()
+        session = get_requests_session(pool_maxsize=max_workers)
+        with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(cache.fetch, url, session=session)
+                for _, url, _ in downloads
+            ]
+            try:
+                with zipfile.ZipFile(
+                    zip_path, mode="w", compression=zipfile.ZIP_DEFLATED
+                ) as zip_file:
+                    for (filename, _, tabs_to_commas), future in zip(
+                        downloads, futures, strict=True
+                    ):
+                        member = zipfile.ZipInfo(filename, date_time=cls._ZIP_DATE_TIME)
+                        member.compress_type = zipfile.ZIP_DEFLATED
+                        member.external_attr = 0o644 << 16
+                        with future.result().open("rb") as src, zip_file.open(
+                            member, mode="w"
+                        ) as dst:
+                            for chunk in iter(lambda: src.read(1 << 16), b""):
+                                if tabs_to_commas:
+                                    chunk = chunk.replace(b"\t", b",")
+                                dst.write(chunk)
+            finally:
+                for future in futures:
+                    future.cancel()
         return zip_path
 
 
 class HgncGeneGroupNxoLoader:
     @classmethod
+    @instrumented(count=lambda tables: {name: len(df) for name, df in tables.items()})
     def load_tables(cls) -> dict[str, pd.DataFrame]:
         zip_path = HgncGeneGroupDownloader.download_zip()
         with zipfile.ZipFile(zip_path, mode="r") as zip_file:
@@ -71,15 +112,26 @@ class HgncGeneGroupNxoLoader:
             }
 
     @classmethod
-    def export_hgnc_outputs(cls) -> None:
-        tables = HgncGeneGroupNxoLoader.load_tables()
-        nxo = cls._create_nxo_from_tables(tables)
-        # set a higher compression threshold, because the git diff will help monitor for changes.
-        write_ontology(
-            nxo=nxo, output_dir=get_hgnc_output_dir(), compression_threshold_mb=25.0
-        )
+    def export_hgnc_outputs(cls, offline: bool = False) -> None:
+        """
+        offline: build from cached source files without network access.
+        """
+        set_offline(offline)
+        output_dir = get_hgnc_output_dir()
+        with record_run(output_dir.joinpath("run_metrics.json"), source="hgnc"):
+            tables = HgncGeneGroupNxoLoader.load_tables()
+            nxo = cls._create_nxo_from_tables(tables)
+            # set a higher compression threshold, because the git diff will help monitor for changes.
+            write_ontology(
+                nxo=nxo,
+                output_dir=output_dir,
+                compression_threshold_mb=25.0,
+                closure=True,
+                node_metrics=True,
+            )
 
     @classmethod
+    @instrumented(count=count_ontology)
     def _create_nxo_from_tables(
         cls, tables: dict[str, pd.DataFrame]
     ) -> NXOntology[int]:
@@ -0,0 +1,67 @@
+import random
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+import requests
+
+from nxontology_data.conftest import LocalHttpServer
+from nxontology_data.hgnc import hgnc
+from nxontology_data.hgnc.hgnc import HgncGeneGroupDownloader
+
+
+@pytest.fixture
+def hgnc_server(
+    http_server: LocalHttpServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> LocalHttpServer:
+    """Serve stand-in HGNC files with random delays, so downloads finish out of order."""
+    for filename in HgncGeneGroupDownloader.FILENAMES:
+        body = f"id,name\n1,{filename}\n".encode()
+
+        def route(query: dict[str, list[str]], body: bytes = body) -> tuple[int, bytes]:
+            time.sleep(random.uniform(0, 0.05))
+            return 200, body
+
+        http_server.add_route(f"/hgnc/{filename}", route)
+    http_server.add_route(
+        "/custom", b"HGNC ID\tApproved symbol\nHGNC:5\tA1BG\nHGNC:37133\tA1BG-AS1\n"
+    )
+    monkeypatch.setattr(HgncGeneGroupDownloader, "BASE_URL", f"{http_server.url}/hgnc/")
+    monkeypatch.setattr(
+        HgncGeneGroupDownloader, "SYMBOL_URL", f"{http_server.url}/custom?format=text"
+    )
+    monkeypatch.setattr(hgnc, "get_hgnc_output_dir", lambda: tmp_path)
+    return http_server
+
+
+def test_download_zip(hgnc_server: LocalHttpServer) -> None:
+    zip_path = HgncGeneGroupDownloader.download_zip()
+    with zipfile.ZipFile(zip_path) as zip_file:
+        assert zip_file.namelist() == [
+            *HgncGeneGroupDownloader.FILENAMES,
+            "gene_symbols.csv",
+        ]
+        assert zip_file.read("family.csv") == b"id,name\n1,family.csv\n"
+        assert zip_file.read("gene_symbols.csv").decode().splitlines() == [
+            "HGNC ID,Approved symbol",
+            "HGNC:5,A1BG",
+            "HGNC:37133,A1BG-AS1",
+        ]
+    assert len(hgnc_server.requests) == len(HgncGeneGroupDownloader.FILENAMES) + 1
+
+
+def test_download_zip_deterministic(hgnc_server: LocalHttpServer) -> None:
+    zip_path = HgncGeneGroupDownloader.download_zip(max_workers=8)
+    with zipfile.ZipFile(zip_path) as zip_file:
+        assert {info.date_time for info in zip_file.infolist()} == {
+            HgncGeneGroupDownloader._ZIP_DATE_TIME
+        }
+    zip_bytes = zip_path.read_bytes()
+    assert HgncGeneGroupDownloader.download_zip(max_workers=2).read_bytes() == zip_bytes
+
+
+def test_download_zip_http_error(hgnc_server: LocalHttpServer) -> None:
+    del hgnc_server.routes["/hgnc/family.csv"]
+    with pytest.raises(requests.HTTPError):
+        HgncGeneGroupDownloader.download_zip()
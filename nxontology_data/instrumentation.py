@@ -0,0 +1,154 @@
+import functools
+import json
+import logging
+import resource
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+def get_peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return max_rss / 1e6 if sys.platform == "darwin" else max_rss / 1e3
+
+
+@dataclass
+class StepMetrics:
+    """
+    Resource usage of an instrumented step.
+    cpu_seconds is the CPU time of the thread running the step,
+    such that concurrent steps in other threads are not included.
+    peak_rss_mb is the peak memory of the process when the step finished,
+    and peak_rss_increase_mb is how much the step raised it.
+    counts are sizes of the step's inputs or outputs, such as rows or nodes.
+    """
+
+    name: str
+    parent: str | None = None
+    started: str = ""
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    peak_rss_increase_mb: float = 0.0
+    counts: dict[str, int] = field(default_factory=dict)
+    error: str | None = None
+
+
+_lock = threading.Lock()
+_steps: list[StepMetrics] = []
+_local = threading.local()
+
+
+def reset_run_metrics() -> None:
+    """Clear recorded steps, such as at the start of a build."""
+    with _lock:
+        _steps.clear()
+
+
+def get_run_metrics() -> list[StepMetrics]:
+    """Steps recorded since the last reset, in the order they finished."""
+    with _lock:
+        return list(_steps)
+
+
+@contextmanager
+def measure(name: str) -> Iterator[StepMetrics]:
+    """
+    Record the wall time, CPU time, and memory of the enclosed block as a step.
+    Set counts on the yielded StepMetrics to record the size of the step.
+    Steps started within the block record this step as their parent.
+    """
+    stack: list[str] = _local.__dict__.setdefault("stack", [])
+    step = StepMetrics(
+        name=name,
+        parent=stack[-1] if stack else None,
+        started=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
+    start_rss = get_peak_rss_mb()
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    stack.append(name)
+    try:
+        yield step
+    except BaseException as e:
+        step.error = type(e).__name__
+        raise
+    finally:
+        stack.pop()
+        step.wall_seconds = time.perf_counter() - start_wall
+        step.cpu_seconds = time.thread_time() - start_cpu
+        step.peak_rss_mb = get_peak_rss_mb()
+        step.peak_rss_increase_mb = step.peak_rss_mb - start_rss
+        with _lock:
+            _steps.append(step)
+        logger.debug(
+            f"{name} took {step.wall_seconds:.1f}s "
+            f"with peak memory {step.peak_rss_mb:,.0f} MB"
+        )
+
+
+def instrumented(
+    name: str | None = None, count: Callable[[Any], dict[str, int]] | None = None
+) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """
+    Decorator to measure each call of a function as a step named name (default: qualified name).
+    count is called on the return value to get the counts of the step.
+    """
+
+    def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        step_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with measure(step_name) as step:
+                result = func(*args, **kwargs)
+                if count is not None:
+                    step.counts.update(count(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def write_run_metrics(path: Path, **metadata: Any) -> Path:
+    """
+    Write the steps recorded since the last reset to a JSON report,
+    along with metadata such as the source and version that was built.
+    """
+    steps = get_run_metrics()
+    report = {
+        **metadata,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "steps": [asdict(step) for step in steps],
+    }
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    logger.info(f"Wrote metrics for {len(steps):,} steps to {path}")
+    return path
+
+
+@contextmanager
+def record_run(path: Path, **metadata: Any) -> Iterator[None]:
+    """
+    Record the steps of a build to a JSON report at path,
+    which is written even when the build fails.
+    """
+    reset_run_metrics()
+    try:
+        with measure("total"):
+            yield
+    finally:
+        write_run_metrics(path, **metadata)
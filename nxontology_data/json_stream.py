@@ -0,0 +1,155 @@
+import codecs
+import json
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonStreamReader:
+    """
+    Incrementally parse a JSON document from an iterable of byte chunks,
+    such as `requests.Response.iter_content`.
+    Only the portion of the document currently being decoded is held in memory,
+    so large arrays can be consumed one item at a time with `iter_array_at`.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_chars: int = 1) -> bool:
+        """
+        Append at least min_chars of decoded text to the buffer,
+        discarding consumed text. Return False if the stream is exhausted.
+        """
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        target = len(self._buffer) + min_chars
+        added = False
+        while not self._eof and len(self._buffer) < target:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                self._buffer += self._text_decoder.decode(b"", final=True)
+            else:
+                self._buffer += self._text_decoder.decode(chunk)
+            added = True
+        return added
+
+    def _peek(self) -> str | None:
+        """Skip whitespace and return the next character without consuming it."""
+        while True:
+            while self._pos < len(self._buffer):
+                char = self._buffer[self._pos]
+                if char not in _WHITESPACE:
+                    return char
+                self._pos += 1
+            if not self._fill():
+                return None
+
+    def _next(self) -> str:
+        char = self._peek()
+        if char is None:
+            raise ValueError("Unexpected end of JSON stream")
+        self._pos += 1
+        return char
+
+    def _expect(self, expected: str) -> None:
+        char = self._next()
+        if char != expected:
+            raise ValueError(f"Expected {expected!r} but found {char!r} in JSON stream")
+
+    def read_value(self) -> Any:
+        """Decode and return the next complete JSON value."""
+        if self._peek() is None:
+            raise ValueError("Unexpected end of JSON stream")
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # value is incomplete: at least double the pending text and retry
+                if not self._fill(min_chars=max(len(self._buffer) - self._pos, 1)):
+                    raise
+                continue
+            # a number at the end of the buffer might continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Iterate over the keys of the next JSON object.
+        After each key is yielded, the caller must consume its value,
+        for example with `read_value`.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key but found {key!r}")
+            self._expect(":")
+            yield key
+            char = self._next()
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}' but found {char!r}")
+
+    def iter_array(self) -> Iterator[int]:
+        """
+        Iterate over the indexes of the next JSON array.
+        After each index is yielded, the caller must consume the item.
+        """
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            char = self._next()
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' but found {char!r}")
+            index += 1
+
+    def iter_array_at(
+        self,
+        path: Sequence[str | int],
+        siblings: dict[str, Any] | None = None,
+    ) -> Iterator[Any]:
+        """
+        Yield items of the array located at path, such as `["a", 0, "b"]` for `doc["a"][0]["b"]`.
+        Values of other keys in the object containing the array are added to siblings,
+        which is only complete once the generator is exhausted.
+        Values elsewhere in the document that are not on the path are decoded and discarded.
+        """
+        if not path:
+            for _ in self.iter_array():
+                yield self.read_value()
+            return
+        head, *rest = path
+        if isinstance(head, int):
+            for index in self.iter_array():
+                if index == head:
+                    yield from self.iter_array_at(rest, siblings)
+                else:
+                    self.read_value()
+            return
+        for key in self.iter_object():
+            if key == head:
+                yield from self.iter_array_at(rest, siblings)
+                continue
+            value = self.read_value()
+            if siblings is not None and not rest:
+                siblings[key] = value
@@ -0,0 +1,212 @@
+"""
+Index of normalized labels and synonyms to node identifiers for entity linking,
+stored as a sorted string table that is memory-mapped rather than loaded,
+such that opening an index is constant time and lookups are binary searches.
+
+File layout, with little-endian integers and arrays aligned to 8 bytes:
+an 8 byte magic, the arrays, a JSON header listing the offset, dtype, and length of each array,
+and the offset of the header as uint64.
+Entries are sorted by the UTF-8 bytes of their key, then identifier and tag.
+"""
+
+import itertools
+import json
+import logging
+import mmap
+import re
+import unicodedata
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_magic = b"NXLABEL1"
+_whitespace_pattern = re.compile(r"\s+")
+
+
+def normalize_label(label: str) -> str:
+    """Normalize a label for lookup with NFKC normalization, casefolding, and collapsed whitespace."""
+    label = unicodedata.normalize("NFKC", label).casefold()
+    return _whitespace_pattern.sub(" ", label).strip()
+
+
+@dataclass(frozen=True)
+class LabelMatch:
+    key: str
+    """Normalized label."""
+    id: str
+    tag: str
+    """Scope or lexical tag of the label, such as `exact` for EFO or `NON` for MeSH."""
+
+
+def _string_table(values: list[str]) -> tuple[npt.NDArray[np.uint64], bytes]:
+    """Offsets and concatenated UTF-8 bytes of values."""
+    encoded = [value.encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def _write_aligned(write_file: BinaryIO, data: bytes) -> int:
+    """Write data at the next offset that is a multiple of 8, returning that offset."""
+    write_file.write(b"\0" * (-write_file.tell() % 8))
+    offset = write_file.tell()
+    write_file.write(data)
+    return offset
+
+
+def write_label_index(label_df: pd.DataFrame, path: Path) -> Path:
+    """
+    Write an index of label_df, with label, id, and tag columns, to path.
+    Labels are normalized with `normalize_label` and duplicate entries are removed.
+    """
+    df = (
+        label_df[["label", "id", "tag"]]
+        .dropna(subset=["label", "id"])
+        .fillna({"tag": ""})
+        .astype(str)
+        .assign(key=lambda df: df["label"].map(normalize_label))
+        .query("key != ''")
+        .drop_duplicates(["key", "id", "tag"])
+    )
+    df["key_bytes"] = df["key"].map(str.encode)
+    df = df.sort_values(["key_bytes", "id", "tag"], ignore_index=True)
+    ids = sorted(set(df["id"]))
+    tags = sorted(set(df["tag"]))
+    key_offsets, keys = _string_table(df["key"].tolist())
+    id_offsets, id_blob = _string_table(ids)
+    arrays: dict[str, tuple[np.dtype[Any], bytes]] = {
+        "key_offsets": (key_offsets.dtype, key_offsets.tobytes()),
+        "keys": (np.dtype(np.uint8), keys),
+        "entry_ids": (
+            np.dtype(np.uint32),
+            df["id"]
+            .map({id_: i for i, id_ in enumerate(ids)})
+            .to_numpy(np.uint32)
+            .tobytes(),
+        ),
+        "entry_tags": (
+            np.dtype(np.uint16),
+            df["tag"]
+            .map({tag: i for i, tag in enumerate(tags)})
+            .to_numpy(np.uint16)
+            .tobytes(),
+        ),
+        "id_offsets": (id_offsets.dtype, id_offsets.tobytes()),
+        "ids": (np.dtype(np.uint8), id_blob),
+    }
+    header: dict[str, Any] = {"n_entries": len(df), "tags": tags, "arrays": {}}
+    # the header records array offsets, so it is written after the arrays
+    with path.open("wb") as write_file:
+        write_file.write(_magic)
+        for name, (dtype, data) in arrays.items():
+            offset = _write_aligned(write_file, data)
+            header["arrays"][name] = {
+                "offset": offset,
+                "dtype": dtype.str,
+                "count": len(data) // dtype.itemsize,
+            }
+        header_offset = _write_aligned(
+            write_file, json.dumps(header, sort_keys=True).encode()
+        )
+        write_file.write(np.uint64(header_offset).tobytes())
+    logger.info(f"Wrote {len(df):,} labels of {len(ids):,} identifiers to {path}")
+    return path
+
+
+class LabelIndex:
+    """
+    Read-only memory-mapped label index written by `write_label_index`.
+    Use as a context manager or call close to unmap the file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with path.open("rb") as read_file:
+            self._mmap = mmap.mmap(read_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(_magic)] != _magic:
+            raise ValueError(f"{path} is not a label index.")
+        header_offset = int(
+            np.frombuffer(self._mmap, np.uint64, 1, len(self._mmap) - 8)[0]
+        )
+        header = json.loads(self._mmap[header_offset:-8])
+        self.tags: list[str] = header["tags"]
+        self._n_entries: int = header["n_entries"]
+        arrays = {
+            name: np.frombuffer(
+                self._mmap, np.dtype(spec["dtype"]), spec["count"], spec["offset"]
+            )
+            for name, spec in header["arrays"].items()
+        }
+        self._key_offsets = arrays["key_offsets"]
+        self._keys_start = header["arrays"]["keys"]["offset"]
+        self._entry_ids = arrays["entry_ids"]
+        self._entry_tags = arrays["entry_tags"]
+        self._id_offsets = arrays["id_offsets"]
+        self._ids_start = header["arrays"]["ids"]["offset"]
+
+    def __len__(self) -> int:
+        return self._n_entries
+
+    def __enter__(self) -> "LabelIndex":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # arrays are views of the memory map, which must be released before closing
+        del self._key_offsets, self._entry_ids, self._entry_tags, self._id_offsets
+        self._mmap.close()
+
+    def _key(self, i: int) -> bytes:
+        start = self._keys_start + int(self._key_offsets[i])
+        return self._mmap[start : self._keys_start + int(self._key_offsets[i + 1])]
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Position of the first entry whose key is not less than key."""
+        low, high = 0, self._n_entries
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _match(self, i: int) -> LabelMatch:
+        id_index = int(self._entry_ids[i])
+        id_start = self._ids_start + int(self._id_offsets[id_index])
+        id_stop = self._ids_start + int(self._id_offsets[id_index + 1])
+        return LabelMatch(
+            key=self._key(i).decode(),
+            id=self._mmap[id_start:id_stop].decode(),
+            tag=self.tags[int(self._entry_tags[i])],
+        )
+
+    def _iter_matches(self, start: int, stop_key: bytes) -> Iterator[LabelMatch]:
+        for i in range(start, self._n_entries):
+            if self._key(i) >= stop_key:
+                break
+            yield self._match(i)
+
+    def lookup(self, label: str) -> list[LabelMatch]:
+        """Entries whose normalized label equals the normalized label."""
+        key = normalize_label(label).encode()
+        # the null byte sorts immediately after key and does not occur in labels
+        return list(self._iter_matches(self._lower_bound(key), key + b"\0"))
+
+    def prefix(self, prefix: str, limit: int | None = None) -> list[LabelMatch]:
+        """
+        Entries whose normalized label starts with the normalized prefix,
+        sorted by label, returning at most limit entries.
+        """
+        key = normalize_label(prefix).encode()
+        # 0xFF does not occur in UTF-8, so it sorts after every key starting with the prefix
+        matches = self._iter_matches(self._lower_bound(key), key + b"\xff")
+        return list(itertools.islice(matches, limit))
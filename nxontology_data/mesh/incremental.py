@@ -0,0 +1,276 @@
+"""
+Incremental MeSH builds that update the tables of a previous release.
+The N-Triples of a release are indexed by record (Descriptor, Qualifier, or Supplementary Concept Record)
+by hashing the triples of each record and the concepts, terms, tree numbers, and
+descriptor-qualifier pairs it owns, ignoring the release year in URIs.
+Only records whose hash changed are parsed by rdflib and queried,
+and their rows replace those of the previous release's tables.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from collections.abc import Collection, Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import fsspec
+import pandas as pd
+import rdflib
+
+logger = logging.getLogger(__name__)
+
+_MESH = "http://id.nlm.nih.gov/mesh/"
+_MESHV = "http://id.nlm.nih.gov/mesh/vocab#"
+_year_pattern = re.compile(rf"{re.escape(_MESH)}[0-9]{{4}}/")
+_record_pattern = re.compile(r"^[CDQ][0-9]+$")
+_owned_object_predicates = {
+    f"<{_MESHV}{name}>"
+    for name in ["preferredConcept", "concept", "preferredTerm", "term", "treeNumber"]
+}
+"""Predicates whose object is owned by the owner of the subject."""
+_owner_object_predicate = f"<{_MESHV}hasDescriptor>"
+"""Predicate whose object owns the subject, i.e. descriptors own their qualifier pairs."""
+
+
+def _local_name(term: str) -> str | None:
+    """Local name of a MeSH resource such as `<http://id.nlm.nih.gov/mesh/D000001>`."""
+    if not term.startswith(f"<{_MESH}") or term.startswith(f"<{_MESHV}"):
+        return None
+    return term[1:-1].rsplit("/", 1)[1]
+
+
+def _iter_triples(
+    nt_path: str, compression: str | None
+) -> Iterator[tuple[str, str, str, str, str]]:
+    """
+    Yield the line, year-normalized line, subject, predicate, and object of each triple.
+    Terms are in N-Triples syntax, with the year removed from MeSH URIs.
+    """
+    with fsspec.open(nt_path, "rt", compression=compression) as read_file:
+        for line in read_file:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            normalized = _year_pattern.sub(_MESH, line)
+            subject, predicate, obj = normalized.split(" ", 2)
+            yield line, normalized, subject, predicate, obj.removesuffix(" .")
+
+
+@dataclass
+class MeshRecordIndex:
+    """
+    Index of the records in a MeSH release.
+    hashes maps record identifiers to a hash of the triples the record owns.
+    owners maps the local names of owned resources, including records themselves, to their record.
+    """
+
+    year: str
+    hashes: dict[str, str]
+    owners: dict[str, str]
+
+    def owner(self, local_name: str) -> str | None:
+        return self.owners.get(local_name)
+
+
+def _get_owner(name: str, parents: dict[str, str]) -> str | None:
+    """Follow owning resources from name to a record, since terms are owned by concepts."""
+    owner: str | None = name
+    for _ in range(3):
+        if owner is None or _record_pattern.match(owner):
+            return owner
+        owner = parents.get(owner)
+    return None
+
+
+def index_mesh_records(
+    nt_path: str, compression: str | None, year_yyyy: str
+) -> MeshRecordIndex:
+    """
+    Index MeSH triples by record while streaming the N-Triples file,
+    which is much faster than parsing the triples with rdflib.
+    Record hashes do not depend on the order of triples in the file.
+    """
+    subject_hashes: dict[str, int] = {}
+    parents: dict[str, str] = {}
+    for _, normalized, subject, predicate, obj in _iter_triples(nt_path, compression):
+        name = _local_name(subject)
+        if name is None:
+            continue
+        digest = hashlib.sha256(normalized.encode()).digest()
+        subject_hashes[name] = (
+            subject_hashes.get(name, 0) + int.from_bytes(digest[:8], "big")
+        ) % 2**64
+        obj_name = _local_name(obj)
+        if obj_name is None:
+            continue
+        if predicate in _owned_object_predicates:
+            parents[obj_name] = name
+        elif predicate == _owner_object_predicate:
+            parents[name] = obj_name
+    owners = {}
+    for name in subject_hashes:
+        if (owner := _get_owner(name, parents)) is not None:
+            owners[name] = owner
+    record_hashes: dict[str, int] = {}
+    for name, owner in owners.items():
+        digest = hashlib.sha256(f"{name} {subject_hashes[name]}".encode()).digest()
+        record_hashes[owner] = (
+            record_hashes.get(owner, 0) + int.from_bytes(digest[:8], "big")
+        ) % 2**64
+    if n_unowned := len(subject_hashes) - len(owners):
+        logger.warning(f"{n_unowned:,} MeSH resources are not owned by a record.")
+    logger.info(f"Indexed {len(record_hashes):,} MeSH {year_yyyy} records")
+    return MeshRecordIndex(
+        year=year_yyyy,
+        hashes={record: f"{value:016x}" for record, value in record_hashes.items()},
+        owners=owners,
+    )
+
+
+@dataclass
+class MeshChangelog:
+    """Identifiers of MeSH records added, removed, and modified since the previous release."""
+
+    year: str
+    previous_year: str
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> set[str]:
+        return {*self.added, *self.removed, *self.modified}
+
+
+def diff_mesh_records(
+    index: MeshRecordIndex, previous_index: MeshRecordIndex
+) -> MeshChangelog:
+    hashes, previous = index.hashes, previous_index.hashes
+    changelog = MeshChangelog(
+        year=index.year,
+        previous_year=previous_index.year,
+        added=sorted(hashes.keys() - previous.keys()),
+        removed=sorted(previous.keys() - hashes.keys()),
+        modified=sorted(
+            record
+            for record in hashes.keys() & previous.keys()
+            if hashes[record] != previous[record]
+        ),
+    )
+    logger.info(
+        f"MeSH {changelog.previous_year} to {changelog.year}: "
+        f"{len(changelog.added):,} added, {len(changelog.removed):,} removed, "
+        f"{len(changelog.modified):,} modified records"
+    )
+    return changelog
+
+
+def get_pair_dependents(
+    pairs_df: pd.DataFrame, index: MeshRecordIndex, records: Collection[str]
+) -> set[str]:
+    """
+    Descriptors whose descriptor-qualifier pair rows include labels of records,
+    via the qualifier or the useInstead resource of a pair.
+    """
+    records = set(records)
+    use_instead_owners = (
+        pairs_df["use_instead_uri"]
+        .dropna()
+        .map(lambda uri: index.owner(str(uri).rsplit("/", 1)[1]))
+    )
+    dependent = pairs_df["qualifier_id"].isin(records) | use_instead_owners.reindex(
+        pairs_df.index
+    ).isin(records)
+    return set(pairs_df.loc[dependent, "descriptor_id"])
+
+
+def write_changelog(changelog: MeshChangelog, path: Path) -> Path:
+    path.write_text(json.dumps(asdict(changelog), indent=2) + "\n")
+    return path
+
+
+def read_record_rdf(
+    vocab_path: str,
+    nt_path: str,
+    compression: str | None,
+    index: MeshRecordIndex,
+    records: Collection[str],
+) -> rdflib.Graph:
+    """
+    Read the MeSH vocabulary and the triples owned by records into rdflib.
+    Also reads triples about resources that those triples refer to, up to two steps away,
+    such as parent descriptors and the qualifiers of parent descriptor-qualifier pairs,
+    which queries require to complete the rows of records.
+    Rows for resources that are not owned by records should be ignored.
+    """
+    records = set(records)
+    frontier = {name for name, owner in index.owners.items() if owner in records}
+    loaded: set[str] = set()
+    lines = []
+    for _ in range(3):
+        referenced = set()
+        for line, _, subject, _, obj in _iter_triples(nt_path, compression):
+            if _local_name(subject) in frontier:
+                lines.append(line)
+                if (obj_name := _local_name(obj)) is not None:
+                    referenced.add(obj_name)
+        loaded |= frontier
+        frontier = referenced - loaded
+        if not frontier:
+            break
+    logger.info(f"Loading {len(lines):,} triples for {len(records):,} MeSH records")
+    rdf = rdflib.Graph()
+    rdf.namespace_manager.bind("meshv", _MESHV)
+    with fsspec.open(vocab_path, "rt") as src:
+        rdf.parse(source=src, format="n3")
+    rdf.parse(data="\n".join(lines), format="nt")
+    return rdf
+
+
+_uri_columns = [
+    "mesh_uri",
+    "parent_uri",
+    "parent_qualified_uri",
+    "pair_uri",
+    "use_instead_uri",
+]
+"""Columns of MeSH tables whose URIs include the release year."""
+
+
+def splice_table(
+    previous_df: pd.DataFrame,
+    previous_index: MeshRecordIndex,
+    records_df: pd.DataFrame,
+    index: MeshRecordIndex,
+    records: Collection[str],
+    key: str,
+    sort_by: list[str],
+    ascending: bool | list[bool] = True,
+) -> pd.DataFrame:
+    """
+    Replace the rows of previous_df owned by records with the rows of records_df owned by records,
+    where key is the column identifying the resource that owns a row, such as mesh_id.
+    records_df is queried from `read_record_rdf`, such that it can include rows of other records.
+    URIs in previous rows are updated to the year of index,
+    and rows are sorted like the ORDER BY of the query that created the table.
+    """
+    records = set(records)
+    keep = ~previous_df[key].map(previous_index.owner).isin(records)
+    previous_df = previous_df[keep].copy()
+    for column in _uri_columns:
+        if column in previous_df:
+            previous_df[column] = previous_df[column].map(
+                lambda x: (
+                    _year_pattern.sub(f"{_MESH}{index.year}/", x)
+                    if isinstance(x, str)
+                    else x
+                )
+            )
+    records_df = records_df[records_df[key].map(index.owner).isin(records)]
+    return (
+        pd.concat([previous_df, records_df], ignore_index=True)
+        .sort_values(sort_by, ascending=ascending, kind="stable")
+        .reset_index(drop=True)
+    )
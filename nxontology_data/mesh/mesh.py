@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 import functools
+import inspect
 import json
 import logging
 import pathlib
 import re
-import tempfile
+from collections.abc import Callable, Iterable
 from enum import Enum
-from urllib.request import urlretrieve
 
 import bioversions
 import fsspec
@@ -15,10 +15,31 @@ import networkx as nx
 import nxontology
 import pandas as pd
 import rdflib
+from fsspec.utils import infer_compression
 from nxontology import NXOntology
 from rdflib.term import URIRef
 
+from nxontology_data import node_data, node_index, utils
+from nxontology_data.cache import get_file_sha256, get_source_cache, set_offline
+from nxontology_data.closure import compute_closure, write_closure
+from nxontology_data.instrumentation import instrumented, measure, record_run
+from nxontology_data.label_index import normalize_label, write_label_index
+from nxontology_data.mesh.incremental import (
+    MeshChangelog,
+    MeshRecordIndex,
+    diff_mesh_records,
+    get_pair_dependents,
+    index_mesh_records,
+    read_record_rdf,
+    splice_table,
+    write_changelog,
+)
+from nxontology_data.node_data import NodeTable, add_table_nodes, derive_ontology
+from nxontology_data.node_metrics import compute_node_metrics
+from nxontology_data.scheduler import Task, format_report, run_tasks
+from nxontology_data.stages import Code, Pipeline, Stage, get_checkpoint_dir
 from nxontology_data.utils import (
+    count_ontology,
     get_source_output_dir,
     sparql_results_to_df,
     write_dataframe,
@@ -76,40 +97,81 @@ class MeshLoader:
     MESH_RDF_ROOT = "https://nlmpubs.nlm.nih.gov/projects/mesh/rdf"
 
     @classmethod
-    def get_mesh_rdf(cls, year_yyyy: str) -> rdflib.Graph:
+    def fetch_mesh_rdf(cls, year_yyyy: str) -> tuple[pathlib.Path, pathlib.Path]:
         """
-        Read MeSH into rdflib from the MeSH RDF FPT site.
+        Fetch MeSH RDF files from the MeSH RDF FPT site to the source cache.
         https://www.nlm.nih.gov/databases/download/mesh.html
+        Returns local paths to the vocabulary (Turtle) and triples (gzipped N-Triples).
         """
         # The .nt.gz file is around 115 MB.
         # Reading from HTTPS/FTP to rdflib was causing timeout errors,
-        # so using a local temporary directory instead.
-        temp_dir = tempfile.mkdtemp(suffix="_nxontology_data_mesh")
-        logging.info(f"Copying mesh rdf files to {temp_dir}")
-        nt_filename = f"mesh{year_yyyy}.nt.gz"
-        for filename in "vocabulary_1.0.0.ttl", nt_filename:
-            url = f"{cls.MESH_RDF_ROOT}/{year_yyyy}/{filename}"
-            urlretrieve(url, f"{temp_dir}/{filename}")
-        return cls._read_mesh_rdf(directory=temp_dir, nt_filename=nt_filename)
+        # so reading from local copies in the source cache instead.
+        cache = get_source_cache()
+        logger.info(f"Fetching mesh {year_yyyy} rdf files to {cache.root}")
+        vocab_path, nt_path = (
+            cache.fetch(f"{cls.MESH_RDF_ROOT}/{year_yyyy}/{filename}")
+            for filename in cls._get_rdf_filenames(year_yyyy)
+        )
+        return vocab_path, nt_path
 
     @staticmethod
-    @functools.cache
-    def _read_mesh_rdf(directory: str, nt_filename: str) -> rdflib.Graph:
+    def _get_rdf_filenames(year_yyyy: str) -> tuple[str, str]:
+        return "vocabulary_1.0.0.ttl", f"mesh{year_yyyy}.nt.gz"
+
+    @classmethod
+    def get_mesh_rdf(cls, year_yyyy: str) -> rdflib.Graph:
+        """
+        Read MeSH into rdflib from the MeSH RDF FPT site.
+        """
+        vocab_path, nt_path = cls.fetch_mesh_rdf(year_yyyy)
+        return cls._read_mesh_rdf_files(
+            vocab_path.as_posix(), nt_path.as_posix(), nt_compression="gzip"
+        )
+
+    @classmethod
+    def _read_mesh_rdf(cls, directory: str, nt_filename: str) -> rdflib.Graph:
         """
         directory: local directory with raw MeSH RDF files.
         """
-        logger.info(f"Loading MeSH into rdflib from {directory}")
-        rdf = rdflib.Graph()
-        rdf.namespace_manager.bind("meshv", "http://id.nlm.nih.gov/mesh/vocab#")
+        return cls._read_mesh_rdf_files(
+            vocab_path=f"{directory}/vocabulary_1.0.0.ttl",
+            nt_path=f"{directory}/{nt_filename}",
+            nt_compression=infer_compression(nt_filename),
+        )
+
+    @staticmethod
+    @functools.cache
+    def _read_mesh_vocabulary(vocab_path: str) -> rdflib.Graph:
+        """
+        Read the MeSH vocabulary (Turtle) into rdflib, caching the graph by path.
+        Source cache paths are content-addressed, so releases with the same vocabulary share a graph,
+        including processes forked after the vocabulary is read, such as by `export_mesh_batch`.
+        """
+        logger.info(f"Loading MeSH vocabulary into rdflib from {vocab_path}")
+        vocab = rdflib.Graph()
         # load MeSH vocabulary (takes ~2 seconds)
-        with fsspec.open(f"{directory}/vocabulary_1.0.0.ttl", "rt") as src:
+        with fsspec.open(vocab_path, "rt") as src:
             # https://github.com/HHS/meshrdf/issues/153
-            rdf.parse(source=src, format="n3")
+            vocab.parse(source=src, format="n3")
+        return vocab
+
+    @staticmethod
+    @functools.cache
+    @instrumented(count=lambda rdf: {"triples": len(rdf)})
+    def _read_mesh_rdf_files(
+        vocab_path: str, nt_path: str, nt_compression: str | None
+    ) -> rdflib.Graph:
+        """
+        Read the MeSH vocabulary (Turtle) and triples (N-Triples) into rdflib.
+        Paths do not need file extensions, such as for files in the source cache,
+        since the compression of the triples is specified by nt_compression.
+        """
+        rdf = rdflib.Graph()
+        rdf.namespace_manager.bind("meshv", "http://id.nlm.nih.gov/mesh/vocab#")
+        rdf += MeshLoader._read_mesh_vocabulary(vocab_path)
         # load MeSH triples (takes ~30 minutes)
-        logger.info(f"Loading triples from {nt_filename}")
-        with fsspec.open(
-            f"{directory}/{nt_filename}", mode="rb", compression="infer"
-        ) as src:
+        logger.info(f"Loading triples from {nt_path}")
+        with fsspec.open(nt_path, mode="rb", compression=nt_compression) as src:
             # read in binary mode https://github.com/RDFLib/rdflib/issues/1144
             rdf.parse(source=src, format="nt")
         # When directory is an HTTPS or FTP URL, we encountered several issues:
@@ -141,8 +203,11 @@ class MeshLoader:
         if cache and not hasattr(rdf, "cached_query"):
             rdf.cached_query = functools.cache(rdf.query)
         query = cls._get_query(name)
-        results = (rdf.cached_query if cache else rdf.query)(query)
-        return sparql_results_to_df(results)
+        with measure(f"run_query:{name}") as step:
+            results = (rdf.cached_query if cache else rdf.query)(query)
+            df = sparql_results_to_df(results)
+            step.counts["rows"] = len(df)
+        return df
 
     @staticmethod
     def _mesh_uri_to_id(uri: URIRef) -> str:
@@ -227,6 +292,16 @@ class MeshLoader:
             cls.get_concept_relation_df(rdf), how="left", on=["mesh_id", "concept_id"]
         )
 
+    @staticmethod
+    def get_label_df(synonym_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Get the term labels of MeSH nodes tagged by their lexical tag
+        for `write_label_index`.
+        """
+        return synonym_df.rename(
+            columns={"term_label": "label", "mesh_id": "id", "term_lexical_tag": "tag"}
+        )[["label", "id", "tag"]]
+
     @classmethod
     def get_descriptor_qualifier_pairs_df(cls, rdf: rdflib.Graph) -> pd.DataFrame:
         return cls.run_query(rdf, "descriptor-qualifier-pairs")
@@ -249,6 +324,29 @@ class MeshLoader:
     def create_nxo(
         cls, rdf: rdflib.Graph, year_yyyy: str
     ) -> tuple[NXOntology[str], pd.DataFrame]:
+        id_df = cls.get_identifier_df(rdf)
+        edge_df = cls.get_edge_df(rdf=rdf)
+        nxo = cls.create_nxo_from_tables(
+            id_df=id_df, edge_df=edge_df, year_yyyy=year_yyyy
+        )
+        return nxo, id_df
+
+    @classmethod
+    @instrumented(count=count_ontology)
+    def create_nxo_from_tables(
+        cls,
+        id_df: pd.DataFrame,
+        edge_df: pd.DataFrame,
+        year_yyyy: str,
+        columnar: bool = False,
+    ) -> NXOntology[str]:
+        """
+        Create the full MeSH NXOntology from the outputs of
+        `get_identifier_df` and `get_edge_df`.
+        Enable columnar to store node attributes in a shared `NodeTable`,
+        with each node's attributes a `NodeData` view of its row rather than a dictionary,
+        which reduces memory for the hundreds of thousands of MeSH nodes.
+        """
         nxo: NXOntology[str] = NXOntology()
         nxo.graph.graph["name"] = "mesh_full"
         nxo.graph.graph["description"] = (
@@ -262,18 +360,16 @@ class MeshLoader:
             node_url_attribute="mesh_uri",
         )
         # add nodes
-        id_df = cls.get_identifier_df(rdf)
         # Use .to_json and not .to_dict to convert NaN to None
         _node_classes = [e.value for e in MeshNodeClassEnum]
-        for row in json.loads(
-            id_df[cls._node_attrs]
-            .query("mesh_class in @_node_classes")
-            .to_json(orient="records")
-        ):
-            mesh_id = row["mesh_id"]
-            nxo.add_node(mesh_id, **row)
+        node_df = id_df[cls._node_attrs].query("mesh_class in @_node_classes")
+        if columnar:
+            add_table_nodes(nxo, NodeTable.from_df(node_df), id_column="mesh_id")
+        else:
+            for row in json.loads(node_df.to_json(orient="records")):
+                mesh_id = row["mesh_id"]
+                nxo.add_node(mesh_id, **row)
         # add edges
-        edge_df = cls.get_edge_df(rdf=rdf)
         for edge in edge_df.itertuples():
             try:
                 nxo.add_edge(
@@ -286,13 +382,15 @@ class MeshLoader:
             except nxontology.exceptions.NodeNotFound:
                 logger.error(f"Edge {edge} not added to nxo")
                 pass
-        return nxo, id_df
+        return nxo
 
     @classmethod
+    @instrumented(count=count_ontology)
     def create_topical_descriptor_nxo(cls, nxo: NXOntology[str]) -> NXOntology[str]:
         """
         Create a new NXOntology that is a subgraph of the input nxo
-        where only nodes that descend from a Topical Descriptor are retained.
+        where only nodes that descend from a Topical Descriptor are retained,
+        sharing node attributes with nxo (see `derive_ontology`).
         """
         topical_descriptor_descendants = set()
         for node in nxo.roots:
@@ -300,13 +398,13 @@ class MeshLoader:
             if info.data["mesh_class"] != "TopicalDescriptor":
                 continue
             topical_descriptor_descendants |= info.descendants
-        graph_desc = nxo.graph.subgraph(topical_descriptor_descendants).copy()
-        graph_desc.graph["name"] = "mesh_topical_descriptor_descendants"
-        graph_desc.graph["description"] = (
+        nxo_desc = derive_ontology(nxo, topical_descriptor_descendants)
+        nxo_desc.graph.graph["name"] = "mesh_topical_descriptor_descendants"
+        nxo_desc.graph.graph["description"] = (
             "Medical Subject Headings as an ontology, "
             "retaining only nodes that descend from a Topical Descriptor."
         )
-        return NXOntology(graph_desc)
+        return nxo_desc
 
     @classmethod
     def create_vocab_digraph(cls, rdf: rdflib.Graph) -> nx.DiGraph:
@@ -317,40 +415,113 @@ class MeshLoader:
         return nx_subclass
 
     @classmethod
-    def create_top_level_map_df(cls, nxo: NXOntology[str]) -> pd.DataFrame:
+    @instrumented(count=lambda df: {"rows": len(df)})
+    def create_top_level_map_df(
+        cls, nxo: NXOntology[str], nodes: Iterable[str] | None = None
+    ) -> pd.DataFrame:
         """
         Create a table of mesh_id-top_mesh_id pairs.
         Used to associate mesh terms with their top-level categories.
         Includes a `top_is_disease` column based on whether the top-level category
         is a recognized disease category. Filter for `top_is_disease` to get
         assignments of just diseases to their therapeutic areas.
+        nodes restricts rows to a subset of nodes (default: all nodes).
         """
-        nxo.freeze()
-        rows = []
-        for node in nxo.graph:
-            info = nxo.node_info(node)
-            for root in info.roots:
-                root_info = nxo.node_info(root).data
-                if root_info["mesh_class"] != "TopicalDescriptor":
-                    continue
-                (tree_number,) = root_info["tree_numbers"]
-                rows.append(
-                    {
-                        "mesh_id": info.data["mesh_id"],
-                        "mesh_label": info.data["mesh_label"],
-                        "mesh_class": info.data["mesh_class"],
-                        "top_mesh_id": root,
-                        "top_tree_number": tree_number,
-                        "top_mesh_label": root_info["mesh_label"],
-                        "top_is_disease": cls._is_disease(tree_number),
-                        "depth": nx.shortest_path_length(nxo.graph, root, node),
-                    }
-                )
-        return pd.DataFrame(rows).sort_values(
+        closure = compute_closure(nxo)
+        top_rows = []
+        for root in nxo.roots:
+            root_info = nxo.graph.nodes[root]
+            if root_info["mesh_class"] != "TopicalDescriptor":
+                continue
+            (tree_number,) = root_info["tree_numbers"]
+            top_rows.append(
+                {
+                    "ancestor": closure.index(root),
+                    "top_mesh_id": root,
+                    "top_tree_number": tree_number,
+                    "top_mesh_label": root_info["mesh_label"],
+                    "top_is_disease": cls._is_disease(tree_number),
+                }
+            )
+        top_df = pd.DataFrame(
+            top_rows,
+            columns=[
+                "ancestor",
+                "top_mesh_id",
+                "top_tree_number",
+                "top_mesh_label",
+                "top_is_disease",
+            ],
+        )
+        # pairs of nodes and their top-level ancestors from the closure
+        pairs = pd.DataFrame(
+            {
+                "node": closure.pair_nodes(),
+                "ancestor": closure.ancestors,
+                "depth": closure.distances.astype(int),
+            }
+        )
+        pairs = pairs[pairs["ancestor"].isin(top_df["ancestor"])]
+        if nodes is not None:
+            pairs = pairs[pairs["node"].isin([closure.index(node) for node in nodes])]
+        node_data = nxo.graph.nodes
+        node_ids = closure.ids[pairs["node"]].tolist()
+        df = pd.DataFrame(
+            {
+                column: [node_data[node][column] for node in node_ids]
+                for column in ["mesh_id", "mesh_label", "mesh_class"]
+            }
+        ).assign(ancestor=pairs["ancestor"].to_numpy(), depth=pairs["depth"].to_numpy())
+        df = df.merge(top_df, on="ancestor", how="left")[cls._top_columns]
+        return cls._sort_top_level_map_df(df)
+
+    _top_columns = [
+        "mesh_id",
+        "mesh_label",
+        "mesh_class",
+        "top_mesh_id",
+        "top_tree_number",
+        "top_mesh_label",
+        "top_is_disease",
+        "depth",
+    ]
+
+    @staticmethod
+    def _sort_top_level_map_df(df: pd.DataFrame) -> pd.DataFrame:
+        return df.sort_values(
             ["top_tree_number", "depth", "mesh_class", "mesh_id"],
             ascending=[True, True, False, True],
         )
 
+    @classmethod
+    @instrumented(count=lambda df: {"rows": len(df)})
+    def update_top_level_map_df(
+        cls,
+        nxo: NXOntology[str],
+        previous_nxo: NXOntology[str],
+        previous_df: pd.DataFrame,
+        changelog: MeshChangelog,
+    ) -> pd.DataFrame:
+        """
+        Update the top-level map of the previous release's topical descriptor ontology.
+        Only rows for changed records and their descendants in either release are recreated,
+        since the top-level categories of other nodes are unchanged.
+        """
+        affected = set()
+        for graph in nxo.graph, previous_nxo.graph:
+            for node in changelog.changed & set(graph):
+                affected |= {node, *nx.descendants(graph, node)}
+        keep = previous_df.mesh_id.isin(set(nxo.graph) - affected)
+        df = pd.concat(
+            [
+                previous_df[keep],
+                cls.create_top_level_map_df(
+                    nxo, nodes=sorted(affected & set(nxo.graph))
+                ),
+            ]
+        )
+        return cls._sort_top_level_map_df(df)
+
     @staticmethod
     def _is_disease(tree_number: str) -> bool:
         """
@@ -380,45 +551,503 @@ class MeshLoader:
         return False
 
     @classmethod
-    def export_mesh_outputs(cls, year_yyyy: str | None = None) -> None:
+    def _get_query_code(cls, stage_name: str) -> list[Code]:
+        """Code that versions a query stage in addition to its function."""
+        stage_code: dict[str, list[Code]] = {
+            "query_identifiers": [
+                cls.run_query,
+                cls._get_id_to_tree_numbers,
+                cls._get_query("identifiers"),
+                cls._get_query("tree-numbers"),
+            ],
+            "query_edges": [
+                cls.run_query,
+                cls._mesh_uri_to_id,
+                cls._get_query("edges"),
+            ],
+            "query_synonyms": [
+                cls.run_query,
+                cls.get_concept_relation_df,
+                cls._get_query("synonyms"),
+                cls._get_query("concept-relations"),
+            ],
+            "query_descriptor_qualifier_pairs": [
+                cls.run_query,
+                cls._get_query("descriptor-qualifier-pairs"),
+            ],
+        }
+        return stage_code[stage_name]
+
+    @classmethod
+    def _add_update_stages(
+        cls,
+        pipeline: Pipeline,
+        previous: Pipeline,
+        source: Stage[tuple[pathlib.Path, pathlib.Path]],
+        index: Stage[MeshRecordIndex],
+        nt_compression: str | None,
+    ) -> tuple[
+        Stage[pd.DataFrame],
+        Stage[pd.DataFrame],
+        Stage[pd.DataFrame],
+        Stage[pd.DataFrame],
+        Stage[MeshChangelog],
+    ]:
+        """
+        Add stages that update the query tables of the previous pipeline
+        with the rows of records that changed.
+        Records whose descriptor-qualifier pairs include labels of changed records,
+        such as a renamed qualifier, are also updated.
+        """
+        previous_index = previous.stages["index_records"]
+        changelog = pipeline.stage(
+            "diff_records", diff_mesh_records, index, previous_index
+        )
+        records = pipeline.stage(
+            "select_records",
+            lambda changelog, previous_index, previous_pairs_df: changelog.changed
+            | get_pair_dependents(previous_pairs_df, previous_index, changelog.changed),
+            changelog,
+            previous_index,
+            previous.stages["query_descriptor_qualifier_pairs"],
+            code=[get_pair_dependents],
+        )
+        rdf = pipeline.stage(
+            "parse",
+            lambda rdf_paths, index, records: read_record_rdf(
+                vocab_path=rdf_paths[0].as_posix(),
+                nt_path=rdf_paths[1].as_posix(),
+                compression=nt_compression,
+                index=index,
+                records=records,
+            ),
+            source,
+            index,
+            records,
+            code=[read_record_rdf],
+            persist=False,
+        )
+
+        def update_stage(
+            name: str,
+            query: Callable[[rdflib.Graph], pd.DataFrame],
+            key: str,
+            sort_by: list[str],
+            ascending: bool | list[bool] = True,
+        ) -> Stage[pd.DataFrame]:
+            return pipeline.stage(
+                name,
+                lambda previous_df, previous_index, rdf, index, records: splice_table(
+                    previous_df,
+                    previous_index,
+                    query(rdf),
+                    index,
+                    records,
+                    key=key,
+                    sort_by=sort_by,
+                    ascending=ascending,
+                ),
+                previous.stages[name],
+                previous_index,
+                rdf,
+                index,
+                records,
+                code=[splice_table, query, *cls._get_query_code(name)],
+                params={"key": key, "sort_by": sort_by, "ascending": ascending},
+            )
+
+        id_df = update_stage(
+            "query_identifiers", cls.get_identifier_df, "mesh_id", ["mesh_uri"]
+        )
+        edge_df = update_stage(
+            "query_edges",
+            cls.get_edge_df,
+            "child_id",
+            ["parent_uri", "parent_qualified_uri", "child_id", "relationship_type"],
+        )
+        synonym_df = update_stage(
+            "query_synonyms",
+            cls.get_synonym_df,
+            "mesh_id",
+            [
+                "mesh_id",
+                "concept_is_preferred",
+                "concept_id",
+                "term_is_preferred",
+                "term_id",
+                "term_label_is_preferred",
+                "term_label",
+            ],
+            [True, False, True, False, True, False, True],
+        )
+        pairs_df = update_stage(
+            "query_descriptor_qualifier_pairs",
+            cls.get_descriptor_qualifier_pairs_df,
+            "descriptor_id",
+            ["descriptor_id", "pair_allowed", "qualifier_id"],
+            [True, False, True],
+        )
+        return id_df, edge_df, synonym_df, pairs_df, changelog
+
+    @classmethod
+    def create_pipeline(
+        cls,
+        year_yyyy: str,
+        rdf_paths: tuple[pathlib.Path, pathlib.Path],
+        output_dir: pathlib.Path,
+        resume: bool = False,
+        nt_compression: str | None = "gzip",
+        previous: Pipeline | None = None,
+    ) -> Pipeline:
+        """
+        Create the pipeline of stages to export MeSH outputs
+        from the vocabulary and triples files returned by `fetch_mesh_rdf`.
+        previous is the pipeline of an earlier release to update incrementally,
+        such that only records that changed since that release are parsed and queried.
+        Its stages are resumed from checkpoints when possible,
+        and a changelog of added, removed, and modified records is written.
+        """
+        pipeline = Pipeline(get_checkpoint_dir("mesh", year_yyyy), resume=resume)
+        source = pipeline.source(
+            "fetch",
+            content_key=",".join(get_file_sha256(path) for path in rdf_paths),
+            value=rdf_paths,
+        )
+        vocab_path, nt_path = (path.as_posix() for path in rdf_paths)
+        index = pipeline.stage(
+            "index_records",
+            lambda rdf_paths: index_mesh_records(nt_path, nt_compression, year_yyyy),
+            source,
+            code=[index_mesh_records],
+        )
+        if previous is not None:
+            id_df, edge_df, synonym_df, pairs_df, changelog = cls._add_update_stages(
+                pipeline, previous, source, index, nt_compression
+            )
+        else:
+            rdf = pipeline.stage(
+                "parse",
+                lambda rdf_paths: cls._read_mesh_rdf_files(
+                    vocab_path, nt_path, nt_compression
+                ),
+                source,
+                code=[cls._read_mesh_rdf_files],
+                persist=False,
+            )
+            id_df = pipeline.stage(
+                "query_identifiers",
+                cls.get_identifier_df,
+                rdf,
+                code=cls._get_query_code("query_identifiers"),
+            )
+            edge_df = pipeline.stage(
+                "query_edges",
+                cls.get_edge_df,
+                rdf,
+                code=cls._get_query_code("query_edges"),
+            )
+            synonym_df = pipeline.stage(
+                "query_synonyms",
+                cls.get_synonym_df,
+                rdf,
+                code=cls._get_query_code("query_synonyms"),
+            )
+            pairs_df = pipeline.stage(
+                "query_descriptor_qualifier_pairs",
+                cls.get_descriptor_qualifier_pairs_df,
+                rdf,
+                code=cls._get_query_code("query_descriptor_qualifier_pairs"),
+            )
+        nxo = pipeline.stage(
+            "build_nxo_full",
+            lambda id_df, edge_df: cls.create_nxo_from_tables(
+                id_df=id_df, edge_df=edge_df, year_yyyy=year_yyyy, columnar=True
+            ),
+            id_df,
+            edge_df,
+            code=[cls.create_nxo_from_tables, inspect.getsource(node_data)],
+            params={"_node_attrs": cls._node_attrs},
+        )
+        nxo_desc = pipeline.stage(
+            "build_nxo_topical_descriptor",
+            cls.create_topical_descriptor_nxo,
+            nxo,
+            code=[inspect.getsource(node_data)],
+        )
+        if previous is not None:
+            top_map_df = pipeline.stage(
+                "build_top_level_map",
+                cls.update_top_level_map_df,
+                nxo_desc,
+                previous.stages["build_nxo_topical_descriptor"],
+                previous.stages["build_top_level_map"],
+                changelog,
+                code=[cls.create_top_level_map_df, cls._is_disease, compute_closure],
+            )
+        else:
+            top_map_df = pipeline.stage(
+                "build_top_level_map",
+                cls.create_top_level_map_df,
+                nxo_desc,
+                code=[cls._is_disease, compute_closure],
+            )
+        write_params = {"output_dir": output_dir.as_posix()}
+        pipeline.output(
+            "write_nxo_full",
+            lambda nxo: write_ontology(
+                nxo=nxo,
+                output_dir=output_dir,
+                closure=True,
+                node_metrics=True,
+                node_index=True,
+            ),
+            nxo,
+            code=[
+                write_ontology,
+                compute_closure,
+                write_closure,
+                compute_node_metrics,
+                inspect.getsource(node_index),
+            ],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_nxo_topical_descriptor",
+            lambda nxo: write_ontology(
+                nxo=nxo, output_dir=output_dir, closure=True, node_metrics=True
+            ),
+            nxo_desc,
+            code=[write_ontology, compute_closure, write_closure, compute_node_metrics],
+            params=write_params,
+        )
+        id_output_df = pipeline.stage(
+            "identifiers_in_nxos",
+            lambda id_df, nxo, nxo_desc: id_df.assign(
+                in_full_nxo=id_df.mesh_id.isin(set(nxo.graph)),
+                in_desc_nxo=id_df.mesh_id.isin(set(nxo_desc.graph)),
+            ),
+            id_df,
+            nxo,
+            nxo_desc,
+            persist=False,
+        )
+        pipeline.output(
+            "write_identifiers",
+            lambda df: write_dataframe(
+                df=df, path=output_dir.joinpath("mesh_identifiers.json.gz")
+            ),
+            id_output_df,
+            code=[write_dataframe],
+            params=write_params,
+        )
+        # partitions for readers that only need some classes or identifiers
+        pipeline.output(
+            "write_identifier_partitions",
+            lambda df: write_dataframe(
+                df=df,
+                path=output_dir.joinpath("mesh_identifiers.json.gz"),
+                partition_by="mesh_class",
+                range_columns=["mesh_id"],
+            ),
+            id_output_df,
+            code=[write_dataframe, inspect.getsource(utils)],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_synonyms",
+            lambda df: write_dataframe(
+                df=df, path=output_dir.joinpath("mesh_synonyms.json.gz")
+            ),
+            synonym_df,
+            code=[write_dataframe],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_synonym_partitions",
+            lambda df: write_dataframe(
+                df=df,
+                path=output_dir.joinpath("mesh_synonyms.json.gz"),
+                # by record type, which is the first letter of MeSH identifiers
+                partition_by="mesh_id",
+                partition_key=lambda mesh_id: mesh_id[0],
+            ),
+            synonym_df,
+            code=[write_dataframe, inspect.getsource(utils)],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_label_index",
+            lambda df: write_label_index(
+                cls.get_label_df(df), output_dir.joinpath("mesh_label_index.bin")
+            ),
+            synonym_df,
+            code=[cls.get_label_df, write_label_index, normalize_label],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_descriptor_qualifier_pairs",
+            lambda df: write_dataframe(
+                df=df,
+                path=output_dir.joinpath("mesh_descriptor_qualifier_pairs.json.gz"),
+            ),
+            pairs_df,
+            code=[write_dataframe],
+            params=write_params,
+        )
+        pipeline.output(
+            "write_top_level_map",
+            lambda df: write_dataframe(
+                df=df,
+                path=output_dir.joinpath(
+                    "mesh_topical_descriptor_descendants_top_level_map.json.gz"
+                ),
+            ),
+            top_map_df,
+            code=[write_dataframe],
+            params=write_params,
+        )
+        if previous is not None:
+            pipeline.output(
+                "write_changelog",
+                lambda changelog: write_changelog(
+                    changelog, output_dir.joinpath("mesh_changelog.json")
+                ),
+                changelog,
+                params=write_params,
+            )
+        return pipeline
+
+    @classmethod
+    def export_mesh_outputs(
+        cls,
+        year_yyyy: str | None = None,
+        offline: bool = False,
+        resume: bool = False,
+        previous_year: str | int | list[str] | tuple[str, ...] | None = None,
+        output_dir: str | None = None,
+    ) -> None:
+        """
+        year_yyyy: MeSH release year. If None, use the latest version from bioversions.
+        offline: build from cached source files without network access.
+        resume: reuse checkpointed stages from a previous run,
+            rerunning only stages whose inputs or code changed.
+        previous_year: build incrementally from this earlier release,
+            only parsing records that changed since, and write mesh_changelog.json.
+            Tables of the earlier release are resumed from its checkpoints,
+            or built from scratch when those checkpoints are missing.
+            When the earlier release was itself built incrementally, pass the chain of years,
+            such as 2020,2021, such that its checkpoints are found.
+        output_dir: directory for outputs (default: output/mesh in this repository).
+        """
+        set_offline(offline)
         if year_yyyy is None:
+            if get_source_cache().offline:
+                raise ValueError("year_yyyy must be specified in offline mode.")
             year_yyyy = bioversions.get_version("mesh")
         year_yyyy = str(year_yyyy)  # protect against fire
-        output_dir = get_source_output_dir("mesh")
-        logging.info(f"Processing mesh {year_yyyy} to {output_dir}")
-        rdf = cls.get_mesh_rdf(year_yyyy)
-        # Full NXOntology
-        logger.info(f"Creating full NXOntology for mesh {year_yyyy}.")
-        nxo, id_df = cls.create_nxo(rdf=rdf, year_yyyy=year_yyyy)
-        nxo_path = write_ontology(nxo=nxo, output_dir=output_dir)
-        # Topical descriptor NXOntology
-        nxo_desc = cls.create_topical_descriptor_nxo(nxo)
-        nxo_path = write_ontology(nxo=nxo_desc, output_dir=output_dir)
-        logger.info(
-            f"Wrote mesh topical descriptor descendant nxontology to {nxo_path}."
-        )
-        # Identifier table
-        id_df["in_full_nxo"] = id_df.mesh_id.isin(set(nxo.graph))
-        id_df["in_desc_nxo"] = id_df.mesh_id.isin(set(nxo_desc.graph))
-        write_dataframe(df=id_df, path=output_dir.joinpath("mesh_identifiers.json.gz"))
-        # Synonyms table
-        logger.info(f"Creating synonyms for mesh {year_yyyy}.")
-        write_dataframe(
-            df=cls.get_synonym_df(rdf=rdf),
-            path=output_dir.joinpath("mesh_synonyms.json.gz"),
-        )
-        # Allowed qualifiers
-        logger.info(f"Creating qualifier-descriptor pairs for mesh {year_yyyy}.")
-        write_dataframe(
-            df=cls.get_descriptor_qualifier_pairs_df(rdf=rdf),
-            path=output_dir.joinpath("mesh_descriptor_qualifier_pairs.json.gz"),
-        )
-        # Top level node mapping
-        logger.info(f"Creating top-level term mapping for mesh {year_yyyy}.")
-        top_map_df = cls.create_top_level_map_df(nxo_desc)
-        write_dataframe(
-            df=top_map_df,
-            path=output_dir.joinpath(
-                "mesh_topical_descriptor_descendants_top_level_map.json.gz"
-            ),
+        output_path = (
+            get_source_output_dir("mesh")
+            if output_dir is None
+            else pathlib.Path(output_dir)
+        )
+        output_path.mkdir(parents=True, exist_ok=True)
+        logging.info(f"Processing mesh {year_yyyy} to {output_path}")
+        with record_run(
+            output_path.joinpath("run_metrics.json"), source="mesh", version=year_yyyy
+        ):
+            with measure("fetch"):
+                rdf_paths = cls.fetch_mesh_rdf(year_yyyy)
+                previous_years = (
+                    [] if previous_year is None else cls._parse_years(previous_year)
+                )
+                previous_rdf_paths = [cls.fetch_mesh_rdf(y) for y in previous_years]
+            previous = None
+            for year, paths in zip(previous_years, previous_rdf_paths, strict=True):
+                previous = cls.create_pipeline(
+                    year_yyyy=year,
+                    rdf_paths=paths,
+                    output_dir=output_path,
+                    resume=True,
+                    previous=previous,
+                )
+            pipeline = cls.create_pipeline(
+                year_yyyy=year_yyyy,
+                rdf_paths=rdf_paths,
+                output_dir=output_path,
+                resume=resume,
+                previous=previous,
+            )
+            pipeline.run()
+        # release the triple store now that outputs are written
+        cls._read_mesh_rdf_files.cache_clear()
+
+    @classmethod
+    def export_mesh_batch(
+        cls,
+        years: str | int | list[str] | tuple[str, ...],
+        offline: bool = False,
+        resume: bool = False,
+        incremental: bool = False,
+        max_workers: int | None = None,
+        memory_gb: float | None = None,
+        output_dir: str | None = None,
+    ) -> None:
+        """
+        Build several MeSH releases, each in its own process, and print a timing report.
+        Outputs of each release are written to a subdirectory of output_dir named by year.
+        years: comma-separated years or a range like 2020-2023.
+        incremental: build each release after the previous year,
+            updating its tables with only the records that changed (see `export_mesh_outputs`).
+            The first year is built from scratch unless resumed.
+            Years are then built one after another rather than in parallel.
+        max_workers and memory_gb are passed to `run_tasks`.
+        Source files are fetched and vocabularies parsed before the worker processes start,
+        so that forked workers share the parsed vocabulary.
+        A worker exits once its outputs are written, releasing the memory of its triple store.
+        """
+        year_list = cls._parse_years(years)
+        set_offline(offline)
+        output_path = (
+            get_source_output_dir("mesh")
+            if output_dir is None
+            else pathlib.Path(output_dir)
         )
+        for year_yyyy in year_list:
+            vocab_path, _ = cls.fetch_mesh_rdf(year_yyyy)
+            cls._read_mesh_vocabulary(vocab_path.as_posix())
+        tasks = [
+            Task(
+                name=f"mesh_{year_yyyy}",
+                func=cls.export_mesh_outputs,
+                kwargs={
+                    "year_yyyy": year_yyyy,
+                    "offline": offline,
+                    "resume": resume,
+                    "previous_year": year_list[:i] if incremental and i else None,
+                    "output_dir": output_path.joinpath(year_yyyy).as_posix(),
+                },
+                deps=(f"mesh_{year_list[i - 1]}",) if incremental and i else (),
+                memory_gb=16.0,
+            )
+            for i, year_yyyy in enumerate(year_list)
+        ]
+        results = run_tasks(tasks, max_workers=max_workers, memory_gb=memory_gb)
+        print(format_report(results))
+        failed = [result.name for result in results if result.status != "succeeded"]
+        if failed:
+            raise RuntimeError(f"Building failed for {failed}")
+
+    @staticmethod
+    def _parse_years(years: str | int | list[str] | tuple[str, ...]) -> list[str]:
+        """Parse years from fire, such as 2020,2021 or 2020-2023, into sorted unique years."""
+        if isinstance(years, (list, tuple)):
+            items = [str(year) for year in years]
+        else:
+            items = str(years).split(",")
+        year_set: set[str] = set()
+        for item in items:
+            start, _, end = item.strip().partition("-")
+            year_set.update(
+                str(year) for year in range(int(start), int(end or start) + 1)
+            )
+        return sorted(year_set)
@@ -0,0 +1,107 @@
+import json
+import pathlib
+
+import pandas as pd
+
+from nxontology_data.mesh.incremental import diff_mesh_records, index_mesh_records
+from nxontology_data.mesh.mesh import MeshLoader
+from nxontology_data.synthetic import SyntheticShape, write_mesh_rdf
+
+shape = SyntheticShape(n_nodes=60, branching=3, n_roots=2, extra_parent_rate=0.2)
+mesh = "http://id.nlm.nih.gov/mesh"
+meshv = "http://id.nlm.nih.gov/mesh/vocab#"
+
+
+def write_next_release(directory: pathlib.Path, nt_path: pathlib.Path) -> pathlib.Path:
+    """
+    Write the 2021 release as the 2020 release where D000000005 is renamed,
+    D000000010 moves to the other root, D000000059 is removed, and D000000100 is added.
+    """
+    lines = []
+    for line in (
+        nt_path.read_text().replace(f"{mesh}/2020/", f"{mesh}/2021/").splitlines()
+    ):
+        if "000000059" in line:
+            continue
+        line = line.replace('"Term 5"@en', '"Renamed 5"@en')
+        if line.startswith(f"<{mesh}/2021/D000000010> <{meshv}broaderDescriptor>"):
+            line = f"<{mesh}/2021/D000000010> <{meshv}broaderDescriptor> <{mesh}/2021/D000000001> ."
+        lines.append(line)
+    new = f"{mesh}/2021/D000000100"
+    lines += [
+        f"<{new}> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{meshv}TopicalDescriptor> .",
+        f'<{new}> <{meshv}identifier> "D000000100" .',
+        f'<{new}> <http://www.w3.org/2000/01/rdf-schema#label> "Term 100"@en .',
+        f"<{new}> <{meshv}broaderDescriptor> <{mesh}/2021/D000000005> .",
+    ]
+    directory.mkdir()
+    directory.joinpath("vocabulary_1.0.0.ttl").write_text(
+        nt_path.parent.joinpath("vocabulary_1.0.0.ttl").read_text()
+    )
+    path = directory.joinpath("mesh2021.nt")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_incremental_pipeline(tmp_path: pathlib.Path) -> None:
+    rdf_paths_2020 = write_mesh_rdf(tmp_path.joinpath("2020"), shape, n_scrs=10)
+    nt_path_2021 = write_next_release(tmp_path.joinpath("2021"), rdf_paths_2020[1])
+    rdf_paths_2021 = (
+        tmp_path.joinpath("2021", "vocabulary_1.0.0.ttl"),
+        nt_path_2021,
+    )
+    changelog = diff_mesh_records(
+        index_mesh_records(nt_path_2021.as_posix(), None, "2021"),
+        index_mesh_records(rdf_paths_2020[1].as_posix(), None, "2020"),
+    )
+    assert changelog.added == ["D000000100"]
+    assert changelog.removed == ["D000000059"]
+    # D000000019 had D000000059 as an extra parent
+    assert set(changelog.modified) >= {"D000000005", "D000000010"}
+    output_dir = tmp_path.joinpath("output")
+    output_dir.mkdir()
+    previous = MeshLoader.create_pipeline(
+        "2020", rdf_paths_2020, output_dir, nt_compression=None
+    )
+    previous.run()
+    # resume the previous release from checkpoints, as when building incrementally
+    previous = MeshLoader.create_pipeline(
+        "2020", rdf_paths_2020, output_dir, resume=True, nt_compression=None
+    )
+    full = MeshLoader.create_pipeline(
+        "2021", rdf_paths_2021, output_dir, nt_compression=None
+    )
+    update = MeshLoader.create_pipeline(
+        "2021",
+        rdf_paths_2021,
+        output_dir,
+        resume=True,
+        nt_compression=None,
+        previous=previous,
+    )
+    for name in [
+        "query_identifiers",
+        "query_edges",
+        "query_synonyms",
+        "query_descriptor_qualifier_pairs",
+        "build_top_level_map",
+    ]:
+        expected: pd.DataFrame = full.stages[name].result()
+        updated: pd.DataFrame = update.stages[name].result()
+        pd.testing.assert_frame_equal(
+            updated.reset_index(drop=True),
+            expected.reset_index(drop=True),
+            check_dtype=False,
+            obj=name,
+        )
+    update.run()
+    # the previous release's tables are reused and only changed records are parsed
+    assert previous.timings == {}
+    assert len(update.stages["parse"].result()) < len(full.stages["parse"].result()) / 3
+    written = json.loads(output_dir.joinpath("mesh_changelog.json").read_text())
+    assert written["previous_year"] == "2020"
+    assert written["added"] == ["D000000100"]
+    nxo_full = full.stages["build_nxo_full"].result()
+    nxo_update = update.stages["build_nxo_full"].result()
+    assert set(nxo_update.graph.edges) == set(nxo_full.graph.edges)
+    assert nxo_update.graph.nodes["D000000005"]["mesh_label"] == "Renamed 5"
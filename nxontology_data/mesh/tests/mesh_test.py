@@ -1,12 +1,18 @@
+import json
 import pathlib
 
 import fsspec
 import networkx as nx
+import pandas as pd
 import pytest
 import rdflib
 from nxontology import NXOntology
 
+from nxontology_data.conftest import LocalHttpServer
 from nxontology_data.mesh.mesh import MeshLoader
+from nxontology_data.node_index import NodeReader
+from nxontology_data.synthetic import SyntheticShape, write_mesh_rdf
+from nxontology_data.utils import read_dataframe_partitions
 
 test_data_dir = pathlib.Path(__file__).parent.joinpath("rdf-2020-subset")
 
@@ -59,3 +65,86 @@ def create_testing_nt(full_nxo: NXOntology[str], full_nt_path: str) -> None:
             for node in nodes:
                 if f"/{node}>" in line:
                     wf.write(line)
+
+
+def test_pipeline_resume(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rdf_paths = (
+        test_data_dir.joinpath("vocabulary_1.0.0.ttl"),
+        test_data_dir.joinpath("mesh2020-subset.nt"),
+    )
+    output_dir = tmp_path.joinpath("output")
+    output_dir.mkdir()
+
+    def create_top_level_map_df(nxo: NXOntology[str]) -> pd.DataFrame:
+        # testing subset lacks tree numbers for top-level descriptors
+        return pd.DataFrame({"mesh_id": sorted(nxo.graph)})
+
+    monkeypatch.setattr(MeshLoader, "create_top_level_map_df", create_top_level_map_df)
+    pipeline = MeshLoader.create_pipeline(
+        "2020", rdf_paths, output_dir, nt_compression=None
+    )
+    pipeline.run()
+    assert "parse" in pipeline.timings
+    output_names = {path.name for path in output_dir.iterdir()}
+    assert output_names == {
+        "mesh_full.json.gz",
+        "mesh_full_closure.npz",
+        "mesh_full_node_index.npz",
+        "mesh_full_node_metrics.json.gz",
+        "mesh_topical_descriptor_descendants.json",
+        "mesh_topical_descriptor_descendants_closure.npz",
+        "mesh_topical_descriptor_descendants_node_metrics.json.gz",
+        "mesh_identifiers.json.gz",
+        "mesh_identifiers",
+        "mesh_label_index.bin",
+        "mesh_synonyms.json.gz",
+        "mesh_synonyms",
+        "mesh_descriptor_qualifier_pairs.json.gz",
+        "mesh_topical_descriptor_descendants_top_level_map.json.gz",
+    }
+    id_df = read_dataframe_partitions(
+        output_dir.joinpath("mesh_identifiers", "manifest.json").as_posix(),
+        keys=["TopicalDescriptor"],
+    )
+    assert len(id_df) == 8
+    assert set(id_df.mesh_class) == {"TopicalDescriptor"}
+    full_path = output_dir.joinpath("mesh_full.json.gz")
+    with NodeReader(full_path.as_posix()) as reader:
+        assert reader.get_node_data("D015817")["mesh_class"] == "TopicalDescriptor"
+    full_bytes = full_path.read_bytes()
+    full_path.unlink()
+    pipeline = MeshLoader.create_pipeline(
+        "2020", rdf_paths, output_dir, resume=True, nt_compression=None
+    )
+    pipeline.run()
+    # MeSH is not parsed and only the deleted output is rewritten from the checkpointed ontology
+    assert list(pipeline.timings) == ["write_nxo_full"]
+    assert full_path.read_bytes() == full_bytes
+
+
+def test_export_mesh_batch(
+    tmp_path: pathlib.Path,
+    http_server: LocalHttpServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    shape = SyntheticShape(n_nodes=30, branching=3)
+    for year in ["2020", "2021"]:
+        paths = write_mesh_rdf(tmp_path.joinpath(year), shape, year, compress=True)
+        for path in paths:
+            http_server.add_file(f"/{year}/{path.name}", path.read_bytes())
+    monkeypatch.setattr(MeshLoader, "MESH_RDF_ROOT", http_server.url)
+    output_dir = tmp_path.joinpath("output")
+    MeshLoader.export_mesh_batch(
+        "2020-2021", incremental=True, output_dir=output_dir.as_posix()
+    )
+    for year in ["2020", "2021"]:
+        assert output_dir.joinpath(year, "mesh_full.json.gz").exists()
+    # dateRevised of every synthetic record is the release year
+    changelog = json.loads(
+        output_dir.joinpath("2021", "mesh_changelog.json").read_text()
+    )
+    assert len(changelog["modified"]) == shape.n_nodes
+    assert not output_dir.joinpath("2020", "mesh_changelog.json").exists()
+    assert MeshLoader._parse_years("2019,2021-2022") == ["2019", "2021", "2022"]
@@ -0,0 +1,314 @@
+"""
+Columnar storage of node attributes for ontologies with many nodes,
+where the attributes of every node are rows of one shared table
+rather than a dictionary per node.
+Each column is dictionary encoded: its distinct values are stored once as UTF-8 bytes,
+and each row holds the integer code of its value, such that repeated values
+like classes, URI prefixes, and dates cost four bytes per node.
+Graphs reference rows through `NodeData`, a dictionary view of a row,
+so code that uses `graph.nodes[node]` as a dictionary is unchanged.
+Ontologies derived from a subset of nodes with `derive_ontology`
+likewise share the node attributes of their parent rather than copying them.
+"""
+
+import json
+from collections.abc import (
+    Collection,
+    Hashable,
+    ItemsView,
+    Iterator,
+    KeysView,
+    Mapping,
+    ValuesView,
+)
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from nxontology import NXOntology
+
+from nxontology_data.utils import column_values
+
+N = TypeVar("N", bound=Hashable)
+
+
+@dataclass
+class NodeColumn:
+    """
+    Dictionary-encoded column whose value at row i is the category at `codes[i]`,
+    or None when the code is -1.
+    Categories are the bytes of `data[offsets[j]:offsets[j + 1]]`,
+    which are JSON when is_json, such as for lists, and UTF-8 strings otherwise.
+    """
+
+    codes: npt.NDArray[np.int32]
+    offsets: npt.NDArray[np.int64]
+    data: bytes
+    is_json: bool
+
+    @classmethod
+    def from_values(cls, values: list[Any]) -> "NodeColumn":
+        """Encode JSON-compatible values, which are stored as JSON unless all are strings or None."""
+        is_json = any(
+            value is not None and not isinstance(value, str) for value in values
+        )
+        texts = [
+            value if value is None or not is_json else json.dumps(value)
+            for value in values
+        ]
+        categories = sorted({text for text in texts if text is not None})
+        category_codes = {text: i for i, text in enumerate(categories)}
+        encoded = [text.encode() for text in categories]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        return cls(
+            codes=np.array(
+                [-1 if text is None else category_codes[text] for text in texts],
+                dtype=np.int32,
+            ),
+            offsets=offsets,
+            data=b"".join(encoded),
+            is_json=is_json,
+        )
+
+    def __getitem__(self, row: int) -> Any:
+        code = int(self.codes[row])
+        if code < 0:
+            return None
+        text = self.data[self.offsets[code] : self.offsets[code + 1]].decode()
+        return json.loads(text) if self.is_json else text
+
+
+class NodeTable:
+    """Table of node attributes with a `NodeColumn` per attribute."""
+
+    def __init__(self, columns: dict[str, NodeColumn], n_rows: int) -> None:
+        self.columns = columns
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "NodeTable":
+        """
+        Encode the columns of df, with values converted like a `to_json` round-trip,
+        such that missing values are None.
+        """
+        return cls(
+            {
+                str(column): NodeColumn.from_values(column_values(df[column]))
+                for column in df.columns
+            },
+            n_rows=len(df),
+        )
+
+    def get_value(self, row: int, column: str) -> Any:
+        return self.columns[column][row]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the encoded columns in bytes."""
+        return sum(
+            column.codes.nbytes + column.offsets.nbytes + len(column.data)
+            for column in self.columns.values()
+        )
+
+
+class TableRow(Mapping[str, Any]):
+    """Read-only mapping view of a row of a `NodeTable`."""
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: NodeTable, row: int) -> None:
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.table.columns:
+            raise KeyError(key)
+        return self.table.get_value(self.row, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.table.columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table.columns)
+
+    def __len__(self) -> int:
+        return len(self.table.columns)
+
+
+class _Deleted:
+    """Marks a base attribute that was deleted from a `NodeData`."""
+
+    def __reduce__(self) -> str:
+        # pickle by reference, such that unpickled node data compare identical
+        return "_deleted"
+
+
+_deleted = _Deleted()
+_missing = object()
+
+
+class NodeData(dict[str, Any]):
+    """
+    Node attributes that overlay changes on a shared base mapping,
+    such as a `TableRow` or the attributes of the node in a parent ontology,
+    with the interface of a dictionary.
+    This is a dict subclass, as nxontology requires node data to be a dict,
+    but its own dictionary only holds the changes to the base:
+    the base is never modified, so setting or deleting an attribute
+    is recorded in the dictionary, which is empty for unchanged nodes.
+    """
+
+    __slots__ = ("_base",)
+
+    def __init__(self, base: Mapping[str, Any]) -> None:
+        super().__init__()
+        self._base = base
+
+    def __getitem__(self, key: str) -> Any:
+        value = dict.get(self, key, _missing)
+        if value is _deleted:
+            raise KeyError(key)
+        if value is not _missing:
+            return value
+        return self._base[key]
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str) or not dict.__contains__(self, key):
+            return key in self._base
+        return dict.__getitem__(self, key) is not _deleted
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        if key in self._base:
+            dict.__setitem__(self, key, _deleted)
+        else:
+            dict.__delitem__(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._base:
+            if dict.get(self, key) is not _deleted:
+                yield key
+        for key in dict.__iter__(self):
+            if key not in self._base:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def __ne__(self, other: object) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # the base is pickled once for all node data that share it, along with the changes
+        return NodeData, (self._base,), None, None, iter(dict.items(self))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def keys(self) -> KeysView[str]:  # type: ignore [override]
+        return KeysView(self)
+
+    def values(self) -> ValuesView[Any]:  # type: ignore [override]
+        return ValuesView(self)
+
+    def items(self) -> ItemsView[str, Any]:  # type: ignore [override]
+        return ItemsView(self)
+
+    def pop(self, key: str, default: Any = _missing) -> Any:
+        if key not in self:
+            if default is _missing:
+                raise KeyError(key)
+            return default
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self) -> tuple[str, Any]:
+        for key in self:
+            return key, self.pop(key)
+        raise KeyError("popitem(): node data is empty")
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def clear(self) -> None:
+        dict.clear(self)
+        dict.update(self, dict.fromkeys(self._base, _deleted))
+
+    def copy(self) -> "NodeData":
+        """Copy of the attributes that shares the base, like `dict.copy`."""
+        node_data = NodeData(self._base)
+        dict.update(node_data, dict.items(self))
+        return node_data
+
+
+def _set_node_data(nxo: NXOntology[Any], node_data: dict[Any, NodeData]) -> None:
+    """Add the nodes of node_data to nxo with their `NodeData` as attributes."""
+    for node in node_data:
+        nxo.add_node(node)
+    # networkx creates an attribute dictionary for each node, which is replaced
+    nxo.graph._node.update(node_data)
+
+
+def add_table_nodes(nxo: NXOntology[Any], table: NodeTable, id_column: str) -> None:
+    """
+    Add a node to nxo for each row of table, identified by id_column,
+    whose attributes are a `NodeData` of the row.
+    Like `NXOntology.add_node`, raises a DuplicateError if a node already exists.
+    """
+    _set_node_data(
+        nxo,
+        {
+            table.get_value(row, id_column): NodeData(TableRow(table, row))
+            for row in range(table.n_rows)
+        },
+    )
+
+
+def derive_ontology(nxo: NXOntology[N], nodes: Collection[N]) -> NXOntology[N]:
+    """
+    Create an ontology of the subgraph of nxo induced by nodes,
+    like `NXOntology(nxo.graph.subgraph(nodes).copy())`,
+    but where node attributes are `NodeData` that share the attributes of nxo,
+    such that they are not copied, and changes to the derived ontology do not modify nxo.
+    Nodes and edges are in the order of nxo and graph attributes are copied.
+    """
+    nodes = set(nodes)
+    parent_data = nxo.graph._node
+    derived: NXOntology[N] = NXOntology()
+    derived.graph.graph.update(nxo.graph.graph)
+    _set_node_data(
+        derived,
+        {
+            node: (
+                data.copy()
+                if isinstance(data, NodeData)
+                else NodeData(parent_data[node])
+            )
+            for node, data in parent_data.items()
+            if node in nodes
+        },
+    )
+    derived.graph.add_edges_from(
+        (parent, child, data)
+        for parent, children in nxo.graph.adj.items()
+        if parent in nodes
+        for child, data in children.items()
+        if child in nodes
+    )
+    return derived
@@ -0,0 +1,186 @@
+"""
+Random access to the nodes of node-link JSON ontologies without loading them.
+The JSON is gzipped as a series of independently compressed gzip members,
+like BGZF, which standard gzip readers decompress as one stream.
+Blocks are cut between nodes, so each node is within a single block,
+and a sidecar index stores the block, offset, and length of every node
+such that reading a node takes one seek and the decompression of one block.
+"""
+
+import gzip
+import itertools
+import json
+import logging
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any
+
+import fsspec
+import numpy as np
+import numpy.typing as npt
+
+from nxontology_data.closure import write_npz
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 65_536
+"""Uncompressed size that blocks are cut at, unless a single node is larger."""
+
+_nodes_start = b'\n  "nodes": [\n'
+
+
+def get_node_index_path(ontology_path: Path) -> Path:
+    """Path of the node index written next to an ontology like `mesh.json.gz`."""
+    name = ontology_path.name.split(".", 1)[0]
+    return ontology_path.with_name(f"{name}_node_index.npz")
+
+
+@dataclass
+class NodeIndex:
+    """
+    Location of each node in a block-gzipped ontology, where ids are the sorted node identifiers.
+    Block i is the gzip member at `block_offsets[i]:block_offsets[i + 1]` of the file,
+    and the JSON object of node j is `lengths[j]` bytes at `starts[j]` of block `blocks[j]` when decompressed.
+    """
+
+    ids: npt.NDArray[np.str_]
+    blocks: npt.NDArray[np.int32]
+    starts: npt.NDArray[np.int32]
+    lengths: npt.NDArray[np.int32]
+    block_offsets: npt.NDArray[np.int64]
+
+    def index(self, node: str) -> int:
+        """Integer index of node, found by binary search."""
+        i = int(np.searchsorted(self.ids, node))
+        if i == len(self.ids) or self.ids[i] != node:
+            raise KeyError(node)
+        return i
+
+
+def _node_spans(
+    json_bytes: bytes, nodes: list[dict[str, Any]]
+) -> list[tuple[int, int]]:
+    """
+    Byte span of each node in node-link JSON written by `json.dumps` with an indent of 2,
+    found by serializing the nodes the same way.
+    """
+    spans: list[tuple[int, int]] = []
+    if not nodes:
+        return spans
+    position = json_bytes.index(_nodes_start) + len(_nodes_start)
+    for node in nodes:
+        text = json.dumps(node, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+        node_bytes = f"    {text}".encode()
+        if not json_bytes.startswith(node_bytes, position):
+            raise ValueError(f"Node {node['id']!r} not found at byte {position}.")
+        spans.append((position, position + len(node_bytes)))
+        # nodes are separated by ",\n"
+        position += len(node_bytes) + 2
+    return spans
+
+
+def write_block_gzip(
+    json_bytes: bytes,
+    nodes: list[dict[str, Any]],
+    path: Path,
+    block_size: int = BLOCK_SIZE,
+) -> Path:
+    """
+    Write json_bytes, node-link JSON of nodes, to path as independently gzipped blocks,
+    and the location of each node to the node index (see `get_node_index_path`).
+    Returns the path of the node index.
+    """
+    spans = _node_spans(json_bytes, nodes)
+    block_starts = [0]
+    for start, stop in spans:
+        # cut before nodes that would overflow the block
+        if stop - block_starts[-1] > block_size and start > block_starts[-1]:
+            block_starts.append(start)
+    members = [
+        gzip.compress(json_bytes[start:stop], mtime=0)
+        for start, stop in itertools.pairwise([*block_starts, len(json_bytes)])
+    ]
+    path.write_bytes(b"".join(members))
+    block_offsets = np.zeros(len(members) + 1, dtype=np.int64)
+    np.cumsum([len(member) for member in members], out=block_offsets[1:])
+    span_array = np.array(spans, dtype=np.int64).reshape(-1, 2)
+    blocks = np.searchsorted(block_starts, span_array[:, 0], side="right") - 1
+    ids = np.array([str(node["id"]) for node in nodes], dtype=np.str_)
+    order = np.argsort(ids, kind="stable")
+    node_index = NodeIndex(
+        ids=ids[order],
+        blocks=blocks[order].astype(np.int32),
+        starts=(span_array[:, 0] - np.array(block_starts)[blocks])[order].astype(
+            np.int32
+        ),
+        lengths=np.diff(span_array, axis=1)[:, 0][order].astype(np.int32),
+        block_offsets=block_offsets,
+    )
+    index_path = write_npz(
+        {field.name: getattr(node_index, field.name) for field in fields(node_index)},
+        get_node_index_path(path),
+    )
+    logger.info(
+        f"Wrote {len(members):,} blocks to {path} and node index to {index_path}"
+    )
+    return index_path
+
+
+def read_node_index(path: str) -> NodeIndex:
+    """Read a node index from a local path or URL."""
+    with fsspec.open(path, "rb") as read_file:
+        with np.load(read_file, allow_pickle=False) as arrays:
+            return NodeIndex(
+                **{field.name: arrays[field.name] for field in fields(NodeIndex)}
+            )
+
+
+class NodeReader:
+    """
+    Read the attributes of single nodes from an ontology written by `write_block_gzip`,
+    at a local path or URL, where reading a node seeks to its block and decompresses it.
+    The last block read is kept, such that reading nearby nodes does not decompress it again.
+    """
+
+    def __init__(self, path: str, index_path: str | None = None) -> None:
+        if index_path is None:
+            # replace the file name, keeping the directory or URL prefix, which may be empty
+            file_name = path.rsplit("/", 1)[-1]
+            name = file_name.split(".", 1)[0]
+            index_path = f"{path.removesuffix(file_name)}{name}_node_index.npz"
+        self.node_index = read_node_index(index_path)
+        self._file = fsspec.open(path, "rb").open()
+        self._block: tuple[int, bytes] | None = None
+
+    def __enter__(self) -> "NodeReader":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __contains__(self, node: str) -> bool:
+        try:
+            self.node_index.index(node)
+        except KeyError:
+            return False
+        return True
+
+    def _read_block(self, block: int) -> bytes:
+        if self._block is None or self._block[0] != block:
+            start, stop = self.node_index.block_offsets[block : block + 2]
+            self._file.seek(int(start))
+            self._block = block, gzip.decompress(self._file.read(int(stop - start)))
+        return self._block[1]
+
+    def get_node_data(self, node: str) -> dict[str, Any]:
+        """Node-link data of node, which are its attributes and id. Raises a KeyError for unknown nodes."""
+        i = self.node_index.index(node)
+        data = self._read_block(int(self.node_index.blocks[i]))
+        start = int(self.node_index.starts[i])
+        node_data: dict[str, Any] = json.loads(
+            data[start : start + int(self.node_index.lengths[i])]
+        )
+        return node_data
@@ -1,18 +1,104 @@
+import functools
 import json
 import logging
 import re
+import threading
+import time
 from collections import Counter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 import requests
+import urllib3
 from nxontology import NXOntology
 
-from nxontology_data.utils import get_source_output_dir, write_ontology
+from nxontology_data.cache import OfflineCacheMiss, get_source_cache, set_offline
+from nxontology_data.instrumentation import measure, record_run
+from nxontology_data.json_stream import JsonStreamReader
+from nxontology_data.utils import (
+    RETRY_STATUSES,
+    count_ontology,
+    get_requests_session,
+    get_source_output_dir,
+    write_ontology,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces out calls to `wait`,
+    such that at most `rate` calls proceed per second.
+    """
+
+    def __init__(self, rate: float) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.interval = 1.0 / rate
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_time)
+            self._next_time = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+class PubchemRequester:
+    """
+    Session and rate limiter shared by concurrent requests to PubChem.
+    Responses with retryable status codes are retried here rather than by the session,
+    such that retried requests also count towards the rate limit.
+    PubChem asks for no more than 5 requests per second and 400 requests per minute.
+    https://pubchem.ncbi.nlm.nih.gov/docs/programmatic-access#section=Request-Volume-Limitations
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 4.0,
+        pool_maxsize: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 1.0,
+    ) -> None:
+        self.rate_limiter = RateLimiter(rate=requests_per_second)
+        self.session = get_requests_session(
+            pool_maxsize=pool_maxsize, retry_statuses=()
+        )
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+    def fetch(self, url: str, params: dict[str, Any]) -> Path:
+        """
+        Fetch a response via the source cache, returning the local path to the response body.
+        """
+        cache = get_source_cache()
+        for attempt in range(self.retries + 1):
+            if not cache.offline:
+                self.rate_limiter.wait()
+            try:
+                return cache.fetch(url, params=params, session=self.session)
+            except requests.HTTPError as e:
+                status = None if e.response is None else e.response.status_code
+                if status not in RETRY_STATUSES or attempt == self.retries:
+                    raise
+                delay = self.backoff_factor * 2**attempt
+                logger.warning(f"Retrying pubchem request in {delay:.1f}s after {e}")
+                time.sleep(delay)
+        raise AssertionError("unreachable")
+
+
+@functools.cache
+def _get_default_requester() -> PubchemRequester:
+    return PubchemRequester()
+
+
 class PubchemClassificationApi:
     """
     For a JSON index of all PubChem classifications:
@@ -29,6 +115,16 @@ class PubchemClassificationApi:
         "https://pubchem.ncbi.nlm.nih.gov/classification/cgi/classifications.fcgi"
     )
 
+    @classmethod
+    def _fetch(
+        cls, params: dict[str, Any], requester: PubchemRequester | None = None
+    ) -> Path:
+        """
+        Fetch an API response via the source cache, returning the local path to the response body.
+        """
+        requester = requester or _get_default_requester()
+        return requester.fetch(cls.REST_API, params=params)
+
     @staticmethod
     def _check_hierarchy_type(hierarchy: Any) -> dict[str, Any]:
         assert isinstance(hierarchy, dict)
@@ -37,22 +133,26 @@ class PubchemClassificationApi:
         return hierarchy
 
     @classmethod
-    def get_hierarchy_catalog(cls) -> list[dict[str, Any]]:
+    def get_hierarchy_catalog(
+        cls, requester: PubchemRequester | None = None
+    ) -> list[dict[str, Any]]:
         """Return API index of all PubChem classification heirarchies."""
         params = {
             "format": "json",
             "hid": "index",
         }
-        response = requests.get(cls.REST_API, params=params)
-        logger.info(f"Queried for the pubchem hierarchy catalog at {response.url}")
-        hierarchies = response.json()["Hierarchies"]["Hierarchy"]
+        path = cls._fetch(params, requester)
+        logger.info(f"Queried for the pubchem hierarchy catalog at {cls.REST_API}")
+        hierarchies = json.loads(path.read_bytes())["Hierarchies"]["Hierarchy"]
         assert isinstance(hierarchies, list)
         for hierarchy in hierarchies:
             cls._check_hierarchy_type(hierarchy)
         return hierarchies
 
     @classmethod
-    def get_hierarchy(cls, hierarchy_id: int) -> dict[str, Any]:
+    def get_hierarchy(
+        cls, hierarchy_id: int, requester: PubchemRequester | None = None
+    ) -> dict[str, Any]:
         """
         For chembl protein class, hierarchy_id=87.
         """
@@ -62,14 +162,9 @@ class PubchemClassificationApi:
             # "depth": 30,  # max depth
             "start": "root",
         }
-        response = requests.get(cls.REST_API, params=params)
-        if not response.ok:
-            logger.info(
-                f"Response failed with code {response.status_code} for {response.url}"
-            )
-        response.raise_for_status()
-        logger.info(f"Queried for pubchem hierarchy {hierarchy_id} at {response.url}")
-        hierarchy = response.json()["Hierarchies"]["Hierarchy"][0]
+        path = cls._fetch(params, requester)
+        logger.debug(f"Queried for pubchem hierarchy {hierarchy_id}")
+        hierarchy = json.loads(path.read_bytes())["Hierarchies"]["Hierarchy"][0]
         cls._check_hierarchy_type(hierarchy)
         return hierarchy  # type: ignore [no-any-return]
 
@@ -96,52 +191,110 @@ class PubchemClassificationApi:
         return int(node.removeprefix("node_"))
 
     @classmethod
-    def create_nxo(cls, hierarchy_id: int) -> NXOntology[int]:  # noqa: C901
-        hierarchy = cls.get_hierarchy(hierarchy_id=hierarchy_id)
-        nxo: NXOntology[int] = NXOntology()
-        nxo.graph.graph.update(cls.get_metadata(hierarchy))
-        # sort nodes for cleaner output
-        nodes = hierarchy["Node"]
-        nodes.sort(key=lambda node: cls.convert_node_id(node["NodeID"]))
-        # add nodes
-        for node in nodes:
-            node_id = cls.convert_node_id(node["NodeID"])
-            info = node["Information"]
-            if description := info.get("Description"):
-                if isinstance(description, list):
-                    description = description[0]
-                if isinstance(description, dict):
-                    try:
-                        # 083_ghs_classification_unece_un_tree has strange descriptions:
-                        # {'StringWithMarkup': [{'String': 'The GHS Hazard Statement Code is intended to be used for reference purpose for a hazard statement. It is not a ppart of the hazard statement.'}]}
-                        description = description["StringWithMarkup"][0]["String"]
-                    except (KeyError, IndexError):
-                        pass
-                if not isinstance(description, str):
-                    description = str(description)
-                    logger.warning(
-                        f"Stringified unsupported description syntax for {node}"
-                    )
-            nxo.add_node(
-                node_id,
-                name=info.get("Name"),
-                description=description,
-                pubchem_hnid=info["HNID"],
-                url=info.get("URL"),
+    def iter_hierarchy_nodes(
+        cls,
+        hierarchy_id: int,
+        hierarchy: dict[str, Any],
+        requester: PubchemRequester | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream nodes of a hierarchy from the cached API response one at a time,
+        without holding the full response body or parsed JSON tree in memory.
+        The other hierarchy fields (HID, SourceName, Information, etc.) are added to `hierarchy`,
+        which is only complete once the iterator is exhausted.
+        """
+        params = {
+            "format": "json",
+            "hid": hierarchy_id,
+            "start": "root",
+        }
+        path = cls._fetch(params, requester)
+        logger.debug(f"Streaming pubchem hierarchy {hierarchy_id} from {path}")
+        yield from cls._iter_path_nodes(path, hierarchy)
+
+    @classmethod
+    def _iter_path_nodes(
+        cls, path: Path, hierarchy: dict[str, Any]
+    ) -> Iterator[dict[str, Any]]:
+        """Stream nodes of a hierarchy from an API response body saved at path."""
+        with path.open("rb") as read_file:
+            reader = JsonStreamReader(iter(lambda: read_file.read(1 << 16), b""))
+            yield from reader.iter_array_at(
+                ["Hierarchies", "Hierarchy", 0, "Node"], siblings=hierarchy
             )
-        # add edges
+        cls._check_hierarchy_type(hierarchy)
+
+    @classmethod
+    def create_nxo(
+        cls, hierarchy_id: int, requester: PubchemRequester | None = None
+    ) -> NXOntology[int]:
+        hierarchy: dict[str, Any] = {}
+        nodes = cls.iter_hierarchy_nodes(
+            hierarchy_id=hierarchy_id, hierarchy=hierarchy, requester=requester
+        )
+        return cls._build_nxo(hierarchy=hierarchy, nodes=nodes)
+
+    @classmethod
+    def create_nxo_from_path(cls, path: Path) -> NXOntology[int]:
+        """Create an NXOntology from an API response body for a hierarchy saved at path."""
+        hierarchy: dict[str, Any] = {}
+        return cls._build_nxo(
+            hierarchy=hierarchy, nodes=cls._iter_path_nodes(path, hierarchy)
+        )
+
+    @classmethod
+    def _build_nxo(
+        cls, hierarchy: dict[str, Any], nodes: Iterable[dict[str, Any]]
+    ) -> NXOntology[int]:
+        """
+        Build an NXOntology from PubChem hierarchy nodes.
+        Each node is reduced to its attributes and edges as soon as it is read,
+        such that nodes can be consumed from a stream.
+        Hierarchy metadata is only accessed after all nodes are consumed.
+        """
+        node_data: dict[int, dict[str, Any]] = {}
+        edges: list[tuple[int, int]] = []
         for node in nodes:
             node_id = cls.convert_node_id(node["NodeID"])
-            parent_ids = []
+            node_data[node_id] = cls._get_node_data(node)
             for parent in node["ParentID"]:
                 if parent == "root":
                     # root appears to be a placeholder node added by PubChem
                     continue
-                parent_ids.append(cls.convert_node_id(parent))
-            for parent_id in sorted(parent_ids):
-                nxo.add_edge(parent_id, node_id)
+                edges.append((cls.convert_node_id(parent), node_id))
+        nxo: NXOntology[int] = NXOntology()
+        nxo.graph.graph.update(cls.get_metadata(hierarchy))
+        # sort nodes and edges for cleaner output
+        for node_id in sorted(node_data):
+            nxo.add_node(node_id, **node_data.pop(node_id))
+        edges.sort(key=lambda edge: (edge[1], edge[0]))
+        for parent_id, node_id in edges:
+            nxo.add_edge(parent_id, node_id)
         return nxo
 
+    @staticmethod
+    def _get_node_data(node: dict[str, Any]) -> dict[str, Any]:
+        info = node["Information"]
+        if description := info.get("Description"):
+            if isinstance(description, list):
+                description = description[0]
+            if isinstance(description, dict):
+                try:
+                    # 083_ghs_classification_unece_un_tree has strange descriptions:
+                    # {'StringWithMarkup': [{'String': 'The GHS Hazard Statement Code is intended to be used for reference purpose for a hazard statement. It is not a ppart of the hazard statement.'}]}
+                    description = description["StringWithMarkup"][0]["String"]
+                except (KeyError, IndexError):
+                    pass
+            if not isinstance(description, str):
+                description = str(description)
+                logger.warning(f"Stringified unsupported description syntax for {node}")
+        return {
+            "name": info.get("Name"),
+            "description": description,
+            "pubchem_hnid": info["HNID"],
+            "url": info.get("URL"),
+        }
+
     @classmethod
     def _get_simple_name(cls, hierarchy: dict[str, Any]) -> str:
         sep = "_"
@@ -155,8 +308,10 @@ class PubchemClassificationApi:
         return sep.join(Counter(name.split(sep)))
 
     @classmethod
-    def write_hierarchy_catalog(cls, output_dir: Path) -> list[dict[str, Any]]:
-        hierarchies = cls.get_hierarchy_catalog()
+    def write_hierarchy_catalog(
+        cls, output_dir: Path, requester: PubchemRequester | None = None
+    ) -> list[dict[str, Any]]:
+        hierarchies = cls.get_hierarchy_catalog(requester)
         hierarchies.sort(key=lambda h: h["HID"])
         for hierarchy in hierarchies:
             simple_name = cls._get_simple_name(hierarchy)
@@ -171,26 +326,114 @@ skip_hierarchy_ids = [
 ]
 
 
-def export_all_heirarchies() -> None:
-    output_dir = get_source_output_dir("pubchem")
+@dataclass
+class HierarchyExportResult:
+    hierarchy_id: int
+    nxo_name: str
+    status: Literal["written", "skipped", "failed"]
+    detail: str | None = None
+    seconds: float = 0.0
+
+
+def _export_hierarchy(
+    hierarchy: dict[str, Any], output_dir: Path, requester: PubchemRequester
+) -> HierarchyExportResult:
+    hierarchy_id = int(hierarchy["HID"])
+    nxo_name = hierarchy["nxo_name"]
+    if hierarchy_id in skip_hierarchy_ids:
+        return HierarchyExportResult(hierarchy_id, nxo_name, "skipped", "skip list")
+    if list(output_dir.glob(f"{nxo_name}.*")):
+        return HierarchyExportResult(
+            hierarchy_id, nxo_name, "skipped", "output file exists"
+        )
+    start = time.perf_counter()
+    try:
+        with measure(f"create_nxo:{nxo_name}") as step:
+            nxo = PubchemClassificationApi.create_nxo(
+                hierarchy_id=hierarchy_id, requester=requester
+            )
+            step.counts.update(count_ontology(nxo))
+    # urllib3 errors are raised when the connection drops while streaming a response body
+    except (
+        requests.RequestException,
+        urllib3.exceptions.HTTPError,
+        OfflineCacheMiss,
+    ) as e:
+        return HierarchyExportResult(
+            hierarchy_id,
+            nxo_name,
+            "failed",
+            f"{e.__class__.__name__}: {e}",
+            seconds=time.perf_counter() - start,
+        )
+    path = write_ontology(
+        nxo=nxo, output_dir=output_dir, closure=True, node_metrics=True
+    )
+    return HierarchyExportResult(
+        hierarchy_id, nxo_name, "written", path.name, time.perf_counter() - start
+    )
+
+
+def _log_export_summary(results: list[HierarchyExportResult]) -> None:
+    counts = Counter(result.status for result in results)
+    logger.info(
+        f"Exported {len(results):,} pubchem hierarchies: "
+        + ", ".join(f"{counts[status]:,} {status}" for status in sorted(counts))
+    )
+    for result in results:
+        if result.status == "failed":
+            logger.warning(
+                f"Failed {result.nxo_name} after {result.seconds:.1f}s: {result.detail}"
+            )
+
+
+def export_hierarchies(
+    output_dir: Path, max_workers: int = 4, requests_per_second: float = 4.0
+) -> list[HierarchyExportResult]:
+    """
+    Export all PubChem classification hierarchies to output_dir.
+    Hierarchies are fetched, converted, and written concurrently by `max_workers` threads,
+    such that building and compressing one ontology overlaps with network waits for others.
+    Requests to PubChem are limited to `requests_per_second` across all workers.
+    Hierarchies whose requests fail do not abort the export and are reported in a summary at the end.
+    Other errors, such as failing to parse or write a hierarchy, are raised.
+    """
+    requester = PubchemRequester(
+        requests_per_second=requests_per_second, pool_maxsize=max_workers
+    )
     hierarchies = PubchemClassificationApi.write_hierarchy_catalog(
-        output_dir=output_dir
+        output_dir=output_dir, requester=requester
+    )
+    logger.info(
+        f"Exporting {len(hierarchies):,} pubchem hierarchies with {max_workers} workers."
     )
-    for hierarchy in hierarchies:
-        nxo_name = hierarchy["nxo_name"]
-        if hierarchy["HID"] in skip_hierarchy_ids:
-            logging.info(f"Skipping {nxo_name} since it's in the skip list.")
-            continue
-        if list(output_dir.glob(f"{nxo_name}.*")):
-            logging.info(f"Skipping {nxo_name} since output file exists.")
-            continue
-        logging.info(f"Beginning create_nxo for {nxo_name}.")
-        try:
-            nxo = PubchemClassificationApi.create_nxo(hierarchy_id=hierarchy["HID"])
-        except requests.HTTPError:
-            logging.info(f"Skipping {nxo_name} because request failed.")
-            continue
-        write_ontology(nxo=nxo, output_dir=output_dir)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(
+                _export_hierarchy,
+                hierarchies,
+                [output_dir] * len(hierarchies),
+                [requester] * len(hierarchies),
+            )
+        )
+    _log_export_summary(results)
+    return results
+
+
+def export_all_heirarchies(
+    max_workers: int = 4, requests_per_second: float = 4.0, offline: bool = False
+) -> None:
+    """
+    offline: build from cached API responses without network access.
+    """
+    set_offline(offline)
+    output_dir = get_source_output_dir("pubchem")
+    with record_run(output_dir.joinpath("run_metrics.json"), source="pubchem"):
+        export_hierarchies(
+            output_dir=output_dir,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+        )
 
 
 if __name__ == "__main__":
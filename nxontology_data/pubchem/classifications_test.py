@@ -1,4 +1,17 @@
-from nxontology_data.pubchem.classifications import PubchemClassificationApi
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nxontology_data.conftest import LocalHttpServer
+from nxontology_data.pubchem.classifications import (
+    PubchemClassificationApi,
+    PubchemRequester,
+    RateLimiter,
+    export_hierarchies,
+)
 
 
 def test_get_hierarchy_metadata() -> None:
@@ -28,3 +41,141 @@ def test_get_hierarchy_metadata() -> None:
     )
     assert metadata["pubchem_comments"] is None
     assert metadata["source_url"] == "https://www.ebi.ac.uk/chembl/target/browser"
+
+
+def _make_hierarchy(hid: int, n_nodes: int) -> dict[str, Any]:
+    """Create a PubChem-shaped hierarchy with a chain of n_nodes under root."""
+    nodes = [
+        {
+            "NodeID": f"node_{i}",
+            "ParentID": ["root" if i == 1 else f"node_{i - 1}"],
+            "Information": {"Name": f"Node {i}", "HNID": 1000 + i},
+        }
+        for i in range(n_nodes, 0, -1)
+    ]
+    return {
+        "SourceName": "Test",
+        "SourceID": f"Tree {hid}",
+        "HID": hid,
+        "Information": {"Name": f"Tree {hid}", "Description": ["Testing tree"]},
+        "Node": nodes,
+    }
+
+
+@pytest.fixture
+def pubchem_server(
+    http_server: LocalHttpServer, monkeypatch: pytest.MonkeyPatch
+) -> LocalHttpServer:
+    """Local mock of classifications.fcgi serving three hierarchies, one of which errors."""
+    hierarchies = {hid: _make_hierarchy(hid, n_nodes=hid) for hid in (3, 4, 5)}
+
+    def classifications(query: dict[str, list[str]]) -> tuple[int, bytes]:
+        (hid,) = query["hid"]
+        if hid == "index":
+            index = [
+                {k: v for k, v in h.items() if k != "Node"}
+                for h in hierarchies.values()
+            ]
+            return 200, json.dumps({"Hierarchies": {"Hierarchy": index}}).encode()
+        if hid == "4":
+            return 404, b"Status: 404"
+        return (
+            200,
+            json.dumps(
+                {"Hierarchies": {"Hierarchy": [hierarchies[int(hid)]]}}
+            ).encode(),
+        )
+
+    http_server.add_route("/classifications.fcgi", classifications)
+    monkeypatch.setattr(
+        PubchemClassificationApi, "REST_API", f"{http_server.url}/classifications.fcgi"
+    )
+    return http_server
+
+
+def test_create_nxo(pubchem_server: LocalHttpServer) -> None:
+    nxo = PubchemClassificationApi.create_nxo(hierarchy_id=5)
+    assert nxo.name == "005_test_tree_5"
+    assert list(nxo.graph) == [1, 2, 3, 4, 5]
+    assert nxo.graph.nodes[3] == {
+        "name": "Node 3",
+        "description": None,
+        "pubchem_hnid": 1003,
+        "url": None,
+    }
+    assert nxo.root == 1
+    assert list(nxo.graph.edges) == [(1, 2), (2, 3), (3, 4), (4, 5)]
+
+
+def test_export_hierarchies(pubchem_server: LocalHttpServer, tmp_path: Path) -> None:
+    results = export_hierarchies(
+        output_dir=tmp_path, max_workers=3, requests_per_second=100.0
+    )
+    assert [(r.nxo_name, r.status) for r in results] == [
+        ("003_test_tree_3", "written"),
+        ("004_test_tree_4", "failed"),
+        ("005_test_tree_5", "written"),
+    ]
+    assert "HTTPError" in str(results[1].detail)
+    assert tmp_path.joinpath("catalog.json").exists()
+    assert tmp_path.joinpath("005_test_tree_5.json").exists()
+    # rerun skips existing outputs
+    results = export_hierarchies(output_dir=tmp_path, requests_per_second=100.0)
+    assert [r.status for r in results] == ["skipped", "failed", "skipped"]
+
+
+def test_export_hierarchies_truncated(
+    pubchem_server: LocalHttpServer, tmp_path: Path
+) -> None:
+    """A hierarchy whose every download is cut short fails without aborting the export."""
+    pubchem_server.truncate(
+        "/classifications.fcgi?format=json&hid=5&start=root", at=20, times=10
+    )
+    results = export_hierarchies(
+        output_dir=tmp_path, max_workers=3, requests_per_second=100.0
+    )
+    assert [(r.nxo_name, r.status) for r in results] == [
+        ("003_test_tree_3", "written"),
+        ("004_test_tree_4", "failed"),
+        ("005_test_tree_5", "failed"),
+    ]
+    assert "ProtocolError" in str(results[2].detail)
+    assert tmp_path.joinpath("003_test_tree_3.json").exists()
+
+
+def test_export_hierarchies_parse_error(
+    pubchem_server: LocalHttpServer, tmp_path: Path
+) -> None:
+    """Errors other than failed requests abort the export."""
+    classifications = pubchem_server.routes["/classifications.fcgi"]
+
+    def route(query: dict[str, list[str]]) -> tuple[int, bytes]:
+        if query["hid"] == ["5"]:
+            return 200, b'{"Hierarchies": {"Hierarchy": [{"Node": [{}]}]}}'
+        return classifications(query)
+
+    pubchem_server.add_route("/classifications.fcgi", route)
+    with pytest.raises(KeyError):
+        export_hierarchies(output_dir=tmp_path, requests_per_second=100.0)
+
+
+def test_requester_retry(http_server: LocalHttpServer) -> None:
+    statuses = [503, 200]
+
+    def flaky(query: dict[str, list[str]]) -> tuple[int, bytes]:
+        return statuses.pop(0), b"{}"
+
+    http_server.add_route("/flaky", flaky)
+    requester = PubchemRequester(requests_per_second=100.0, backoff_factor=0.01)
+    path = requester.fetch(f"{http_server.url}/flaky", params={"hid": 1})
+    assert path.read_bytes() == b"{}"
+    # the retry was made by the requester, not the session
+    assert len(http_server.requests) == 2
+
+
+def test_rate_limiter() -> None:
+    limiter = RateLimiter(rate=50.0)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+    assert time.monotonic() - start >= 5 / 50.0
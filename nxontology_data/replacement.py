@@ -0,0 +1,92 @@
+"""
+Resolve chains of term replacements, such as obsolete terms replaced by other obsolete terms
+or alternative IDs of terms, to the terms that end each chain.
+"""
+
+import logging
+from collections.abc import Collection, Mapping
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReplacementResolution:
+    """
+    resolved maps terms with a replacement to the term that ends their chain of replacements.
+    cycles are chains of replacements that return to their first term,
+    which are reported as diagnostics and not resolved.
+    unresolved are terms in cycles or whose chain leads into a cycle.
+    """
+
+    resolved: dict[str, str] = field(default_factory=dict)
+    cycles: list[list[str]] = field(default_factory=list)
+    unresolved: set[str] = field(default_factory=set)
+
+    def get_replaced_terms(
+        self, current_terms: Collection[str]
+    ) -> dict[str, list[str]]:
+        """
+        Map each current term to the sorted terms it replaces, directly or via a chain,
+        excluding replaced terms that are themselves current.
+        """
+        current_to_old: dict[str, set[str]] = {}
+        for old_term, new_term in self.resolved.items():
+            if old_term in current_terms or new_term not in current_terms:
+                continue
+            current_to_old.setdefault(new_term, set()).add(old_term)
+        return {k: sorted(v) for k, v in current_to_old.items()}
+
+
+def _follow_chain(
+    start: str, replacements: Mapping[str, str], resolution: ReplacementResolution
+) -> tuple[list[str], str | None]:
+    """
+    Follow replacements from start until a term that ends the chain or is already resolved,
+    returning the terms on the path and their resolution, or None if the chain does not end.
+    Cycles found on the path are added to resolution.cycles.
+    """
+    path: list[str] = []
+    positions: dict[str, int] = {}
+    term = start
+    while term not in resolution.unresolved:
+        if term in resolution.resolved:
+            return path, resolution.resolved[term]
+        if term in positions:
+            cycle = path[positions[term] :]
+            # rotate the cycle to start with its smallest term for stable diagnostics
+            first = cycle.index(min(cycle))
+            resolution.cycles.append(cycle[first:] + cycle[:first])
+            break
+        if term not in replacements:
+            return path, term
+        positions[term] = len(path)
+        path.append(term)
+        term = replacements[term]
+    return path, None
+
+
+def resolve_replacements(replacements: Mapping[str, str]) -> ReplacementResolution:
+    """
+    Resolve replacements, a mapping from terms to the term that replaces them,
+    in time linear in the number of replacements.
+    Chains are followed iteratively, so long chains cannot exceed the recursion limit,
+    and every term on a followed chain is assigned its resolution (path compression),
+    so each term is visited once.
+    """
+    resolution = ReplacementResolution()
+    for start in replacements:
+        if start in resolution.resolved or start in resolution.unresolved:
+            continue
+        path, final = _follow_chain(start, replacements, resolution)
+        if final is None:
+            resolution.unresolved.update(path)
+        else:
+            resolution.resolved.update(dict.fromkeys(path, final))
+    for cycle in resolution.cycles:
+        logger.warning(f"Replacement cycle: {' -> '.join([*cycle, cycle[0]])}")
+    if resolution.unresolved:
+        logger.warning(
+            f"{len(resolution.unresolved):,} terms have replacement chains that do not end."
+        )
+    return resolution
@@ -0,0 +1,215 @@
+import logging
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.process
+import os
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from typing import Any, Literal
+
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Task:
+    """
+    Unit of work for `run_tasks`, run in a separate process.
+    func and kwargs must be picklable, e.g. func is defined at the top level of a module.
+    memory_gb is the estimated peak memory of the task,
+    used to limit how many tasks run concurrently.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+    deps: tuple[str, ...] = ()
+    memory_gb: float = 1.0
+
+
+@dataclass
+class TaskResult:
+    name: str
+    status: Literal["succeeded", "failed", "skipped"]
+    detail: str | None = None
+    start: float = 0.0
+    """Seconds from the start of the schedule until the task started."""
+    seconds: float = 0.0
+
+
+def get_total_memory_gb() -> float:
+    """Physical memory of this machine in gigabytes."""
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1e9
+
+
+def _sort_tasks(tasks: Iterable[Task]) -> list[Task]:
+    """Sort tasks topologically, preserving the input order where possible."""
+    name_to_task = {}
+    for task in tasks:
+        if task.name in name_to_task:
+            raise ValueError(f"Duplicate task name {task.name!r}")
+        name_to_task[task.name] = task
+    graph = nx.DiGraph()
+    graph.add_nodes_from(name_to_task)
+    for task in name_to_task.values():
+        for dep in task.deps:
+            if dep not in name_to_task:
+                raise ValueError(f"Task {task.name!r} depends on unknown task {dep!r}")
+            graph.add_edge(dep, task.name)
+    if not nx.is_directed_acyclic_graph(graph):
+        raise ValueError(f"Task dependencies contain a cycle: {nx.find_cycle(graph)}")
+    order = {name: i for i, name in enumerate(name_to_task)}
+    return [
+        name_to_task[name]
+        for name in nx.lexicographical_topological_sort(graph, key=order.__getitem__)
+    ]
+
+
+def _run_child(
+    func: Callable[..., Any], kwargs: dict[str, Any], conn: Connection
+) -> None:
+    """Run a task in a child process, sending None or an error description to conn."""
+    try:
+        func(**kwargs)
+    except BaseException as e:
+        logger.exception(f"Task failed with {type(e).__name__}")
+        # keep the message small enough to not block on a full pipe
+        conn.send(f"{type(e).__name__}: {e}"[:2000])
+    else:
+        conn.send(None)
+    finally:
+        conn.close()
+
+
+@dataclass
+class _RunningTask:
+    task: Task
+    process: multiprocessing.process.BaseProcess
+    conn: Connection
+    start: float
+
+
+def _finish_task(running: _RunningTask, schedule_start: float) -> TaskResult:
+    """Collect the result of a task whose process has exited."""
+    running.process.join()
+    result = TaskResult(
+        running.task.name,
+        "succeeded",
+        start=running.start - schedule_start,
+        seconds=time.perf_counter() - running.start,
+    )
+    try:
+        detail = running.conn.recv()
+    except EOFError:
+        detail = None
+    running.conn.close()
+    exitcode = running.process.exitcode
+    if exitcode:
+        # process exited without reporting, such as when killed by the OOM killer
+        detail = detail or (
+            f"killed by signal {-exitcode}"
+            if exitcode < 0
+            else f"exited with code {exitcode}"
+        )
+    if detail is not None:
+        logger.error(f"Task {result.name} failed: {detail}")
+        result.status = "failed"
+        result.detail = detail
+    else:
+        logger.info(f"Finished task {result.name} in {result.seconds:.1f}s")
+    return result
+
+
+def run_tasks(
+    tasks: Iterable[Task],
+    max_workers: int | None = None,
+    memory_gb: float | None = None,
+) -> list[TaskResult]:
+    """
+    Run a DAG of tasks in parallel processes, starting each task once its dependencies succeed.
+    Each task runs in a fresh process, so memory is released when the task finishes
+    and a killed task does not affect other tasks.
+    At most max_workers tasks run concurrently (default: number of CPUs),
+    and a task only starts when the memory_gb estimates of running tasks plus its own
+    fit within memory_gb (default: 80% of physical memory).
+    A task whose estimate exceeds memory_gb runs when no other task is running.
+    Tasks that depend on a failed task are skipped.
+    Returns results in topological order.
+    """
+    pending = _sort_tasks(tasks)
+    order = [task.name for task in pending]
+    max_workers = max_workers or os.cpu_count() or 1
+    if memory_gb is None:
+        memory_gb = 0.8 * get_total_memory_gb()
+    results: dict[str, TaskResult] = {}
+    running: dict[int, _RunningTask] = {}
+    schedule_start = time.perf_counter()
+    while pending or running:
+        for task in list(pending):
+            failed_deps = [
+                dep
+                for dep in task.deps
+                if dep in results and results[dep].status != "succeeded"
+            ]
+            if failed_deps:
+                pending.remove(task)
+                results[task.name] = TaskResult(
+                    task.name, "skipped", detail=f"dependencies failed: {failed_deps}"
+                )
+                continue
+            if not all(dep in results for dep in task.deps):
+                continue
+            used_gb = sum(run.task.memory_gb for run in running.values())
+            if len(running) >= max_workers or (
+                running and used_gb + task.memory_gb > memory_gb
+            ):
+                continue
+            logger.info(f"Starting task {task.name}")
+            pending.remove(task)
+            receive_conn, send_conn = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_run_child,
+                args=(task.func, task.kwargs, send_conn),
+                name=f"task-{task.name}",
+            )
+            process.start()
+            send_conn.close()
+            running[process.sentinel] = _RunningTask(
+                task, process, receive_conn, time.perf_counter()
+            )
+        if not running:
+            # unreachable for a valid DAG, but never wait without running tasks
+            for task in pending:
+                results[task.name] = TaskResult(
+                    task.name, "skipped", detail="could not be scheduled"
+                )
+            break
+        for sentinel in multiprocessing.connection.wait(list(running)):
+            assert isinstance(sentinel, int)
+            result = _finish_task(running.pop(sentinel), schedule_start)
+            results[result.name] = result
+    return [results[name] for name in order]
+
+
+def format_report(results: list[TaskResult]) -> str:
+    """Format a timing report of task results as a text table."""
+    name_width = max([len("task"), *(len(result.name) for result in results)])
+    lines = [f"{'task':<{name_width}}  {'status':<9}  {'start':>8}  {'seconds':>8}"]
+    for result in results:
+        line = (
+            f"{result.name:<{name_width}}  {result.status:<9}  "
+            f"{result.start:>8.1f}  {result.seconds:>8.1f}"
+        )
+        if result.detail:
+            line += f"  {result.detail}"
+        lines.append(line)
+    wall = max((result.start + result.seconds for result in results), default=0.0)
+    total = sum(result.seconds for result in results)
+    lines.append(
+        f"Wall time {wall:.1f}s for {total:.1f}s of task time "
+        f"({total / wall if wall else 0:.1f}x parallelism)."
+    )
+    return "\n".join(lines)
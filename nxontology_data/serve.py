@@ -0,0 +1,278 @@
+"""
+Local HTTP server answering batch lookups from the built outputs,
+such that services share one process holding compact indexes
+rather than each loading the ontologies into memory.
+Requests are POSTed as JSON objects and responses are JSON objects with a results mapping.
+Connections are kept alive (HTTP/1.1), and each connection is handled by its own thread.
+"""
+
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from nxontology_data.closure import Closure, read_closure
+from nxontology_data.label_index import LabelIndex
+from nxontology_data.utils import get_output_dir, group_records
+from nxontology_data.xref_index import XrefIndex, read_xref_index
+
+logger = logging.getLogger(__name__)
+
+TOP_LEVEL_MAP_PATH = Path(
+    "mesh", "mesh_topical_descriptor_descendants_top_level_map.json.gz"
+)
+"""Path of the MeSH top-level map relative to the output directory."""
+
+
+class InvalidRequest(Exception):
+    """Invalid lookup request, which is returned as a 400 response."""
+
+
+@dataclass
+class OntologyIndex:
+    """Ancestors from the closure of an ontology and descendants from its transpose."""
+
+    closure: Closure
+    descendant_indptr: npt.NDArray[np.int64]
+    descendants: npt.NDArray[np.int32]
+    descendant_distances: npt.NDArray[np.int16]
+
+    @classmethod
+    def from_closure(cls, closure: Closure) -> "OntologyIndex":
+        pair_nodes = closure.pair_nodes()
+        # lexsort sorts by the last key first
+        order = np.lexsort((pair_nodes, closure.ancestors))
+        indptr = np.zeros(len(closure.ids) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(closure.ancestors, minlength=len(closure.ids)), out=indptr[1:]
+        )
+        return cls(
+            closure=closure,
+            descendant_indptr=indptr,
+            descendants=pair_nodes[order].astype(np.int32),
+            descendant_distances=closure.distances[order],
+        )
+
+    def get_ancestors(self, node: str) -> dict[str, int] | None:
+        try:
+            return self.closure.get_ancestors(node)
+        except KeyError:
+            return None
+
+    def get_descendants(self, node: str) -> dict[str, int] | None:
+        """Map the descendants of node, including itself, to their distance from node."""
+        try:
+            i = self.closure.index(node)
+        except KeyError:
+            return None
+        start, stop = self.descendant_indptr[i], self.descendant_indptr[i + 1]
+        return dict(
+            zip(
+                self.closure.ids[self.descendants[start:stop]].tolist(),
+                self.descendant_distances[start:stop].tolist(),
+                strict=True,
+            )
+        )
+
+
+@dataclass
+class OutputIndexes:
+    """
+    Indexes of the outputs in an output directory, keyed by output name,
+    such as `mesh_full` for ontologies, `mesh` for label indexes,
+    and `efo_otar_profile` for xref indexes.
+    """
+
+    ontologies: dict[str, OntologyIndex] = field(default_factory=dict)
+    label_indexes: dict[str, LabelIndex] = field(default_factory=dict)
+    xref_indexes: dict[str, XrefIndex] = field(default_factory=dict)
+    top_level_map: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    """Top-level categories of MeSH topical descriptors."""
+
+    @classmethod
+    def load(cls, output_dir: Path) -> "OutputIndexes":
+        """Load the closures, label indexes, xref indexes, and MeSH top-level map in output_dir."""
+        indexes = cls()
+        for path in sorted(output_dir.glob("*/*_closure.npz")):
+            name = path.name.removesuffix("_closure.npz")
+            indexes.ontologies[name] = OntologyIndex.from_closure(read_closure(path))
+        for path in sorted(output_dir.glob("*/*_label_index.bin")):
+            name = path.name.removesuffix("_label_index.bin")
+            indexes.label_indexes[name] = LabelIndex(path)
+        for path in sorted(output_dir.glob("mappings/*_xref_index.npz")):
+            name = path.name.removesuffix("_xref_index.npz")
+            xref_index = read_xref_index(path)
+            # build lookup dictionaries before requests are handled concurrently
+            xref_index.get_xrefs([])
+            xref_index.get_efo_ids([])
+            indexes.xref_indexes[name] = xref_index
+        top_level_path = output_dir.joinpath(TOP_LEVEL_MAP_PATH)
+        if top_level_path.exists():
+            top_df = pd.read_json(top_level_path, dtype=False)
+            indexes.top_level_map = group_records(
+                top_df,
+                "mesh_id",
+                ["top_mesh_id", "top_mesh_label", "top_is_disease", "depth"],
+            )
+        logger.info(
+            f"Loaded {len(indexes.ontologies):,} ontologies, "
+            f"{len(indexes.label_indexes):,} label indexes, "
+            f"{len(indexes.xref_indexes):,} xref indexes, "
+            f"and top-level categories of {len(indexes.top_level_map):,} MeSH terms"
+        )
+        return indexes
+
+    def close(self) -> None:
+        for label_index in self.label_indexes.values():
+            label_index.close()
+
+    def describe(self) -> dict[str, list[str]]:
+        return {
+            "ontologies": list(self.ontologies),
+            "label_indexes": list(self.label_indexes),
+            "xref_indexes": list(self.xref_indexes),
+        }
+
+    @staticmethod
+    def _get(indexes: dict[str, Any], name: Any, kind: str) -> Any:
+        if not isinstance(name, str) or name not in indexes:
+            raise InvalidRequest(
+                f"Unknown {kind} {name!r}. Choose from: {', '.join(indexes)}."
+            )
+        return indexes[name]
+
+    def ancestors(self, request: dict[str, Any]) -> dict[str, Any]:
+        ontology = self._get(self.ontologies, request.get("ontology"), "ontology")
+        return {node: ontology.get_ancestors(node) for node in _get_ids(request)}
+
+    def descendants(self, request: dict[str, Any]) -> dict[str, Any]:
+        ontology = self._get(self.ontologies, request.get("ontology"), "ontology")
+        return {node: ontology.get_descendants(node) for node in _get_ids(request)}
+
+    def top_level(self, request: dict[str, Any]) -> dict[str, Any]:
+        return {node: self.top_level_map.get(node, []) for node in _get_ids(request)}
+
+    def xrefs(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Translate EFO terms to xrefs, or xrefs to EFO terms when reverse is true."""
+        xref_index = self._get(
+            self.xref_indexes, request.get("efo_name", "efo_otar_profile"), "xref index"
+        )
+        if request.get("reverse"):
+            translations: dict[str, Any] = xref_index.get_efo_ids(_get_ids(request))
+        else:
+            translations = xref_index.get_xrefs(
+                _get_ids(request), prefix=request.get("prefix")
+            )
+        return translations
+
+    def labels(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Search labels, by prefix when prefix is true, returning at most limit matches each."""
+        label_index = self._get(self.label_indexes, request.get("index"), "label index")
+        limit = request.get("limit")
+        if limit is not None and not isinstance(limit, int):
+            raise InvalidRequest("limit must be an integer.")
+        results = {}
+        for label in _get_ids(request):
+            if request.get("prefix"):
+                matches = label_index.prefix(label, limit=limit)
+            else:
+                matches = label_index.lookup(label)[:limit]
+            results[label] = [
+                {"key": match.key, "id": match.id, "tag": match.tag}
+                for match in matches
+            ]
+        return results
+
+
+def _get_ids(request: dict[str, Any]) -> list[str]:
+    ids = request.get("ids")
+    if not isinstance(ids, list) or not all(isinstance(x, str) for x in ids):
+        raise InvalidRequest("Request must have ids, a list of strings.")
+    return ids
+
+
+class LookupRequestHandler(BaseHTTPRequestHandler):
+    """Handle lookups of the indexes of the server, which is a `LookupServer`."""
+
+    protocol_version = "HTTP/1.1"
+    server: "LookupServer"
+
+    def _send_json(self, status: HTTPStatus, data: Any) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path != "/":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown {self.path}"})
+            return
+        self._send_json(HTTPStatus.OK, self.server.indexes.describe())
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        endpoint = self.server.endpoints.get(self.path)
+        if endpoint is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown {self.path}"})
+            return
+        try:
+            request = json.loads(body)
+            if not isinstance(request, dict):
+                raise InvalidRequest("Request must be a JSON object.")
+            results = endpoint(request)
+        # ValueError includes JSONDecodeError and UnicodeDecodeError for bodies that are not UTF-8
+        except (ValueError, InvalidRequest) as error:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+        self._send_json(HTTPStatus.OK, {"results": results})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+class LookupServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, indexes: OutputIndexes, address: tuple[str, int]) -> None:
+        super().__init__(address, LookupRequestHandler)
+        self.indexes = indexes
+        self.endpoints: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+            "/ancestors": indexes.ancestors,
+            "/descendants": indexes.descendants,
+            "/top_level": indexes.top_level,
+            "/xrefs": indexes.xrefs,
+            "/labels": indexes.labels,
+        }
+
+
+def serve(
+    output_dir: str | None = None, host: str = "127.0.0.1", port: int = 8000
+) -> None:
+    """
+    Serve batch lookups of the outputs in output_dir (default: the output directory of this repository)
+    until interrupted. Endpoints take POSTed JSON objects with ids, a list of identifiers or labels:
+    /ancestors and /descendants with ontology, such as mesh_full;
+    /top_level of MeSH terms;
+    /xrefs with efo_name (default: efo_otar_profile), and prefix, such as MESH, or reverse to translate xrefs to EFO;
+    /labels with index, such as mesh, and optionally prefix and limit.
+    GET / lists the loaded indexes.
+    """
+    indexes = OutputIndexes.load(Path(output_dir) if output_dir else get_output_dir())
+    with LookupServer(indexes, (host, port)) as server:
+        logger.info(f"Serving lookups on http://{host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            indexes.close()
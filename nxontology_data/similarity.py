@@ -0,0 +1,219 @@
+"""
+Semantic similarity of many node pairs at once, equivalent to `nxontology.similarity.SimilarityIC`,
+computed from the closure and node metrics of an exported ontology.
+The ancestors of every node are bitsets whose bits are ordered by decreasing information content,
+such that the most informative common ancestor of a pair is the lowest bit set in both bitsets.
+"""
+
+import concurrent.futures
+import logging
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from nxontology_data.closure import Closure
+from nxontology_data.node_metrics import compute_node_metrics
+
+logger = logging.getLogger(__name__)
+
+_popcounts = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+"""Number of set bits in each byte value."""
+
+
+@dataclass
+class SimilarityIndex:
+    """
+    Ancestor bitsets and information content (IC) of the nodes of an ontology.
+    Leaves are only ancestors of themselves, so bits are only allocated to other nodes,
+    where columns are those nodes ordered by decreasing IC and then decreasing identifier,
+    the tie-breaking of `SimilarityIC.mica`.
+    Row i of bits has the bit of column j set when columns[j] is an ancestor of node i.
+    """
+
+    ids: npt.NDArray[np.str_]
+    ic_metric: str
+    ic: npt.NDArray[np.float64]
+    ic_scaled: npt.NDArray[np.float64]
+    is_leaf: npt.NDArray[np.bool_]
+    n_ancestors: npt.NDArray[np.int64]
+    columns: npt.NDArray[np.int64]
+    column_of: npt.NDArray[np.int64]
+    """Column of each node or -1 for leaves."""
+    bits: npt.NDArray[np.uint64]
+
+    @classmethod
+    def from_closure(
+        cls, closure: Closure, ic_metric: str = "intrinsic_ic_sanchez"
+    ) -> "SimilarityIndex":
+        metrics = compute_node_metrics(closure)
+        ic_metrics = [
+            column
+            for column in metrics.columns
+            if column.startswith("intrinsic_ic") and not column.endswith("_scaled")
+        ]
+        if ic_metric not in ic_metrics:
+            raise ValueError(
+                f"{ic_metric!r} is not a supported ic_metric. "
+                f"Choose from: {', '.join(ic_metrics)}."
+            )
+        ic = metrics[ic_metric].to_numpy()
+        is_leaf = (metrics["n_descendants"] == 1).to_numpy()
+        internal = np.flatnonzero(~is_leaf)
+        # lexsort sorts by the last key first
+        order = np.lexsort((-np.arange(len(internal)), -ic[internal]))
+        columns = internal[order]
+        column_of = np.full(len(closure.ids), -1, dtype=np.int64)
+        column_of[columns] = np.arange(len(columns))
+        n_words = max(1, (len(columns) + 63) // 64)
+        bits = np.zeros((len(closure.ids), n_words), dtype=np.uint64)
+        pair_columns = column_of[closure.ancestors]
+        internal_pairs = pair_columns >= 0
+        pair_columns = pair_columns[internal_pairs]
+        np.bitwise_or.at(
+            bits,
+            (closure.pair_nodes()[internal_pairs], pair_columns // 64),
+            np.left_shift(np.uint64(1), (pair_columns % 64).astype(np.uint64)),
+        )
+        logger.info(
+            f"Indexed {len(closure.ids):,} nodes with {len(columns):,} ancestor bits "
+            f"({bits.nbytes / 1_000_000:.1f} MB)"
+        )
+        return cls(
+            ids=closure.ids,
+            ic_metric=ic_metric,
+            ic=ic,
+            ic_scaled=metrics[f"{ic_metric}_scaled"].to_numpy(),
+            is_leaf=is_leaf,
+            n_ancestors=metrics["n_ancestors"].to_numpy(),
+            columns=columns,
+            column_of=column_of,
+            bits=bits,
+        )
+
+    def get_indices(self, nodes: Sequence[str]) -> npt.NDArray[np.int64]:
+        """Integer indices of nodes, found by binary search."""
+        nodes_array = np.asarray(nodes, dtype=np.str_)
+        indices = np.searchsorted(self.ids, nodes_array)
+        found = indices < len(self.ids)
+        found[found] = self.ids[indices[found]] == nodes_array[found]
+        if not found.all():
+            raise KeyError(nodes_array[~found][0])
+        return indices.astype(np.int64)
+
+
+def _popcount(bits: npt.NDArray[np.uint64]) -> npt.NDArray[np.int64]:
+    """Number of set bits in each row."""
+    counts: npt.NDArray[np.int64] = _popcounts[bits.view(np.uint8)].sum(axis=1)
+    return counts
+
+
+def _subsumes(
+    index: SimilarityIndex, i: npt.NDArray[np.int64], j: npt.NDArray[np.int64]
+) -> npt.NDArray[np.bool_]:
+    """Whether node i is an ancestor of node j."""
+    column = index.column_of[i]
+    internal = column >= 0
+    words = index.bits[j[internal], column[internal] // 64]
+    subsumes: npt.NDArray[np.bool_] = i == j
+    subsumes[internal] = (
+        words >> (column[internal] % 64).astype(np.uint64)
+    ) & np.uint64(1) == 1
+    return subsumes
+
+
+def _compute_chunk(
+    index: SimilarityIndex, i: npt.NDArray[np.int64], j: npt.NDArray[np.int64]
+) -> pd.DataFrame:
+    common = index.bits[i] & index.bits[j]
+    same_leaf = (i == j) & index.is_leaf[i]
+    n_common = _popcount(common) + same_leaf
+    n_union = index.n_ancestors[i] + index.n_ancestors[j] - n_common
+    # most informative common ancestor from the lowest bit set in common
+    nonzero = common != 0
+    has_common = nonzero.any(axis=1)
+    first_word = nonzero.argmax(axis=1)
+    word = common[np.arange(len(common)), first_word]
+    # isolate the lowest set bit, whose base 2 logarithm is exact
+    lowest_bit = word & (~word + np.uint64(1))
+    column = first_word * 64 + np.log2(np.maximum(lowest_bit, 1)).astype(np.int64)
+    mica = np.where(has_common, index.columns[np.where(has_common, column, 0)], -1)
+    # a leaf is the only common ancestor it lacks a bit for, and is its own most informative
+    mica = np.where(same_leaf, i, mica)
+    resnik = np.where(mica >= 0, index.ic[mica], 0.0)
+    resnik_scaled = np.where(mica >= 0, index.ic_scaled[mica], 0.0)
+    mica_ids = index.ids[np.maximum(mica, 0)].astype(object)
+    mica_ids[mica < 0] = None
+    ic_sum = index.ic[i] + index.ic[j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lin = np.where(ic_sum == 0.0, 1.0, 2 * resnik / ic_sum)
+    return pd.DataFrame(
+        {
+            "node_0": index.ids[i],
+            "node_1": index.ids[j],
+            "node_0_subsumes_1": _subsumes(index, i, j),
+            "node_1_subsumes_0": _subsumes(index, j, i),
+            "n_common_ancestors": n_common,
+            "n_union_ancestors": n_union,
+            "batet": n_common / n_union,
+            "ic_metric": index.ic_metric,
+            "mica": mica_ids,
+            "resnik": resnik,
+            "resnik_scaled": resnik_scaled,
+            "lin": lin,
+            "jiang": 1 / (ic_sum - 2 * resnik + 1),
+            "jiang_seco": 1
+            - (index.ic_scaled[i] + index.ic_scaled[j] - 2 * resnik_scaled) / 2,
+        }
+    )
+
+
+_worker_index: SimilarityIndex | None = None
+"""Index of a worker process of `compute_similarities`, set by its initializer."""
+
+
+def _set_worker_index(index: SimilarityIndex) -> None:
+    global _worker_index
+    _worker_index = index
+
+
+def _compute_worker_chunk(
+    i: npt.NDArray[np.int64], j: npt.NDArray[np.int64]
+) -> pd.DataFrame:
+    assert _worker_index is not None
+    return _compute_chunk(_worker_index, i, j)
+
+
+def compute_similarities(
+    index: SimilarityIndex,
+    nodes_0: Sequence[str],
+    nodes_1: Sequence[str],
+    chunk_size: int = 10_000,
+    processes: int = 1,
+) -> pd.DataFrame:
+    """
+    Compute the similarity of each pair of nodes in nodes_0 and nodes_1,
+    with the columns of `SimilarityIC.results` except depth.
+    Pairs are computed in chunks of chunk_size, such that memory is bounded by
+    chunk_size times the size of a bitset, and chunks run in a pool of processes when processes > 1.
+    """
+    if len(nodes_0) != len(nodes_1):
+        raise ValueError("nodes_0 and nodes_1 must have the same length.")
+    i, j = index.get_indices(nodes_0), index.get_indices(nodes_1)
+    starts = range(0, len(i), chunk_size)
+    chunks = [
+        (i[start : start + chunk_size], j[start : start + chunk_size])
+        for start in starts
+    ]
+    if processes > 1 and len(chunks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, initializer=_set_worker_index, initargs=(index,)
+        ) as executor:
+            dfs = list(executor.map(_compute_worker_chunk, *zip(*chunks, strict=True)))
+    else:
+        dfs = [_compute_chunk(index, *chunk) for chunk in chunks]
+    if not dfs:
+        return _compute_chunk(index, i, j)
+    return pd.concat(dfs, ignore_index=True)
@@ -0,0 +1,251 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import tempfile
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Generic, TypeVar
+
+from nxontology_data.cache import get_cache_dir, get_file_sha256, get_source_cache
+from nxontology_data.instrumentation import measure
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Code = Callable[..., Any] | str
+"""Function whose source code, or text such as a SPARQL query, that versions a stage."""
+
+
+def get_checkpoint_dir(*parts: str) -> Path:
+    """Directory for pipeline stage checkpoints, which is within the source cache directory."""
+    return get_cache_dir().joinpath("checkpoints", *parts)
+
+
+@dataclass(frozen=True)
+class OutputFile:
+    """Output file written by a stage, with the SHA-256 of its content when written."""
+
+    path: Path
+    sha256: str
+
+    def is_current(self) -> bool:
+        """Whether the file still exists with the content written by the stage."""
+        try:
+            return get_file_sha256(self.path) == self.sha256
+        except FileNotFoundError:
+            return False
+
+
+def get_code_version(code: Iterable[Code]) -> str:
+    """
+    Hash the source code of functions and other text, such as SPARQL queries.
+    Only the code listed is versioned, so list any helpers whose changes should invalidate a stage.
+    Functions without Python source, such as builtins, are versioned by their qualified name.
+    """
+    sha256 = hashlib.sha256()
+    for item in code:
+        if isinstance(item, str):
+            text = item
+        else:
+            try:
+                text = inspect.getsource(item)
+            except (OSError, TypeError):
+                text = f"{getattr(item, '__module__', None)}.{item.__qualname__}"
+        sha256.update(hashlib.sha256(text.encode()).digest())
+    return sha256.hexdigest()
+
+
+class Stage(Generic[T]):
+    """
+    Named step of a Pipeline whose result is computed lazily.
+    The key of a stage hashes its name, code version, parameters, and the keys of its dependencies,
+    such that it is known without computing any results.
+    """
+
+    def __init__(
+        self,
+        pipeline: "Pipeline",
+        name: str,
+        func: Callable[..., T],
+        deps: tuple["Stage[Any]", ...],
+        after: tuple["Stage[Any]", ...],
+        key: str,
+        persist: bool,
+        is_valid: Callable[[T], bool] | None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.name = name
+        self.func = func
+        self.deps = deps
+        self.after = after
+        self.key = key
+        self.persist = persist
+        self.is_valid = is_valid
+        self._computed = False
+        self._result: T
+
+    @property
+    def checkpoint_path(self) -> Path:
+        return self.pipeline.checkpoint_dir.joinpath(f"{self.name}.{self.key[:20]}.pkl")
+
+    def result(self) -> T:
+        """Return the result of this stage, computing it and its dependencies when required."""
+        if self._computed:
+            return self._result
+        result = self._load_checkpoint() if self.pipeline.resume else None
+        if result is None:
+            for stage in self.after:
+                stage.result()
+            args = [dep.result() for dep in self.deps]
+            logger.info(f"Running stage {self.name}")
+            with measure(f"stage:{self.name}") as step:
+                self._result = self.func(*args)
+            self.pipeline.timings[self.name] = step.wall_seconds
+            if self.persist:
+                self._write_checkpoint()
+        else:
+            logger.info(f"Resuming stage {self.name} from {self.checkpoint_path}")
+            self._result = result[0]
+        self._computed = True
+        return self._result
+
+    def _load_checkpoint(self) -> tuple[T] | None:
+        """Return a 1-tuple of the checkpointed result or None if it is missing or invalid."""
+        if not self.persist:
+            return None
+        try:
+            with self.checkpoint_path.open("rb") as read_file:
+                result: T = pickle.load(read_file)
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+            return None
+        if self.is_valid is not None and not self.is_valid(result):
+            return None
+        # record the access for least recently used eviction from the cache
+        self.checkpoint_path.touch()
+        return (result,)
+
+    def _write_checkpoint(self) -> None:
+        checkpoint_dir = self.pipeline.checkpoint_dir
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=checkpoint_dir, suffix=".tmp", delete=False
+        ) as tmp:
+            pickle.dump(self._result, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp.name, self.checkpoint_path)
+        # remove checkpoints for previous versions of this stage
+        for path in checkpoint_dir.glob(f"{self.name}.*.pkl"):
+            if path != self.checkpoint_path:
+                path.unlink(missing_ok=True)
+        cache = get_source_cache()
+        if checkpoint_dir.is_relative_to(cache.root):
+            cache.evict()
+
+
+class Pipeline:
+    """
+    Pipeline of named stages whose results are checkpointed to checkpoint_dir.
+    When resume is True, stages whose key matches an existing checkpoint
+    are loaded rather than computed, so only stages whose inputs or code changed are rerun.
+    Since stage results are computed lazily, upstream stages such as parsing the source
+    are skipped entirely when all their dependents are resumed.
+    When resume is False, all stages are computed and checkpoints are overwritten.
+    """
+
+    def __init__(self, checkpoint_dir: Path, resume: bool = False) -> None:
+        self.checkpoint_dir = checkpoint_dir
+        self.resume = resume
+        self.stages: dict[str, Stage[Any]] = {}
+        self.timings: dict[str, float] = {}
+
+    def source(self, name: str, content_key: str, value: T) -> Stage[T]:
+        """
+        Add an eagerly evaluated source stage, such as a downloaded file,
+        whose key is derived from content_key, such as the SHA-256 of the downloaded content.
+        """
+        stage = self.stage(name, lambda: value, params=content_key, persist=False)
+        stage._result = value
+        stage._computed = True
+        return stage
+
+    def stage(
+        self,
+        name: str,
+        func: Callable[..., T],
+        *deps: Stage[Any],
+        after: Iterable[Stage[Any]] = (),
+        code: Iterable[Code] = (),
+        params: Any = None,
+        persist: bool = True,
+        is_valid: Callable[[T], bool] | None = None,
+    ) -> Stage[T]:
+        """
+        Add a stage that computes func with the results of deps as positional arguments.
+        Stages in after are computed before func and are part of the key,
+        but their results are not passed to func, such as when func reads state they load.
+        code lists functions and text that version the stage, in addition to func.
+        params must be JSON serializable and are included in the stage key.
+        Disable persist for results that are not worth checkpointing, such as parsed RDF graphs.
+        is_valid is called on resumed results, such that returning False recomputes the stage,
+        for example when a stage's output file no longer exists.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage {name!r} already exists.")
+        key_data = {
+            "name": name,
+            "code": get_code_version([func, *code]),
+            "params": params,
+            "deps": [dep.key for dep in deps],
+            "after": [stage.key for stage in after],
+        }
+        key = hashlib.sha256(
+            json.dumps(key_data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        stage = Stage(self, name, func, deps, tuple(after), key, persist, is_valid)
+        self.stages[name] = stage
+        return stage
+
+    def output(
+        self,
+        name: str,
+        write: Callable[..., Path],
+        *deps: Stage[Any],
+        code: Iterable[Code] = (),
+        params: Any = None,
+    ) -> Stage[OutputFile]:
+        """
+        Add a stage that writes an output file with write, which returns the path written.
+        The stage is rerun on resume unless the file still has the content it was written with,
+        for example when another build has since overwritten the file.
+        """
+
+        def write_output(*results: Any) -> OutputFile:
+            path = write(*results)
+            return OutputFile(path=path, sha256=get_file_sha256(path))
+
+        return self.stage(
+            name,
+            write_output,
+            *deps,
+            code=[write, *code],
+            params=params,
+            is_valid=OutputFile.is_current,
+        )
+
+    def run(self) -> None:
+        """
+        Compute or resume all persisted stages in the order they were added.
+        Stages that are not persisted are only computed as dependencies of other stages.
+        """
+        for stage in self.stages.values():
+            if stage.persist:
+                stage.result()
+        if self.timings:
+            logger.info(
+                "Computed stages: "
+                + ", ".join(f"{k} ({v:.1f}s)" for k, v in self.timings.items())
+            )
@@ -0,0 +1,380 @@
+"""
+Generators of synthetic source files shaped like MeSH, EFO, PubChem, and HGNC,
+for measuring how pipelines scale without network access.
+Files are written as streams, such that inputs of millions of nodes do not need to fit in memory.
+"""
+
+import gzip
+import json
+import random
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+from xml.sax.saxutils import escape
+
+import fsspec
+import pandas as pd
+
+_WORDS = (
+    "acute chronic syndrome disease disorder cell tissue protein receptor "
+    "factor deficiency inflammation neoplasm infection abnormality type "
+    "familial congenital primary secondary malignant benign"
+).split()
+
+
+@dataclass(frozen=True)
+class SyntheticShape:
+    """
+    Shape of a synthetic ontology.
+    Nodes form a spanning forest of n_roots trees where each node has branching children,
+    such that depth is about log(n_nodes) / log(branching).
+    extra_parent_rate is the fraction of non-root nodes with a second parent, making the graph a DAG.
+    n_synonyms and text_words control the size of node attributes.
+    """
+
+    n_nodes: int = 1000
+    branching: int = 5
+    n_roots: int = 1
+    extra_parent_rate: float = 0.1
+    n_synonyms: int = 2
+    text_words: int = 20
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.n_roots <= self.n_nodes:
+            raise ValueError("n_roots must be between 1 and n_nodes.")
+        if self.branching < 1:
+            raise ValueError("branching must be positive.")
+
+
+def iter_parents(shape: SyntheticShape) -> Iterator[tuple[int, list[int]]]:
+    """
+    Yield (node, parents) for each node in order, where parents precede their children.
+    The first parent is the node's parent in the spanning forest.
+    """
+    rng = random.Random(shape.seed)
+    for node in range(shape.n_nodes):
+        if node < shape.n_roots:
+            yield node, []
+            continue
+        parent = (node - shape.n_roots) // shape.branching
+        parents = [parent]
+        if rng.random() < shape.extra_parent_rate:
+            extra = rng.randrange(node)
+            if extra != parent:
+                parents.append(extra)
+        yield node, parents
+
+
+def iter_edges(shape: SyntheticShape) -> Iterator[tuple[int, int]]:
+    """Yield (parent, child) edges of the synthetic ontology."""
+    for node, parents in iter_parents(shape):
+        for parent in parents:
+            yield parent, node
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choices(_WORDS, k=n_words))
+
+
+def _open_text(path: Path) -> IO[str]:
+    """Open path for writing text, with gzip compression when it ends with .gz."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "wt", encoding="utf-8")
+    return path.open("w", encoding="utf-8")
+
+
+MESH_VOCAB_TTL = """\
+@prefix meshv: <http://id.nlm.nih.gov/mesh/vocab#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+meshv:TopicalDescriptor rdfs:subClassOf meshv:Descriptor .
+meshv:SCR_Chemical rdfs:subClassOf meshv:SupplementaryConceptRecord .
+meshv:AllowedDescriptorQualifierPair rdfs:subClassOf meshv:DescriptorQualifierPair .
+meshv:DisallowedDescriptorQualifierPair rdfs:subClassOf meshv:DescriptorQualifierPair .
+"""
+"""Subset of the MeSH vocabulary used by the MeSH queries."""
+
+
+def write_mesh_rdf(
+    directory: Path,
+    shape: SyntheticShape,
+    year_yyyy: str = "2020",
+    n_scrs: int = 0,
+    compress: bool = False,
+) -> tuple[Path, Path]:
+    """
+    Write MeSH-shaped RDF for `MeshLoader` to directory, returning the paths of
+    the vocabulary (Turtle) and triples (N-Triples, gzipped when compress is True),
+    named like the MeSH release files read by `MeshLoader._read_mesh_rdf`.
+    Nodes of shape are TopicalDescriptors related by broaderDescriptor with tree numbers,
+    each with a preferred concept and term with n_synonyms alternative labels.
+    Every tenth descriptor has an allowed descriptor-qualifier pair.
+    n_scrs Supplementary Concept Records (SCR_Chemical) are mapped to 1 or 2 random descriptors.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    vocab_path = directory.joinpath("vocabulary_1.0.0.ttl")
+    vocab_path.write_text(MESH_VOCAB_TTL)
+    nt_path = directory.joinpath(f"mesh{year_yyyy}.nt" + (".gz" if compress else ""))
+    mesh = f"http://id.nlm.nih.gov/mesh/{year_yyyy}/"
+    meshv = "http://id.nlm.nih.gov/mesh/vocab#"
+    rdf_type = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+    rdfs_label = "<http://www.w3.org/2000/01/rdf-schema#label>"
+    date = "^^<http://www.w3.org/2001/XMLSchema#date>"
+    rng = random.Random(shape.seed)
+
+    def record(
+        write_file: IO[str], number: int, mesh_id: str, mesh_class: str, label: str
+    ) -> None:
+        uri = f"{mesh}{mesh_id}"
+        concept, term = f"{mesh}M{number:09d}", f"{mesh}T{number:09d}"
+        write_file.write(
+            f"<{uri}> {rdf_type} <{meshv}{mesh_class}> .\n"
+            f'<{uri}> <{meshv}identifier> "{mesh_id}" .\n'
+            f'<{uri}> {rdfs_label} "{label}"@en .\n'
+            f'<{uri}> <{meshv}dateCreated> "2000-01-01"{date} .\n'
+            f'<{uri}> <{meshv}dateRevised> "{year_yyyy}-01-01"{date} .\n'
+            f'<{uri}> <{meshv}annotation> "{_text(rng, shape.text_words)}" .\n'
+            f"<{uri}> <{meshv}preferredConcept> <{concept}> .\n"
+            f"<{concept}> {rdf_type} <{meshv}Concept> .\n"
+            f'<{concept}> <{meshv}identifier> "M{number:09d}" .\n'
+            f'<{concept}> {rdfs_label} "{label}" .\n'
+            f"<{concept}> <{meshv}preferredTerm> <{term}> .\n"
+            f'<{term}> <{meshv}identifier> "T{number:09d}" .\n'
+            f'<{term}> <{meshv}prefLabel> "{label}"@en .\n'
+            f'<{term}> <{meshv}lexicalTag> "NON" .\n'
+        )
+        for i in range(shape.n_synonyms):
+            write_file.write(f'<{term}> <{meshv}altLabel> "{label} synonym {i}"@en .\n')
+
+    qualifier = f"{mesh}Q000175"
+    with _open_text(nt_path) as write_file:
+        write_file.write(
+            f"<{qualifier}> {rdf_type} <{meshv}Qualifier> .\n"
+            f'<{qualifier}> <{meshv}identifier> "Q000175" .\n'
+            f'<{qualifier}> {rdfs_label} "diagnosis"@en .\n'
+        )
+        tree_numbers: list[str] = []
+        for node, parents in iter_parents(shape):
+            mesh_id = f"D{node:09d}"
+            uri = f"{mesh}{mesh_id}"
+            record(write_file, node, mesh_id, "TopicalDescriptor", f"Term {node}")
+            if not parents:
+                tree_number = f"C{node:02d}"
+            else:
+                position = (node - shape.n_roots) % shape.branching
+                tree_number = f"{tree_numbers[parents[0]]}.{position:03d}"
+            tree_numbers.append(tree_number)
+            write_file.write(
+                f"<{uri}> <{meshv}treeNumber> <{mesh}{tree_number}> .\n"
+                f'<{mesh}{tree_number}> {rdfs_label} "{tree_number}" .\n'
+            )
+            for parent in parents:
+                write_file.write(
+                    f"<{uri}> <{meshv}broaderDescriptor> <{mesh}D{parent:09d}> .\n"
+                )
+            if node % 10 == 0:
+                pair = f"{mesh}D{node:09d}Q000175"
+                write_file.write(
+                    f"<{pair}> {rdf_type} <{meshv}AllowedDescriptorQualifierPair> .\n"
+                    f'<{pair}> {rdfs_label} "Term {node}/diagnosis" .\n'
+                    f"<{pair}> <{meshv}hasDescriptor> <{uri}> .\n"
+                    f"<{pair}> <{meshv}hasQualifier> <{qualifier}> .\n"
+                )
+        for scr in range(n_scrs):
+            mesh_id = f"C{scr:09d}"
+            uri = f"{mesh}{mesh_id}"
+            number = shape.n_nodes + scr
+            record(write_file, number, mesh_id, "SCR_Chemical", f"Chemical {scr}")
+            for parent in sorted({rng.randrange(shape.n_nodes) for _ in range(2)}):
+                write_file.write(
+                    f"<{uri}> <{meshv}preferredMappedTo> <{mesh}D{parent:09d}> .\n"
+                )
+    return vocab_path, nt_path
+
+
+def _efo_id(node: int) -> str:
+    return f"EFO_{node:07d}"
+
+
+def write_efo_owl(
+    path: Path, shape: SyntheticShape, n_obsolete: int = 0, version: str = "v3.0.0"
+) -> Path:
+    """
+    Write EFO-shaped OWL (RDF/XML) for `EfoProcessor`,
+    compressed according to the suffix of path, such as `.owl.xz` for `EfoProcessor.owl_path`.
+    Roots are in the therapeutic_area subset.
+    Each class has a label, definition, n_synonyms exact synonyms,
+    and a MONDO and MeSH database cross-reference with an exactMatch mapping,
+    whose sources are annotated on owl:Axiom reifications of the xrefs.
+    n_obsolete deprecated classes are replaced by current classes,
+    and every obsolete class is also an alternative ID of its replacement.
+    """
+    efo = "http://www.ebi.ac.uk/efo/"
+    obo = "http://purl.obolibrary.org/obo/"
+    oio = "http://www.geneontology.org/formats/oboInOwl#"
+    rng = random.Random(shape.seed)
+    with fsspec.open(path, "wt", compression="infer") as write_file:
+        write_file.write(
+            '<?xml version="1.0"?>\n'
+            '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"\n'
+            '     xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"\n'
+            '     xmlns:owl="http://www.w3.org/2002/07/owl#"\n'
+            '     xmlns:obo="http://purl.obolibrary.org/obo/"\n'
+            '     xmlns:oboInOwl="http://www.geneontology.org/formats/oboInOwl#"\n'
+            '     xmlns:skos="http://www.w3.org/2004/02/skos/core#">\n'
+            '    <owl:Ontology rdf:about="http://www.ebi.ac.uk/efo/efo.owl">\n'
+            f'        <owl:versionIRI rdf:resource="http://www.ebi.ac.uk/efo/releases/{version}/efo.owl"/>\n'
+            "    </owl:Ontology>\n"
+        )
+        for node, parents in iter_parents(shape):
+            label = escape(f"disease {node} {_text(rng, 2)}")
+            lines = [f'    <owl:Class rdf:about="{efo}{_efo_id(node)}">']
+            lines.extend(
+                f'        <rdfs:subClassOf rdf:resource="{efo}{_efo_id(parent)}"/>'
+                for parent in parents
+            )
+            lines.append(f"        <rdfs:label>{label}</rdfs:label>")
+            lines.append(
+                f"        <obo:IAO_0000115>{_text(rng, shape.text_words)}</obo:IAO_0000115>"
+            )
+            lines.extend(
+                f"        <oboInOwl:hasExactSynonym>{label} {i}</oboInOwl:hasExactSynonym>"
+                for i in range(shape.n_synonyms)
+            )
+            lines.append(
+                f"        <oboInOwl:hasDbXref>MONDO:{node:07d}</oboInOwl:hasDbXref>\n"
+                f"        <oboInOwl:hasDbXref>MSH:D{node:09d}</oboInOwl:hasDbXref>\n"
+                f'        <skos:exactMatch rdf:resource="{obo}MONDO_{node:07d}"/>'
+            )
+            if not parents:
+                lines.append(
+                    "        <oboInOwl:inSubset>therapeutic_area</oboInOwl:inSubset>"
+                )
+            lines.append("    </owl:Class>")
+            # like EFO, the source of each xref is an annotation of the xref axiom
+            lines.extend(
+                "    <owl:Axiom>\n"
+                f'        <owl:annotatedSource rdf:resource="{efo}{_efo_id(node)}"/>\n'
+                f'        <owl:annotatedProperty rdf:resource="{oio}hasDbXref"/>\n'
+                f"        <owl:annotatedTarget>{xref}</owl:annotatedTarget>\n"
+                f"        <oboInOwl:source>{source}</oboInOwl:source>\n"
+                "    </owl:Axiom>"
+                for xref, source in [
+                    (f"MONDO:{node:07d}", "MONDO:equivalentTo"),
+                    (f"MSH:D{node:09d}", f"MONDO:{node:07d}"),
+                ]
+            )
+            lines.append("")
+            write_file.write("\n".join(lines))
+        for i in range(n_obsolete):
+            obsolete = _efo_id(shape.n_nodes + i)
+            replaced_by = rng.randrange(shape.n_nodes)
+            write_file.write(
+                f'    <owl:Class rdf:about="{efo}{obsolete}">\n'
+                f"        <rdfs:label>obsolete disease {i}</rdfs:label>\n"
+                '        <owl:deprecated rdf:datatype="http://www.w3.org/2001/XMLSchema#boolean">true</owl:deprecated>\n'
+                f'        <obo:IAO_0100001 rdf:resource="{efo}{_efo_id(replaced_by)}"/>\n'
+                "    </owl:Class>\n"
+                f'    <rdf:Description rdf:about="{efo}{_efo_id(replaced_by)}">\n'
+                f"        <oboInOwl:hasAlternativeId>{obsolete.replace('_', ':')}</oboInOwl:hasAlternativeId>\n"
+                "    </rdf:Description>\n"
+            )
+        write_file.write("</rdf:RDF>\n")
+    return path
+
+
+def write_pubchem_hierarchy(
+    path: Path, shape: SyntheticShape, hierarchy_id: int = 999
+) -> Path:
+    """
+    Write a PubChem classification API response for a hierarchy,
+    as read by `PubchemClassificationApi.create_nxo_from_path`.
+    """
+    rng = random.Random(shape.seed)
+    header = {
+        "SourceName": "Synthetic",
+        "SourceID": "Tree",
+        "HID": hierarchy_id,
+        "Information": {
+            "Name": "Synthetic Tree",
+            "Description": ["Synthetic hierarchy for scale testing"],
+        },
+    }
+    with path.open("w") as write_file:
+        # write the Node array as a stream rather than holding it in memory
+        head = json.dumps({"Hierarchies": {"Hierarchy": [{**header, "Node": []}]}})
+        prefix, suffix = head.split('"Node": []')
+        write_file.write(prefix + '"Node": [')
+        for node, parents in iter_parents(shape):
+            item: dict[str, Any] = {
+                "NodeID": f"node_{node + 1}",
+                "ParentID": [f"node_{p + 1}" for p in parents] or ["root"],
+                "Information": {
+                    "Name": f"Class {node}",
+                    "Description": [_text(rng, shape.text_words)],
+                    "HNID": 1_000_000 + node,
+                },
+            }
+            write_file.write(("," if node else "") + json.dumps(item))
+        write_file.write("]" + suffix)
+    return path
+
+
+def create_hgnc_tables(shape: SyntheticShape) -> dict[str, pd.DataFrame]:
+    """
+    Create HGNC gene group tables, as returned by `HgncGeneGroupNxoLoader.load_tables`.
+    Each gene group has n_synonyms aliases, one external resource, and 3 genes.
+    """
+    rng = random.Random(shape.seed)
+    family_ids = [node + 1 for node in range(shape.n_nodes)]
+    family = pd.DataFrame(
+        {
+            "id": family_ids,
+            "abbreviation": [f"GG{i}" for i in family_ids],
+            "name": [f"Gene group {i}" for i in family_ids],
+            "external_note": None,
+            "pubmed_ids": "1234,5678",
+            "desc_comment": None,
+            "desc_label": [_text(rng, 3) for _ in family_ids],
+            "desc_source": "Source|https://example.org",
+            "desc_go": None,
+            "typical_gene": None,
+        }
+    )
+    hierarchy = pd.DataFrame(
+        [(parent + 1, child + 1) for parent, child in iter_edges(shape)],
+        columns=["parent_fam_id", "child_fam_id"],
+    )
+    family_alias = pd.DataFrame(
+        [
+            (len(family_ids) * i + family_id, family_id, f"GG{family_id} alias {i}")
+            for family_id in family_ids
+            for i in range(shape.n_synonyms)
+        ],
+        columns=["id", "family_id", "alias"],
+    )
+    gene_has_family = pd.DataFrame(
+        [(3 * family_id + i, family_id) for family_id in family_ids for i in range(3)],
+        columns=["hgnc_id", "family_id"],
+    )
+    gene_symbols = pd.DataFrame(
+        {
+            "HGNC ID": [f"HGNC:{i}" for i in gene_has_family["hgnc_id"]],
+            "Approved symbol": [f"GENE{i}" for i in gene_has_family["hgnc_id"]],
+        }
+    )
+    return {
+        "family": family,
+        "family_alias": family_alias,
+        "hierarchy": hierarchy,
+        "gene_has_family": gene_has_family,
+        "gene_symbols": gene_symbols,
+        "external_resource": pd.DataFrame(
+            {"id": [1], "name": ["Example"], "url": ["https://example.org/"]}
+        ),
+        "family_has_external_resource": pd.DataFrame(
+            {"family_id": family_ids, "ext_id": 1}
+        ),
+    }
@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from nxontology_data.benchmarks import (
+    BenchmarkResult,
+    compare_to_baseline,
+    run_benchmark_command,
+    run_benchmarks,
+)
+
+
+def test_run_benchmarks() -> None:
+    results = run_benchmarks(
+        ["mesh_fixture:query:*", "synthetic:create_nxo"], scale=100
+    )
+    names = [result.name for result in results]
+    assert "mesh_fixture:query:identifiers" in names
+    assert names[-1] == "synthetic:create_nxo"
+    assert all(result.seconds > 0 for result in results)
+
+
+def test_compare_to_baseline() -> None:
+    results = [
+        BenchmarkResult("fast", 1.1),
+        BenchmarkResult("slow", 2.0),
+        BenchmarkResult("noise", 0.002),
+        BenchmarkResult("new", 1.0),
+    ]
+    baseline = {"fast": 1.0, "slow": 1.0, "noise": 0.001}
+    regressions = compare_to_baseline(results, baseline, tolerance=0.25)
+    assert [result.name for result in regressions] == ["slow"]
+    assert results[1].ratio == 2.0
+    assert results[3].ratio is None
+
+
+def test_run_benchmark_command(tmp_path: Path) -> None:
+    baseline = str(tmp_path.joinpath("baseline.json"))
+    pattern = "synthetic:create_nxo"
+    run_benchmark_command(pattern, scale=2000, baseline=baseline, save_baseline=True)
+    data = json.loads(Path(baseline).read_text())
+    assert data["scale"] == 2000
+    assert list(data["seconds"]) == [pattern]
+    data["seconds"][pattern] = 1e-6
+    Path(baseline).write_text(json.dumps(data))
+    with pytest.raises(RuntimeError, match=pattern):
+        run_benchmark_command(pattern, scale=2000, baseline=baseline)
+    # baselines at a different scale are not compared
+    run_benchmark_command(pattern, scale=100, baseline=baseline)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from nxontology_data.cache import OfflineCacheMiss, SourceCache
+from nxontology_data.conftest import LocalHttpServer
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> SourceCache:
+    return SourceCache(root=tmp_path.joinpath("cache"), offline=False)
+
+
+def test_fetch_revalidate(http_server: LocalHttpServer, cache: SourceCache) -> None:
+    http_server.add_file("/data.txt", b"hello world\n")
+    url = f"{http_server.url}/data.txt"
+    path = cache.fetch(url)
+    assert path.read_bytes() == b"hello world\n"
+    assert cache.fetch(url) == path
+    assert "If-None-Match" in http_server.request_headers[-1]
+    # content changed on the server, so the conditional request returns new content
+    http_server.add_file("/data.txt", b"goodbye world\n")
+    assert cache.fetch(url).read_bytes() == b"goodbye world\n"
+    # immutable urls are not revalidated
+    n_requests = len(http_server.requests)
+    cache.fetch(url, revalidate=False)
+    assert len(http_server.requests) == n_requests
+
+
+def test_fetch_offline(http_server: LocalHttpServer, cache: SourceCache) -> None:
+    http_server.add_route("/query", lambda query: (200, query["id"][0].encode()))
+    url = f"{http_server.url}/query"
+    assert cache.fetch(url, params={"id": "1"}).read_bytes() == b"1"
+    cache.offline = True
+    n_requests = len(http_server.requests)
+    assert cache.fetch(url, params={"id": "1"}).read_bytes() == b"1"
+    with pytest.raises(OfflineCacheMiss):
+        cache.fetch(url, params={"id": "2"})
+    assert len(http_server.requests) == n_requests
+
+
+def test_fetch_resume(http_server: LocalHttpServer, cache: SourceCache) -> None:
+    body = bytes(range(256)) * 64
+    http_server.add_file("/large.bin", body)
+    url = f"{http_server.url}/large.bin"
+    # simulate an interrupted download using the validator of the current content
+    cache.fetch(url).unlink()
+    entry = cache.get_entry(SourceCache.get_key(url))
+    assert entry is None
+    etag = json.loads(cache._ref_path(url).read_text())["etag"]
+    partial_path = cache._partial_path(url)
+    partial_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path.write_bytes(body[:1000])
+    partial_path.with_suffix(".json").write_text(json.dumps({"etag": etag}))
+    assert cache.fetch(url).read_bytes() == body
+    assert http_server.request_headers[-1]["Range"] == "bytes=1000-"
+    assert not partial_path.exists()
+
+
+def test_fetch_resume_truncated(
+    http_server: LocalHttpServer, cache: SourceCache
+) -> None:
+    body = bytes(range(256)) * 400
+    http_server.add_file("/large.bin", body)
+    http_server.truncate("/large.bin", at=40_000)
+    url = f"{http_server.url}/large.bin"
+    path = cache.fetch(url)
+    assert path.read_bytes() == body
+    assert path.name == hashlib.sha256(body).hexdigest()
+    # the connection dropped mid-body, so the download resumed with a range request
+    assert len(http_server.requests) == 2
+    assert http_server.request_headers[-1]["Range"] == "bytes=40000-"
+    assert not cache._partial_path(url).exists()
+
+
+def test_fetch_resume_changed(http_server: LocalHttpServer, cache: SourceCache) -> None:
+    http_server.add_file("/data.txt", b"new content")
+    url = f"{http_server.url}/data.txt"
+    partial_path = cache._partial_path(url)
+    partial_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path.write_bytes(b"old")
+    partial_path.with_suffix(".json").write_text(json.dumps({"etag": '"stale"'}))
+    assert cache.fetch(url).read_bytes() == b"new content"
+
+
+def test_evict(http_server: LocalHttpServer, tmp_path: Path) -> None:
+    cache = SourceCache(root=tmp_path.joinpath("cache"), max_size_gb=25e-9)
+    for name in "abc":
+        http_server.add_file(f"/{name}", name.encode() * 10)
+    cache.fetch(f"{http_server.url}/a")
+    time.sleep(0.01)
+    cache.fetch(f"{http_server.url}/b")
+    time.sleep(0.01)
+    cache.fetch(f"{http_server.url}/a", revalidate=False)
+    time.sleep(0.01)
+    cache.fetch(f"{http_server.url}/c")
+    # b was least recently accessed, so it is evicted to fit 25 bytes
+    assert {entry.url.rsplit("/", 1)[1] for entry in cache.entries()} == {"a", "c"}
+    assert cache.get_entry(f"{http_server.url}/b") is None
+
+
+def test_evict_checkpoints(http_server: LocalHttpServer, tmp_path: Path) -> None:
+    cache = SourceCache(root=tmp_path.joinpath("cache"), max_size_gb=25e-9)
+    checkpoint = cache.root.joinpath("checkpoints", "mesh", "2020", "parse.abc.pkl")
+    checkpoint.parent.mkdir(parents=True)
+    checkpoint.write_bytes(b"x" * 10)
+    os.utime(checkpoint, (0, 0))
+    for name in "ab":
+        http_server.add_file(f"/{name}", name.encode() * 10)
+        cache.fetch(f"{http_server.url}/{name}")
+    # the stale checkpoint is evicted before any downloaded object
+    assert not checkpoint.exists()
+    assert len(cache.entries()) == 2
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import networkx as nx
+from nxontology import NXOntology
+from nxontology.examples import create_metal_nxo
+
+from nxontology_data.closure import compute_closure, read_closure
+from nxontology_data.synthetic import SyntheticShape, iter_edges
+from nxontology_data.utils import write_ontology
+
+
+def test_compute_closure() -> None:
+    nxo = create_metal_nxo()
+    closure = compute_closure(nxo)
+    for node in nxo.graph:
+        ancestors = closure.get_ancestors(node)
+        assert set(ancestors) == nxo.node_info(node).ancestors
+        for ancestor, distance in ancestors.items():
+            assert distance == nx.shortest_path_length(nxo.graph, ancestor, node)
+            assert closure.is_ancestor(node, ancestor)
+    assert not closure.is_ancestor("precious", "gold")
+    assert closure.get_ancestors("gold") == {
+        "coinage": 1,
+        "gold": 0,
+        "metal": 2,
+        "precious": 1,
+    }
+
+
+def test_write_ontology_closure(tmp_path: Path) -> None:
+    nxo: NXOntology[str] = NXOntology()
+    nxo.graph.graph["name"] = "synthetic"
+    nxo.graph.add_edges_from(
+        (str(parent), str(child))
+        for parent, child in iter_edges(SyntheticShape(n_nodes=200))
+    )
+    write_ontology(nxo, tmp_path, closure=True)
+    path = tmp_path.joinpath("synthetic_closure.npz")
+    closure = read_closure(path)
+    assert closure.ids.tolist() == sorted(nxo.graph)
+    assert len(closure.ancestors) == sum(
+        nxo.node_info(node).n_ancestors for node in nxo.graph
+    )
+    # writing is deterministic
+    content = path.read_bytes()
+    write_ontology(nxo, tmp_path, closure=True)
+    assert path.read_bytes() == content
@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from nxontology_data.instrumentation import (
+    get_run_metrics,
+    instrumented,
+    measure,
+    record_run,
+    reset_run_metrics,
+)
+
+
+@instrumented(count=lambda words: {"words": len(words)})
+def split_words(text: str) -> list[str]:
+    return text.split()
+
+
+def test_measure_nested_steps() -> None:
+    reset_run_metrics()
+    with measure("outer") as step:
+        words = split_words("a b c")
+        step.counts["rows"] = len(words)
+    inner, outer = get_run_metrics()
+    assert inner.name == "split_words"
+    assert inner.parent == "outer"
+    assert inner.counts == {"words": 3}
+    assert outer.name == "outer"
+    assert outer.parent is None
+    assert outer.counts == {"rows": 3}
+    assert outer.wall_seconds >= inner.wall_seconds >= 0
+    assert outer.peak_rss_mb > 0
+    assert outer.error is None
+
+
+def test_record_run_failure(tmp_path: Path) -> None:
+    path = tmp_path.joinpath("run_metrics.json")
+    with pytest.raises(ValueError), record_run(path, source="test"):
+        split_words("a b")
+        with measure("fail"):
+            raise ValueError("expected")
+    report = json.loads(path.read_text())
+    assert report["source"] == "test"
+    steps = {step["name"]: step for step in report["steps"]}
+    assert list(steps) == ["split_words", "fail", "total"]
+    assert steps["fail"]["error"] == "ValueError"
+    assert steps["fail"]["parent"] == "total"
+    assert steps["total"]["error"] == "ValueError"
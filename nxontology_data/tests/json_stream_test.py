@@ -0,0 +1,53 @@
+import json
+from typing import Any
+
+import pytest
+
+from nxontology_data.json_stream import JsonStreamReader
+
+_document = {
+    "Hierarchies": {
+        "Hierarchy": [
+            {
+                "SourceName": "Test",
+                "Node": [
+                    {"NodeID": "node_1", "Name": "Ünïcödé", "Score": 12345.5},
+                    {"NodeID": "node_2", "Name": None, "Score": -7, "Tags": []},
+                ],
+                "HID": 123456,
+                "Information": {"Description": ["a", "b"]},
+            },
+            {"SourceName": "Other", "Node": [{"NodeID": "node_3"}]},
+        ]
+    },
+    "Trailing": True,
+}
+
+
+def _chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1_000_000])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_array_at(chunk_size: int, indent: int | None) -> None:
+    data = json.dumps(_document, indent=indent, ensure_ascii=False).encode()
+    reader = JsonStreamReader(_chunked(data, chunk_size))
+    siblings: dict[str, Any] = {}
+    nodes = list(
+        reader.iter_array_at(["Hierarchies", "Hierarchy", 0, "Node"], siblings)
+    )
+    hierarchy = _document["Hierarchies"]["Hierarchy"][0]  # type: ignore [index]
+    assert nodes == hierarchy["Node"]
+    assert siblings == {k: v for k, v in hierarchy.items() if k != "Node"}
+
+
+def test_read_value_split_number() -> None:
+    reader = JsonStreamReader([b"[12", b"34", b"5]"])
+    assert list(reader.iter_array_at([])) == [12345]
+
+
+def test_truncated_stream() -> None:
+    reader = JsonStreamReader([b'{"Node": [{"NodeID": 1}, {"Node'])
+    with pytest.raises(ValueError):
+        list(reader.iter_array_at(["Node"]))
@@ -0,0 +1,68 @@
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from nxontology_data.label_index import (
+    LabelIndex,
+    LabelMatch,
+    normalize_label,
+    write_label_index,
+)
+
+
+def test_normalize_label() -> None:
+    assert normalize_label("  Crohn  Disease ") == "crohn disease"
+    assert normalize_label("Straße") == "strasse"
+    assert normalize_label("ﬁbrosis") == "fibrosis"
+
+
+@pytest.fixture
+def label_index_path(tmp_path: Path) -> Path:
+    label_df = pd.DataFrame(
+        [
+            ("Crohn Disease", "D003424", "NON"),
+            ("Crohn's Disease", "D003424", "NON"),
+            ("CROHN DISEASE", "D003424", "NON"),
+            ("Crohn Disease", "EFO:0000384", None),
+            ("Cancer", "D009369", "NON"),
+            ("Crohn", "D003424", "ABB"),
+            (None, "D000001", "NON"),
+            ("é", "D000002", "NON"),
+        ],
+        columns=["label", "id", "tag"],
+    )
+    return write_label_index(label_df, tmp_path.joinpath("label_index.bin"))
+
+
+def test_label_index(label_index_path: Path) -> None:
+    with LabelIndex(label_index_path) as index:
+        assert len(index) == 6
+        assert index.lookup("crohn  DISEASE") == [
+            LabelMatch("crohn disease", "D003424", "NON"),
+            LabelMatch("crohn disease", "EFO:0000384", ""),
+        ]
+        assert index.lookup("crohn") == [LabelMatch("crohn", "D003424", "ABB")]
+        assert index.lookup("missing") == []
+        assert index.lookup("É") == [LabelMatch("é", "D000002", "NON")]
+        assert [match.key for match in index.prefix("Crohn")] == [
+            "crohn",
+            "crohn disease",
+            "crohn disease",
+            "crohn's disease",
+        ]
+        assert len(index.prefix("c", limit=2)) == 2
+        assert index.prefix("z") == []
+        start = time.perf_counter()
+        for _ in range(1_000):
+            index.lookup("Crohn Disease")
+        # lookups take microseconds, with a generous bound for slow test machines
+        assert time.perf_counter() - start < 1.0
+
+
+def test_label_index_invalid(tmp_path: Path) -> None:
+    path = tmp_path.joinpath("invalid.bin")
+    path.write_bytes(b"not an index")
+    with pytest.raises(ValueError):
+        LabelIndex(path)
@@ -0,0 +1,108 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from networkx.readwrite.json_graph import node_link_data
+from nxontology import NXOntology
+
+from nxontology_data.node_data import (
+    NodeData,
+    NodeTable,
+    TableRow,
+    add_table_nodes,
+    derive_ontology,
+)
+
+
+@pytest.fixture
+def node_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": ["a", "b", "c"],
+            "class": ["x", "x", "y"],
+            "frequency": [1.5, np.nan, None],
+            "tree_numbers": [["C01", "C01.1"], [], None],
+        }
+    )
+
+
+def test_node_table(node_df: pd.DataFrame) -> None:
+    table = NodeTable.from_df(node_df)
+    assert table.columns["class"].codes.tolist() == [0, 0, 1]
+    assert not table.columns["class"].is_json
+    assert table.columns["tree_numbers"].is_json
+    records = json.loads(node_df.to_json(orient="records"))
+    for row, record in enumerate(records):
+        assert NodeData(TableRow(table, row)) == record
+
+
+def test_node_data(node_df: pd.DataFrame) -> None:
+    table = NodeTable.from_df(node_df)
+    data = NodeData(TableRow(table, 0))
+    assert isinstance(data, dict)
+    assert list(data) == ["id", "class", "frequency", "tree_numbers"]
+    assert data.get("missing", 0) == 0
+    data["class"] = "z"
+    data["added"] = True
+    del data["frequency"]
+    assert "frequency" not in data
+    with pytest.raises(KeyError):
+        data["frequency"]
+    assert dict(data) == {
+        "id": "a",
+        "class": "z",
+        "tree_numbers": ["C01", "C01.1"],
+        "added": True,
+    }
+    copy = data.copy()
+    copy.pop("added")
+    assert "added" in data and len(copy) == 3
+    unpickled = pickle.loads(pickle.dumps(data))
+    assert unpickled == data
+    assert "frequency" not in unpickled
+    # the shared table is not modified
+    assert NodeData(TableRow(table, 0))["class"] == "x"
+
+
+def test_add_table_nodes(node_df: pd.DataFrame) -> None:
+    nxo: NXOntology[str] = NXOntology()
+    add_table_nodes(nxo, NodeTable.from_df(node_df), id_column="id")
+    nxo.add_edge("a", "b")
+    assert nxo.node_info("b").data["class"] == "x"
+    expected: NXOntology[str] = NXOntology()
+    for record in json.loads(node_df.to_json(orient="records")):
+        expected.add_node(record["id"], **record)
+    expected.add_edge("a", "b")
+    assert json.dumps(node_link_data(nxo.graph)) == json.dumps(
+        node_link_data(expected.graph)
+    )
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_derive_ontology(node_df: pd.DataFrame, columnar: bool) -> None:
+    nxo: NXOntology[str] = NXOntology()
+    nxo.graph.graph["name"] = "parent"
+    if columnar:
+        add_table_nodes(nxo, NodeTable.from_df(node_df), id_column="id")
+    else:
+        for record in json.loads(node_df.to_json(orient="records")):
+            nxo.add_node(record["id"], **record)
+    nxo.add_node("d", label="d")
+    nxo.graph.add_edges_from([("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+    nxo.freeze()
+    nodes = ["a", "b", "d"]
+    derived = derive_ontology(nxo, nodes)
+    expected: NXOntology[str] = NXOntology(nxo.graph.subgraph(nodes).copy())
+    assert json.dumps(node_link_data(derived.graph)) == json.dumps(
+        node_link_data(expected.graph)
+    )
+    assert not derived.frozen
+    # changes to the derived ontology do not modify the parent
+    derived.graph.nodes["a"]["class"] = "z"
+    derived.graph.nodes["d"]["label"] = "changed"
+    derived.graph.graph["name"] = "derived"
+    assert nxo.graph.nodes["a"]["class"] == "x"
+    assert nxo.graph.nodes["d"]["label"] == "d"
+    assert nxo.name == "parent"
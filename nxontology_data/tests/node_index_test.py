@@ -0,0 +1,80 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from networkx.readwrite.json_graph import node_link_data
+from nxontology import NXOntology
+from nxontology.examples import create_metal_nxo
+
+from nxontology_data.node_index import (
+    NodeReader,
+    get_node_index_path,
+    read_node_index,
+    write_block_gzip,
+)
+from nxontology_data.utils import write_ontology
+
+
+@pytest.fixture
+def metal_nxo() -> NXOntology[str]:
+    nxo = create_metal_nxo()
+    for node in nxo.graph:
+        nxo.graph.nodes[node]["label"] = f"{node.title()} ⚛"
+        nxo.graph.nodes[node]["synonyms"] = [node] * 20
+    return nxo
+
+
+def test_write_ontology_node_index(tmp_path: Path, metal_nxo: NXOntology[str]) -> None:
+    path = write_ontology(metal_nxo, tmp_path, node_index=True)
+    assert path.name == "Metals.json.gz"
+    assert get_node_index_path(path).exists()
+    # the blocks decompress to the JSON written without a node index
+    plain_dir = tmp_path.joinpath("plain")
+    plain_dir.mkdir()
+    plain_path = write_ontology(metal_nxo, plain_dir, compression_threshold_mb=0)
+    assert gzip.decompress(path.read_bytes()) == gzip.decompress(
+        plain_path.read_bytes()
+    )
+
+
+@pytest.mark.parametrize("block_size", [100, 1_000, 65_536])
+def test_node_reader(
+    tmp_path: Path, metal_nxo: NXOntology[str], block_size: int
+) -> None:
+    data = node_link_data(metal_nxo.graph)
+    json_bytes = json.dumps(data, indent=2, ensure_ascii=False).encode()
+    path = tmp_path.joinpath("metal.json.gz")
+    index_path = write_block_gzip(json_bytes, data["nodes"], path, block_size)
+    assert gzip.decompress(path.read_bytes()) == json_bytes
+    node_index = read_node_index(index_path.as_posix())
+    assert node_index.ids.tolist() == sorted(metal_nxo.graph)
+    if block_size == 100:
+        # nodes larger than the block size are a block each, after the graph attributes
+        assert len(node_index.block_offsets) - 1 == metal_nxo.n_nodes + 1
+    with NodeReader(path.as_posix()) as reader:
+        for node in reversed(data["nodes"]):
+            assert reader.get_node_data(node["id"]) == node
+        assert "gold" in reader and "tin" not in reader
+        with pytest.raises(KeyError):
+            reader.get_node_data("tin")
+
+
+def test_node_reader_relative_path(
+    tmp_path: Path, metal_nxo: NXOntology[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    write_ontology(metal_nxo, tmp_path, node_index=True)
+    monkeypatch.chdir(tmp_path)
+    # the node index is found next to a path without a directory
+    with NodeReader("Metals.json.gz") as reader:
+        assert reader.get_node_data("gold")["id"] == "gold"
+
+
+def test_write_block_gzip_without_nodes(tmp_path: Path) -> None:
+    nxo: NXOntology[str] = NXOntology()
+    data = node_link_data(nxo.graph)
+    json_bytes = json.dumps(data, indent=2).encode()
+    path = tmp_path.joinpath("empty.json.gz")
+    index_path = write_block_gzip(json_bytes, data["nodes"], path)
+    assert json.loads(gzip.decompress(path.read_bytes())) == data
+    assert len(read_node_index(index_path.as_posix()).ids) == 0
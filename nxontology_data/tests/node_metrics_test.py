@@ -0,0 +1,27 @@
+import pytest
+from nxontology.examples import create_metal_nxo
+
+from nxontology_data.closure import compute_closure
+from nxontology_data.node_metrics import compute_node_metrics
+
+
+def test_compute_node_metrics() -> None:
+    nxo = create_metal_nxo()
+    nxo.graph.add_edge("copper", "native copper")
+    metrics = compute_node_metrics(compute_closure(nxo)).set_index("node_id")
+    assert len(metrics) == nxo.n_nodes
+    for node in nxo.graph:
+        info = nxo.node_info(node)
+        row = metrics.loc[node]
+        assert row.depth == info.depth
+        assert row.n_ancestors == info.n_ancestors
+        assert row.n_descendants == info.n_descendants
+        assert row.n_roots == len(info.roots)
+        assert row.n_leaves == len(info.leaves)
+        for metric in [
+            "intrinsic_ic",
+            "intrinsic_ic_scaled",
+            "intrinsic_ic_sanchez",
+            "intrinsic_ic_sanchez_scaled",
+        ]:
+            assert row[metric] == pytest.approx(getattr(info, metric))
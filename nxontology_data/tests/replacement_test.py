@@ -0,0 +1,33 @@
+import logging
+
+import pytest
+
+from nxontology_data.replacement import resolve_replacements
+
+
+def test_resolve_replacements() -> None:
+    resolution = resolve_replacements(
+        {"A": "B", "B": "C", "D": "C", "E": "A", "C": "F", "G": "A"}
+    )
+    assert resolution.resolved == dict.fromkeys("ABCDEG", "F")
+    assert resolution.cycles == []
+    assert resolution.get_replaced_terms({"F", "G"}) == {"F": list("ABCDE")}
+
+
+def test_resolve_replacements_cycles(caplog: pytest.LogCaptureFixture) -> None:
+    with caplog.at_level(logging.WARNING):
+        resolution = resolve_replacements(
+            {"X": "B", "B": "C", "C": "A", "A": "B", "Y": "Z", "S": "S"}
+        )
+    assert resolution.cycles == [["A", "B", "C"], ["S"]]
+    assert resolution.unresolved == {"A", "B", "C", "X", "S"}
+    assert resolution.resolved == {"Y": "Z"}
+    assert "Replacement cycle: A -> B -> C -> A" in caplog.text
+
+
+def test_resolve_replacements_long_chain() -> None:
+    n = 100_000
+    replacements = {f"T:{i}": f"T:{i + 1}" for i in reversed(range(n))}
+    resolution = resolve_replacements(replacements)
+    assert set(resolution.resolved.values()) == {f"T:{n}"}
+    assert len(resolution.get_replaced_terms({f"T:{n}"})[f"T:{n}"]) == n
@@ -0,0 +1,98 @@
+import os
+import signal
+import time
+from pathlib import Path
+
+import pytest
+
+from nxontology_data.scheduler import Task, format_report, run_tasks
+
+
+def write_interval(path: Path, seconds: float = 0.5) -> None:
+    """Record the start and end time of a task in path."""
+    start = time.time()
+    time.sleep(seconds)
+    path.write_text(f"{start} {time.time()}")
+
+
+def read_interval(path: Path) -> tuple[float, float]:
+    start, end = map(float, path.read_text().split())
+    return start, end
+
+
+def fail() -> None:
+    raise ValueError("task failed")
+
+
+def test_run_tasks_parallel(tmp_path: Path) -> None:
+    paths = [tmp_path.joinpath(f"{i}.txt") for i in range(3)]
+    tasks = [
+        Task("a", write_interval, {"path": paths[0]}),
+        Task("b", write_interval, {"path": paths[1]}),
+        Task("c", write_interval, {"path": paths[2]}, deps=("a", "b")),
+    ]
+    results = run_tasks(tasks, max_workers=2, memory_gb=2.0)
+    assert [result.status for result in results] == ["succeeded"] * 3
+    (a_start, a_end), (b_start, b_end), (c_start, _) = map(read_interval, paths)
+    # independent tasks overlap and dependent tasks wait
+    assert b_start < a_end and a_start < b_end
+    assert c_start >= max(a_end, b_end)
+    assert format_report(results).splitlines()[0].split() == [
+        "task",
+        "status",
+        "start",
+        "seconds",
+    ]
+
+
+def test_run_tasks_memory_limit(tmp_path: Path) -> None:
+    paths = [tmp_path.joinpath(f"{i}.txt") for i in range(2)]
+    tasks = [
+        Task(f"task_{i}", write_interval, {"path": path}, memory_gb=3.0)
+        for i, path in enumerate(paths)
+    ]
+    # tasks do not fit in memory together, so they run sequentially
+    run_tasks(tasks, max_workers=2, memory_gb=4.0)
+    (_, first_end), (second_start, _) = sorted(map(read_interval, paths))
+    assert second_start >= first_end
+
+
+def test_run_tasks_failure(tmp_path: Path) -> None:
+    tasks = [
+        Task("fail", fail),
+        Task("dependent", write_interval, {"path": tmp_path / "x"}, deps=("fail",)),
+        Task("independent", write_interval, {"path": tmp_path / "y", "seconds": 0}),
+    ]
+    results = run_tasks(tasks, max_workers=2, memory_gb=2.0)
+    assert {result.name: result.status for result in results} == {
+        "fail": "failed",
+        "dependent": "skipped",
+        "independent": "succeeded",
+    }
+    assert results[0].detail == "ValueError: task failed"
+
+
+def test_run_tasks_invalid() -> None:
+    with pytest.raises(ValueError, match="cycle"):
+        run_tasks([Task("a", fail, deps=("b",)), Task("b", fail, deps=("a",))])
+    with pytest.raises(ValueError, match="unknown task"):
+        run_tasks([Task("a", fail, deps=("b",))])
+
+
+def kill_self() -> None:
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_run_tasks_killed(tmp_path: Path) -> None:
+    tasks = [
+        Task("killed", kill_self),
+        Task("other", write_interval, {"path": tmp_path / "x", "seconds": 0.2}),
+        Task("later", write_interval, {"path": tmp_path / "y", "seconds": 0}),
+    ]
+    results = run_tasks(tasks, max_workers=2, memory_gb=2.0)
+    assert {result.name: result.status for result in results} == {
+        "killed": "failed",
+        "other": "succeeded",
+        "later": "succeeded",
+    }
+    assert results[0].detail == f"killed by signal {signal.SIGKILL.value}"
@@ -0,0 +1,120 @@
+import http.client
+import json
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+from nxontology.examples import create_metal_nxo
+
+from nxontology_data.label_index import write_label_index
+from nxontology_data.serve import LookupServer, OutputIndexes
+from nxontology_data.utils import write_ontology
+from nxontology_data.xref_index import build_xref_index, write_xref_index
+
+
+@pytest.fixture
+def output_dir(tmp_path: Path) -> Path:
+    metal_dir = tmp_path.joinpath("metal")
+    metal_dir.mkdir()
+    write_ontology(create_metal_nxo(), metal_dir, closure=True)
+    write_label_index(
+        pd.DataFrame(
+            [("Gold", "gold", "label"), ("Au", "gold", "exact")],
+            columns=["label", "id", "tag"],
+        ),
+        metal_dir.joinpath("metal_label_index.bin"),
+    )
+    mappings_dir = tmp_path.joinpath("mappings")
+    mappings_dir.mkdir()
+    xref_index = build_xref_index(
+        pd.DataFrame(
+            [("EFO:1", "MESH:D1", False)],
+            columns=["efo_id", "xref_bioregistry", "via_replaced_by"],
+        ),
+        pd.DataFrame([("EFO:1", ["EFO:0"])], columns=["id", "replaces"]),
+        mesh_ids=["D1"],
+    )
+    write_xref_index(xref_index, mappings_dir.joinpath("efo_xref_index.npz"))
+    return tmp_path
+
+
+@pytest.fixture
+def connection(output_dir: Path) -> Iterator[http.client.HTTPConnection]:
+    indexes = OutputIndexes.load(output_dir)
+    with LookupServer(indexes, ("127.0.0.1", 0)) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        yield connection
+        connection.close()
+        server.shutdown()
+    indexes.close()
+
+
+def post(
+    connection: http.client.HTTPConnection, endpoint: str, request: dict[str, Any]
+) -> tuple[int, Any]:
+    connection.request("POST", endpoint, body=json.dumps(request).encode())
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_lookups(connection: http.client.HTTPConnection) -> None:
+    # requests share one kept-alive connection
+    status, response = post(
+        connection, "/ancestors", {"ontology": "Metals", "ids": ["gold", "tin"]}
+    )
+    assert status == 200
+    assert response["results"] == {
+        "gold": {"coinage": 1, "gold": 0, "metal": 2, "precious": 1},
+        "tin": None,
+    }
+    _, response = post(
+        connection, "/descendants", {"ontology": "Metals", "ids": ["coinage"]}
+    )
+    assert response["results"] == {
+        "coinage": {"coinage": 0, "copper": 1, "gold": 1, "silver": 1}
+    }
+    _, response = post(
+        connection, "/xrefs", {"efo_name": "efo", "ids": ["EFO:0"], "prefix": "mesh"}
+    )
+    assert response["results"] == {"EFO:0": ["MESH:D1"]}
+    _, response = post(
+        connection, "/xrefs", {"efo_name": "efo", "ids": ["MESH:D1"], "reverse": True}
+    )
+    assert response["results"] == {"MESH:D1": ["EFO:1"]}
+    _, response = post(
+        connection, "/labels", {"index": "metal", "ids": ["go"], "prefix": True}
+    )
+    assert response["results"] == {
+        "go": [{"key": "gold", "id": "gold", "tag": "label"}]
+    }
+    _, response = post(connection, "/top_level", {"ids": ["gold"]})
+    assert response["results"] == {"gold": []}
+    connection.request("GET", "/")
+    assert json.loads(connection.getresponse().read()) == {
+        "ontologies": ["Metals"],
+        "label_indexes": ["metal"],
+        "xref_indexes": ["efo"],
+    }
+
+
+def test_invalid_requests(connection: http.client.HTTPConnection) -> None:
+    status, response = post(connection, "/ancestors", {"ontology": "x", "ids": []})
+    assert status == 400
+    assert "Unknown ontology 'x'" in response["error"]
+    status, _ = post(connection, "/ancestors", {"ontology": "Metals", "ids": "gold"})
+    assert status == 400
+    status, _ = post(connection, "/unknown", {})
+    assert status == 404
+    # bodies that are not UTF-8
+    connection.request("POST", "/ancestors", body=b"\xff\xfe{")
+    response = connection.getresponse()
+    assert response.status == 400
+    assert "error" in json.loads(response.read())
+    # the connection remains usable after errors
+    status, _ = post(connection, "/ancestors", {"ontology": "Metals", "ids": ["gold"]})
+    assert status == 200
@@ -0,0 +1,50 @@
+import itertools
+
+import pandas as pd
+import pytest
+from nxontology import NXOntology
+from nxontology.similarity import SimilarityIC
+
+from nxontology_data.closure import compute_closure
+from nxontology_data.similarity import SimilarityIndex, compute_similarities
+from nxontology_data.synthetic import SyntheticShape, iter_edges
+
+
+@pytest.fixture(scope="module")
+def nxo() -> NXOntology[str]:
+    nxo: NXOntology[str] = NXOntology()
+    nxo.graph.add_edges_from(
+        (f"N{parent:03d}", f"N{child:03d}")
+        for parent, child in iter_edges(
+            SyntheticShape(n_nodes=160, branching=2, n_roots=2, extra_parent_rate=0.3)
+        )
+    )
+    nxo.freeze()
+    return nxo
+
+
+@pytest.mark.parametrize("ic_metric", ["intrinsic_ic", "intrinsic_ic_sanchez"])
+def test_compute_similarities(nxo: NXOntology[str], ic_metric: str) -> None:
+    index = SimilarityIndex.from_closure(compute_closure(nxo), ic_metric=ic_metric)
+    pairs = list(itertools.combinations_with_replacement(sorted(nxo.graph), 2))
+    nodes_0, nodes_1 = zip(*pairs, strict=True)
+    sim_df = compute_similarities(index, nodes_0, nodes_1, chunk_size=500)
+    expected = pd.DataFrame(
+        SimilarityIC(nxo, node_0, node_1, ic_metric=ic_metric).results()
+        for node_0, node_1 in pairs
+    )
+    pd.testing.assert_frame_equal(
+        sim_df, expected[sim_df.columns], check_dtype=False, check_exact=False
+    )
+
+
+def test_compute_similarities_processes(nxo: NXOntology[str]) -> None:
+    index = SimilarityIndex.from_closure(compute_closure(nxo))
+    nodes = sorted(nxo.graph)
+    sim_df = compute_similarities(index, nodes, nodes[::-1], chunk_size=10)
+    parallel_df = compute_similarities(
+        index, nodes, nodes[::-1], chunk_size=10, processes=2
+    )
+    pd.testing.assert_frame_equal(sim_df, parallel_df)
+    with pytest.raises(KeyError):
+        compute_similarities(index, ["missing"], ["N000"])
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+
+from nxontology_data.stages import Pipeline
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def source_text(self, path: Path) -> str:
+        self.calls.append("parse")
+        return path.read_text()
+
+    def count_words(self, text: str) -> int:
+        self.calls.append("count")
+        return len(text.split())
+
+    def write_count(self, count: int, path: Path) -> Path:
+        self.calls.append("write")
+        path.write_text(str(count))
+        return path
+
+
+def create_pipeline(
+    counter: Counter, source_path: Path, tmp_path: Path, resume: bool
+) -> Pipeline:
+    pipeline = Pipeline(tmp_path.joinpath("checkpoints"), resume=resume)
+    source = pipeline.source(
+        "fetch", content_key=source_path.read_text(), value=source_path
+    )
+    text = pipeline.stage("parse", counter.source_text, source, persist=False)
+    count = pipeline.stage("count", counter.count_words, text)
+    output_path = tmp_path.joinpath("count.txt")
+    pipeline.output(
+        "write", lambda count: counter.write_count(count, output_path), count
+    )
+    return pipeline
+
+
+@pytest.fixture
+def source_path(tmp_path: Path) -> Path:
+    path = tmp_path.joinpath("source.txt")
+    path.write_text("a b c")
+    return path
+
+
+def test_pipeline_resume(source_path: Path, tmp_path: Path) -> None:
+    counter = Counter()
+    create_pipeline(counter, source_path, tmp_path, resume=False).run()
+    assert counter.calls == ["parse", "count", "write"]
+    # all stages resume from checkpoints, so the source is not parsed
+    counter.calls.clear()
+    create_pipeline(counter, source_path, tmp_path, resume=True).run()
+    assert counter.calls == []
+    # missing outputs are rewritten from the checkpointed count
+    tmp_path.joinpath("count.txt").unlink()
+    create_pipeline(counter, source_path, tmp_path, resume=True).run()
+    assert counter.calls == ["write"]
+    assert tmp_path.joinpath("count.txt").read_text() == "3"
+    # outputs overwritten by another build are also rewritten
+    tmp_path.joinpath("count.txt").write_text("10")
+    counter.calls.clear()
+    create_pipeline(counter, source_path, tmp_path, resume=True).run()
+    assert counter.calls == ["write"]
+    assert tmp_path.joinpath("count.txt").read_text() == "3"
+    # without resume, all stages are rerun
+    counter.calls.clear()
+    create_pipeline(counter, source_path, tmp_path, resume=False).run()
+    assert counter.calls == ["parse", "count", "write"]
+
+
+def test_pipeline_source_changed(source_path: Path, tmp_path: Path) -> None:
+    counter = Counter()
+    create_pipeline(counter, source_path, tmp_path, resume=True).run()
+    source_path.write_text("a b c d")
+    counter.calls.clear()
+    create_pipeline(counter, source_path, tmp_path, resume=True).run()
+    assert counter.calls == ["parse", "count", "write"]
+    assert tmp_path.joinpath("count.txt").read_text() == "4"
+    # checkpoints from the previous source are removed
+    assert len(list(tmp_path.joinpath("checkpoints").glob("count.*.pkl"))) == 1
+
+
+def test_pipeline_code_changed(tmp_path: Path) -> None:
+    pipeline = Pipeline(tmp_path, resume=True)
+    key_1 = pipeline.stage("a", str.upper, code=["SELECT ?x"]).key
+    key_2 = pipeline.stage("b", str.upper, code=["SELECT ?x"]).key
+    key_3 = pipeline.stage("c", str.upper, code=["SELECT ?y"]).key
+    key_4 = pipeline.stage("d", str.upper, after=[pipeline.stages["c"]]).key
+    key_5 = pipeline.stage("e", str.upper, after=[pipeline.stages["d"]]).key
+    assert len({key_1, key_2, key_3, key_4, key_5}) == 5
+    with pytest.raises(ValueError, match="already exists"):
+        pipeline.stage("a", str.upper)
+
+
+def test_pipeline_after(tmp_path: Path) -> None:
+    loaded: list[str] = []
+    pipeline = Pipeline(tmp_path)
+    load = pipeline.stage("load", lambda: loaded.append("x"), persist=False)
+    count = pipeline.stage("count", lambda: len(loaded), after=[load])
+    pipeline.run()
+    assert count.result() == 1
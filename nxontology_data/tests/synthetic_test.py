@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import fsspec
+import pytest
+import rdflib
+
+from nxontology_data.hgnc.hgnc import HgncGeneGroupNxoLoader
+from nxontology_data.mesh.mesh import MeshLoader
+from nxontology_data.pubchem.classifications import PubchemClassificationApi
+from nxontology_data.synthetic import (
+    SyntheticShape,
+    create_hgnc_tables,
+    iter_edges,
+    write_efo_owl,
+    write_mesh_rdf,
+    write_pubchem_hierarchy,
+)
+
+shape = SyntheticShape(n_nodes=200, branching=3, n_roots=2, extra_parent_rate=0.2)
+n_edges = len(list(iter_edges(shape)))
+
+
+def test_iter_edges() -> None:
+    edges = list(iter_edges(shape))
+    assert all(parent < child for parent, child in edges)
+    children = {child for _, child in edges}
+    assert children == set(range(shape.n_roots, shape.n_nodes))
+    assert n_edges > shape.n_nodes - shape.n_roots
+    assert edges == list(iter_edges(shape))
+
+
+def test_write_mesh_rdf(tmp_path: Path) -> None:
+    rdf_paths = write_mesh_rdf(tmp_path.joinpath("rdf"), shape, n_scrs=20)
+    rdf = MeshLoader._read_mesh_rdf(tmp_path.joinpath("rdf").as_posix(), "mesh2020.nt")
+    nxo, id_df = MeshLoader.create_nxo(rdf, year_yyyy="2020")
+    assert nxo.n_nodes == 220
+    assert nxo.graph.number_of_edges() > n_edges
+    assert nxo.graph.nodes["D000000003"]["tree_numbers"] == ["C00.001"]
+    assert len(MeshLoader.get_synonym_df(rdf)) == 220 * (1 + shape.n_synonyms)
+    assert len(MeshLoader.get_descriptor_qualifier_pairs_df(rdf)) == 20
+    # the full pipeline runs on synthetic inputs
+    output_dir = tmp_path.joinpath("output")
+    output_dir.mkdir()
+    MeshLoader.create_pipeline("2020", rdf_paths, output_dir, nt_compression=None).run()
+    assert output_dir.joinpath("mesh_topical_descriptor_descendants.json").exists()
+
+
+def _run_efo_query(rdf: rdflib.Graph, name: str) -> int:
+    query_dir = Path(__file__).parent.parent.joinpath("efo", "queries")
+    query = query_dir.joinpath(f"{name}.rq").read_text()
+    return len(rdf.query(query))
+
+
+def test_write_efo_owl(tmp_path: Path) -> None:
+    path = write_efo_owl(tmp_path.joinpath("efo.owl.xz"), shape, n_obsolete=5)
+    rdf = rdflib.Graph()
+    # read like EfoProcessor.load_rdf
+    with fsspec.open(path, "rt", compression="infer") as read_file:
+        rdf.parse(source=read_file, format="xml")
+    # terms excludes obsolete classes
+    assert _run_efo_query(rdf, "terms") == 200
+    assert _run_efo_query(rdf, "therapeutic_areas") == 2
+    assert _run_efo_query(rdf, "subclasses") == n_edges
+    assert _run_efo_query(rdf, "synonyms") == 200 * shape.n_synonyms
+    assert _run_efo_query(rdf, "terms_obsolete") == 5
+    assert _run_efo_query(rdf, "alt_id") == 5
+    assert _run_efo_query(rdf, "xrefs") == 200 * 2
+    assert _run_efo_query(rdf, "xref_sources") == 200 * 2
+
+
+def test_write_efo_owl_processor(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # efo imports nxontology-ml, which is installed from git
+    pytest.importorskip("nxontology_ml")
+    from nxontology_data.efo.efo import EfoProcessor
+
+    path = write_efo_owl(tmp_path.joinpath("efo.owl.xz"), shape, n_obsolete=5)
+    monkeypatch.setattr(EfoProcessor, "owl_path", path)
+    processor = EfoProcessor(name="efo", version="v3.0.0")
+    assert processor.owl_version == "v3.0.0"
+    nodes = {node["efo_id"]: node for node in processor.get_nodes()}
+    assert len(nodes) == 200
+    assert nodes["EFO:0000001"]["xref_details"] == [
+        {
+            "xref_id": "MONDO:0000001",
+            "relation": "skos:exactMatch",
+            "sources": ["MONDO:equivalentTo"],
+        },
+        {
+            "xref_id": "mesh:D000000001",
+            "relation": None,
+            "sources": ["MONDO:0000001"],
+        },
+    ]
+    assert sum(len(node["replaces"] or []) for node in nodes.values()) == 5
+    nxo = processor.create_nxo()
+    assert nxo.n_nodes == 200
+    assert nxo.graph.number_of_edges() == n_edges
+
+
+def test_write_pubchem_hierarchy(tmp_path: Path) -> None:
+    path = write_pubchem_hierarchy(tmp_path.joinpath("hierarchy.json"), shape)
+    nxo = PubchemClassificationApi.create_nxo_from_path(path)
+    assert nxo.name == "999_synthetic_tree"
+    assert nxo.n_nodes == 200
+    assert nxo.graph.number_of_edges() == n_edges
+    assert len(nxo.roots) == 2
+
+
+def test_create_hgnc_tables() -> None:
+    nxo = HgncGeneGroupNxoLoader._create_nxo_from_tables(create_hgnc_tables(shape))
+    assert nxo.n_nodes == 200
+    assert nxo.graph.number_of_edges() == n_edges
+    root_counts = [nxo.graph.nodes[root]["genes_closure_count"] for root in nxo.roots]
+    assert sum(root_counts) >= 3 * 200
+    assert nxo.graph.nodes[1]["name_aliases"] == ["GG1 alias 0", "GG1 alias 1"]
@@ -1,7 +1,20 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 import pytest
 import rdflib
 
-from nxontology_data.utils import get_output_dir, sparql_results_to_df
+from nxontology_data.utils import (
+    df_to_records,
+    get_output_dir,
+    group_records,
+    group_values,
+    read_dataframe_partitions,
+    sparql_results_to_df,
+    write_dataframe,
+)
 
 
 def test_get_output_dir() -> None:
@@ -66,3 +79,79 @@ def test_sparql_results_to_df(rdflib_foaf_graph: rdflib.Graph) -> None:
     )
     # test value of missing, ensuring it's None
     assert first_row.missing is None
+
+
+@pytest.fixture
+def grouped_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "key": ["b", "a", "b", None, "a"],
+            "name": [rdflib.Literal("x"), "y", None, "z", "w"],
+            "count": [1, 2, 3, 4, np.nan],
+        }
+    )
+
+
+def test_df_to_records(grouped_df: pd.DataFrame) -> None:
+    records = df_to_records(grouped_df)
+    assert records == json.loads(grouped_df.to_json(orient="records"))
+    assert type(records[0]["name"]) is str
+    assert df_to_records(grouped_df, ["name"])[2] == {"name": None}
+
+
+def test_group_records(grouped_df: pd.DataFrame) -> None:
+    grouped = group_records(grouped_df, "key", ["name", "count"])
+    assert list(grouped) == ["a", "b"]
+    assert grouped == {
+        "a": [{"name": "y", "count": 2.0}, {"name": "w", "count": None}],
+        "b": [{"name": "x", "count": 1.0}, {"name": None, "count": 3.0}],
+    }
+    assert group_values(grouped_df, "key", "name") == {
+        "a": ["y", "w"],
+        "b": ["x", None],
+    }
+    assert group_values(grouped_df.iloc[:0], "key", "name") == {}
+
+
+def test_write_dataframe_partitions(tmp_path: Path) -> None:
+    df = pd.DataFrame(
+        {
+            "id": ["MONDO:2", "EFO:1", "MONDO:1", None, "EFO:3"],
+            "count": [1, 2, 3, 4, 5],
+        }
+    )
+    path = tmp_path.joinpath("xrefs.json.gz")
+    manifest_path = write_dataframe(
+        df, path, partition_by="id", partition_key=lambda x: x.split(":")[0]
+    )
+    assert manifest_path == tmp_path.joinpath("xrefs", "manifest.json")
+    manifest = json.loads(manifest_path.read_text())
+    assert manifest["n_rows"] == 5
+    assert [
+        (partition["key"], partition["n_rows"], partition["ranges"]["id"])
+        for partition in manifest["partitions"]
+    ] == [
+        ("EFO", 2, ["EFO:1", "EFO:3"]),
+        ("MONDO", 2, ["MONDO:1", "MONDO:2"]),
+        (None, 1, None),
+    ]
+    manifest_url = manifest_path.as_posix()
+    # rows are in the order of partitions, which are sorted by key
+    assert df_to_records(read_dataframe_partitions(manifest_url)) == df_to_records(
+        df.iloc[[1, 4, 0, 2, 3]]
+    )
+    assert read_dataframe_partitions(manifest_url, keys=["MONDO"])[
+        "count"
+    ].tolist() == [1, 3]
+    assert read_dataframe_partitions(
+        manifest_url, column="id", values=["MONDO:1", "HP:1"]
+    ).to_dict("records") == [{"id": "MONDO:1", "count": 3}]
+    assert read_dataframe_partitions(manifest_url, keys=[]).columns.tolist() == [
+        "id",
+        "count",
+    ]
+    # rewriting with other keys removes stale partitions
+    write_dataframe(df.iloc[:1], path, partition_by="id")
+    assert [p.name for p in sorted(manifest_path.parent.glob("part-*"))] == [
+        "part-00000.json.gz"
+    ]
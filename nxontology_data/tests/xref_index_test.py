@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from nxontology_data.xref_index import (
+    XrefIndex,
+    build_xref_index,
+    read_xref_index,
+    write_xref_index,
+)
+
+
+@pytest.fixture
+def xref_index() -> XrefIndex:
+    xrefs_df = pd.DataFrame(
+        [
+            ("EFO:1", "MESH:D1", False),
+            ("EFO:1", "MESH:D1", True),
+            ("EFO:1", "DOID:1", False),
+            ("EFO:2", "MESH:D1", True),
+            ("EFO:2", "MESH:D9", False),
+            ("EFO:2", "EFO:2", False),
+            ("EFO:3", None, False),
+        ],
+        columns=["efo_id", "xref_bioregistry", "via_replaced_by"],
+    )
+    nodes_df = pd.DataFrame(
+        [("EFO:1", ["EFO:0"]), ("EFO:2", None), ("EFO:3", ["EFO:4", "EFO:5"])],
+        columns=["id", "replaces"],
+    )
+    return build_xref_index(xrefs_df, nodes_df, mesh_ids=["D1", "D2"])
+
+
+def test_get_xrefs(xref_index: XrefIndex) -> None:
+    assert xref_index.get_xrefs(["EFO:1", "EFO:0", "EFO:3", "EFO:9"]) == {
+        "EFO:1": ["DOID:1", "MESH:D1"],
+        "EFO:0": ["DOID:1", "MESH:D1"],
+        "EFO:3": [],
+        "EFO:9": [],
+    }
+    assert xref_index.get_xrefs(["EFO:0", "EFO:2"], prefix="mesh") == {
+        "EFO:0": ["MESH:D1"],
+        "EFO:2": ["MESH:D1", "MESH:D9"],
+    }
+    assert xref_index.get_xrefs(["EFO:1"], prefix="HP") == {"EFO:1": []}
+    assert xref_index.resolve_efo_id("EFO:5") == "EFO:3"
+    assert xref_index.resolve_efo_id("EFO:9") is None
+
+
+def test_get_efo_ids(xref_index: XrefIndex) -> None:
+    assert xref_index.get_efo_ids(["MESH:D1", "DOID:1", "EFO:2"]) == {
+        "MESH:D1": ["EFO:1", "EFO:2"],
+        "DOID:1": ["EFO:1"],
+        "EFO:2": [],
+    }
+
+
+def test_get_mesh_df(xref_index: XrefIndex) -> None:
+    assert xref_index.get_mesh_df().values.tolist() == [
+        ["EFO:1", "D1", True, False],
+        ["EFO:2", "D1", True, True],
+        ["EFO:2", "D9", False, False],
+    ]
+
+
+def test_write_xref_index(tmp_path: Path, xref_index: XrefIndex) -> None:
+    path = write_xref_index(xref_index, tmp_path.joinpath("xref_index.npz"))
+    content = path.read_bytes()
+    assert write_xref_index(xref_index, path).read_bytes() == content
+    index = read_xref_index(path)
+    assert index.get_xrefs(["EFO:0"]) == xref_index.get_xrefs(["EFO:0"])
+    assert index.get_efo_ids(["MESH:D1"]) == xref_index.get_efo_ids(["MESH:D1"])
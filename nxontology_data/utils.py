@@ -1,19 +1,38 @@
+import bisect
 import gzip
+import hashlib
 import json
 import logging
 import sys
+from collections.abc import Callable, Collection, Sequence
 from pathlib import Path
 from typing import Any
 
 import bioregistry.resolve
+import fsspec
+import numpy as np
 import pandas as pd
+import requests
 from bioregistry.resource_manager import _safe_curie_to_str
 from networkx.readwrite.json_graph import node_link_data
 from nxontology import NXOntology
 from rdflib.plugins.sparql.processor import SPARQLResult
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from nxontology_data.closure import compute_closure, get_closure_path, write_closure
+from nxontology_data.instrumentation import measure
+from nxontology_data.node_index import write_block_gzip
+from nxontology_data.node_metrics import compute_node_metrics
 
 logger = logging.getLogger(__name__)
 
+REQUEST_TIMEOUT: tuple[float, float] = (15.0, 300.0)
+"""Default (connect, read) timeout in seconds for HTTP requests."""
+
+RETRY_STATUSES: tuple[int, ...] = (429, 500, 502, 503, 504)
+"""HTTP status codes that are retried by default."""
+
 
 def get_output_dir() -> Path:
     """Local output directory in this repository."""
@@ -26,34 +45,301 @@ def get_source_output_dir(source: str) -> Path:
     return output_dir
 
 
+def get_requests_session(
+    pool_maxsize: int = 10,
+    retries: int = 5,
+    backoff_factor: float = 1.0,
+    retry_statuses: Sequence[int] = RETRY_STATUSES,
+) -> requests.Session:
+    """
+    Create a requests session with a connection pool sized for `pool_maxsize`
+    concurrent requests. Failed connections and retry_statuses
+    (default: 429 and 5xx) are retried with exponential backoff,
+    honoring any Retry-After header sent by the server.
+    Set retry_statuses to an empty sequence to handle status retries in the caller,
+    for example to apply a rate limit to retried requests.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=list(retry_statuses),
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def count_ontology(nxo: NXOntology[Any]) -> dict[str, int]:
+    """Counts of an ontology's size, for instrumented steps that build ontologies."""
+    return {"nodes": nxo.graph.number_of_nodes(), "edges": nxo.graph.number_of_edges()}
+
+
 def write_ontology(
-    nxo: NXOntology[Any], output_dir: Path, compression_threshold_mb: float = 10.0
+    nxo: NXOntology[Any],
+    output_dir: Path,
+    compression_threshold_mb: float = 10.0,
+    closure: bool = False,
+    node_metrics: bool = False,
+    node_index: bool = False,
+) -> Path:
+    """
+    Write nxo to output_dir as node-link JSON, which is gzipped above compression_threshold_mb.
+    Enable node_index to always gzip the JSON as independently compressed blocks
+    and write the location of every node to `{name}_node_index.npz`,
+    such that single nodes are read without decompressing the whole file
+    (see `nxontology_data.node_index`).
+    Enable closure to also write the ancestors of every node to `{name}_closure.npz`
+    (see `nxontology_data.closure`)
+    and node_metrics to write a table of node depths, counts, and information content
+    to `{name}_node_metrics.json.gz` (see `nxontology_data.node_metrics`).
+    """
+    with measure(f"write_ontology:{nxo.name}") as step:
+        step.counts.update(count_ontology(nxo))
+        data = node_link_data(nxo.graph)
+        json_bytes = json.dumps(data, indent=2, ensure_ascii=False).encode()
+        json_size_mb = sys.getsizeof(json_bytes) / 1_000_000
+        path = output_dir.joinpath(f"{nxo.name}.json")
+        if node_index:
+            path = path.with_name(f"{path.name}.gz")
+            write_block_gzip(json_bytes, data["nodes"], path)
+        elif json_size_mb > compression_threshold_mb:
+            json_bytes = gzip.compress(json_bytes, mtime=0)
+            path = path.with_name(f"{path.name}.gz")
+            path.write_bytes(json_bytes)
+        else:
+            path.write_bytes(json_bytes)
+        if path.suffix == ".gz":
+            logger.info(
+                f"{path.name}: gzip reduced size from {json_size_mb:.1f} to {path.stat().st_size / 1_000_000:.1f} MB"
+            )
+        step.counts["bytes"] = path.stat().st_size
+        logger.info(f"Wrote ontology to {path}")
+        # ensure JSON is valid and check_is_dag
+        nxo.read_node_link_json(path.as_posix())
+    if closure or node_metrics:
+        nxo_closure = compute_closure(nxo)
+    if closure:
+        with measure(f"write_closure:{nxo.name}") as step:
+            closure_path = write_closure(nxo_closure, get_closure_path(path))
+            step.counts["bytes"] = closure_path.stat().st_size
+    if node_metrics:
+        write_dataframe(
+            compute_node_metrics(nxo_closure),
+            output_dir.joinpath(f"{nxo.name}_node_metrics.json.gz"),
+        )
+    return path
+
+
+def write_dataframe(
+    df: pd.DataFrame,
+    path: Path,
+    partition_by: str | None = None,
+    partition_key: Callable[[Any], str] | None = None,
+    range_columns: Sequence[str] = (),
 ) -> Path:
-    data = node_link_data(nxo.graph)
-    json_bytes = json.dumps(data, indent=2, ensure_ascii=False).encode()
-    json_size_mb = sys.getsizeof(json_bytes) / 1_000_000
-    path = output_dir.joinpath(f"{nxo.name}.json")
-    if json_size_mb > compression_threshold_mb:
-        json_bytes = gzip.compress(json_bytes, mtime=0)
-        path = path.with_name(f"{path.name}.gz")
-        logger.info(
-            f"{path.name}: gzip reduced size from {json_size_mb:.1f} to {sys.getsizeof(json_bytes) / 1_000_000:.1f} MB"
+    """
+    Write df to path as gzipped JSON records.
+    When partition_by is set, rows are instead written to one file per partition
+    in a directory named like path without suffixes, such as `mesh_identifiers/`,
+    along with a `manifest.json` listing the key, file, row count,
+    and the minimum and maximum values of partition_by and range_columns of each partition,
+    such that readers can fetch only the partitions they need (see `read_dataframe_partitions`).
+    Partitions are the values of partition_by, or partition_key of those values,
+    such as their CURIE prefix. Returns the path of the manifest.
+    """
+    if partition_by is not None:
+        return _write_partitions(
+            df, path, partition_by, partition_key, [partition_by, *range_columns]
         )
-    path.write_bytes(json_bytes)
-    logger.info(f"Wrote ontology to {path}")
-    # ensure JSON is valid and check_is_dag
-    nxo.read_node_link_json(path.as_posix())
+    with measure(f"write_dataframe:{path.name}") as step:
+        df.to_json(
+            path,
+            orient="records",
+            compression={"method": "gzip", "mtime": 0},
+            indent=2,
+            date_format="iso",
+        )
+        step.counts.update(rows=len(df), bytes=path.stat().st_size)
     return path
 
 
-def write_dataframe(df: pd.DataFrame, path: Path) -> None:
-    df.to_json(
-        path,
-        orient="records",
-        compression={"method": "gzip", "mtime": 0},
-        indent=2,
-        date_format="iso",
+def _value_range(series: pd.Series) -> list[str] | None:
+    """Minimum and maximum of the non-missing values of series as strings."""
+    values = series.dropna().astype(str)
+    if values.empty:
+        return None
+    return [values.min(), values.max()]
+
+
+def _write_partitions(
+    df: pd.DataFrame,
+    path: Path,
+    partition_by: str,
+    partition_key: Callable[[Any], str] | None,
+    range_columns: list[str],
+) -> Path:
+    directory = path.with_name(path.name.split(".", 1)[0])
+    directory.mkdir(exist_ok=True)
+    # remove partitions of previous writes, which may have had other keys
+    for stale_path in directory.glob("part-*.json.gz"):
+        stale_path.unlink()
+    keys = df[partition_by]
+    if partition_key is not None:
+        keys = keys.map(partition_key, na_action="ignore")
+    keys = keys.astype(object).where(keys.notna(), None)
+    partitions = []
+    groups = dict(iter(df.groupby(keys.fillna(""), sort=False)))
+    # missing keys are a partition of their own, sorted last
+    sorted_keys = sorted(groups, key=lambda key: (key == "", key))
+    for i, key in enumerate(sorted_keys):
+        group_df = groups[key]
+        partition_path = write_dataframe(
+            group_df, directory.joinpath(f"part-{i:05d}.json.gz")
+        )
+        partitions.append(
+            {
+                "key": key or None,
+                "path": partition_path.name,
+                "n_rows": len(group_df),
+                "sha256": hashlib.sha256(partition_path.read_bytes()).hexdigest(),
+                "ranges": {
+                    column: _value_range(group_df[column]) for column in range_columns
+                },
+            }
+        )
+    manifest = {
+        "partition_by": partition_by,
+        "columns": [str(column) for column in df.columns],
+        "n_rows": len(df),
+        "partitions": partitions,
+    }
+    manifest_path = directory.joinpath("manifest.json")
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+    logger.info(
+        f"Wrote {len(df):,} rows in {len(partitions):,} partitions to {directory}"
     )
+    return manifest_path
+
+
+def read_dataframe_partitions(
+    manifest: str,
+    keys: Collection[str | None] | None = None,
+    column: str | None = None,
+    values: Collection[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Read partitions written by `write_dataframe` with partition_by,
+    where manifest is the path or URL of their `manifest.json`.
+    Only partitions with a key in keys (default: all) are read.
+    When column and values are provided, partitions whose range of column
+    contains none of values are not read, and only rows with a value in values are returned.
+    """
+    with fsspec.open(manifest, "rt") as read_file:
+        manifest_data = json.load(read_file)
+    base = manifest.rsplit("/", 1)[0]
+    sorted_values = sorted(values) if values is not None else None
+    dfs = []
+    for partition in manifest_data["partitions"]:
+        if keys is not None and partition["key"] not in keys:
+            continue
+        if column is not None and sorted_values is not None:
+            value_range = partition["ranges"].get(column)
+            if value_range is None:
+                continue
+            # binary search for the first value not less than the minimum
+            i = bisect.bisect_left(sorted_values, value_range[0])
+            if i == len(sorted_values) or sorted_values[i] > value_range[1]:
+                continue
+        df = pd.read_json(
+            f"{base}/{partition['path']}", dtype=False, compression="gzip"
+        )
+        if column is not None and values is not None:
+            df = df[df[column].isin(values)]
+        dfs.append(df)
+    if not dfs:
+        return pd.DataFrame(columns=manifest_data["columns"])
+    return pd.concat(dfs, ignore_index=True)
+
+
+def column_values(series: pd.Series) -> list[Any]:
+    """
+    Values of series as JSON-compatible Python objects, like a `to_json` round-trip:
+    missing values such as NaN are None and str subclasses such as rdflib Literals are str.
+    """
+    values: list[Any] = series.astype(object).where(series.notna(), None).tolist()
+    if series.dtype == object:
+        values = [
+            str(value) if isinstance(value, str) and type(value) is not str else value
+            for value in values
+        ]
+    return values
+
+
+def df_to_records(
+    df: pd.DataFrame, columns: list[str] | None = None
+) -> list[dict[str, Any]]:
+    """
+    Convert df to a list of records with JSON-compatible values,
+    like `json.loads(df.to_json(orient="records"))` without serializing to JSON.
+    Values of each column are converted in a single pass.
+    """
+    columns = list(df.columns) if columns is None else columns
+    return [
+        dict(zip(columns, row, strict=True))
+        for row in zip(*(column_values(df[column]) for column in columns), strict=True)
+    ]
+
+
+def _group_slices(
+    df: pd.DataFrame, by: str
+) -> tuple[pd.DataFrame, list[Any], list[int]]:
+    """
+    Sort df by column by, dropping rows where it is missing,
+    and return the sorted df with the key and start index of each group.
+    The sort is stable, so rows keep their order within groups like `DataFrame.groupby`.
+    """
+    df = df[df[by].notna()].sort_values(by, kind="stable")
+    keys = df[by].to_numpy()
+    if not len(keys):
+        return df, [], [0]
+    starts = [0, *(np.flatnonzero(keys[1:] != keys[:-1]) + 1).tolist(), len(keys)]
+    return df, [keys[start] for start in starts[:-1]], starts
+
+
+def group_records(
+    df: pd.DataFrame, by: str, columns: list[str]
+) -> dict[Any, list[dict[str, Any]]]:
+    """
+    Group rows of df into records of columns by the value of column by, equivalent to
+    `{k: v[columns].to_dict(orient="records") for k, v in df.groupby(by)}`
+    with JSON-compatible values (see `df_to_records`),
+    but grouping by a sort rather than a Python loop over group DataFrames.
+    """
+    df, keys, starts = _group_slices(df, by)
+    records = df_to_records(df, columns)
+    return {
+        key: records[start:stop]
+        for key, start, stop in zip(keys, starts[:-1], starts[1:], strict=True)
+    }
+
+
+def group_values(df: pd.DataFrame, by: str, column: str) -> dict[Any, list[Any]]:
+    """
+    Group values of column by the value of column by,
+    like `group_records` for a single column.
+    """
+    df, keys, starts = _group_slices(df, by)
+    values = column_values(df[column])
+    return {
+        key: values[start:stop]
+        for key, start, stop in zip(keys, starts[:-1], starts[1:], strict=True)
+    }
 
 
 def sparql_results_to_df(results: SPARQLResult) -> pd.DataFrame:
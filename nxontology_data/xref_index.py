@@ -0,0 +1,334 @@
+"""
+Mapping index between EFO terms and their cross-references (xrefs),
+such as MeSH identifiers and other Bioregistry prefixes,
+prejoined from the EFO and MeSH outputs such that downstream jobs can translate identifiers
+without merging tables on strings.
+Identifiers are stored once in sorted arrays and mappings as integer positions into them,
+in CSR (compressed sparse row) layout in both directions.
+"""
+
+import functools
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from nxontology_data.cache import get_file_sha256
+from nxontology_data.closure import write_npz
+from nxontology_data.efo.diff import iter_node_link_array
+from nxontology_data.stages import Pipeline, get_checkpoint_dir
+from nxontology_data.utils import get_source_output_dir, write_dataframe
+
+logger = logging.getLogger(__name__)
+
+
+def _csr(
+    rows: npt.NDArray[np.int32], columns: npt.NDArray[np.int32], n_rows: int
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int32], npt.NDArray[np.int64]]:
+    """
+    Row pointers and columns of the pairs (rows, columns) sorted by row and then column,
+    with the order of the sorted pairs.
+    """
+    # lexsort sorts by the last key first
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, columns[order], order
+
+
+def _is_mesh_prefix(prefix: str) -> bool:
+    return prefix.casefold() == "mesh"
+
+
+@dataclass
+class XrefIndex:
+    """
+    Mappings between the current EFO terms in efo_ids and the xrefs in xref_ids,
+    which are CURIEs with the preferred prefixes of Bioregistry.
+    The xrefs of EFO term i are `xref_ids[efo_xrefs[efo_indptr[i]:efo_indptr[i + 1]]]`
+    and the EFO terms of xref j are `efo_ids[xref_efos[xref_indptr[j]:xref_indptr[j + 1]]]`.
+    Obsolete and alternative EFO identifiers in replaced_ids are resolved to
+    the current term at position replaced_by.
+    """
+
+    efo_ids: npt.NDArray[np.str_]
+    xref_ids: npt.NDArray[np.str_]
+    xref_prefixes: npt.NDArray[np.str_]
+    xref_prefix_codes: npt.NDArray[np.int32]
+    """Position of the prefix of each xref in xref_prefixes."""
+    xref_in_mesh: npt.NDArray[np.bool_]
+    """Whether each xref is a MeSH identifier of the MeSH build."""
+    efo_indptr: npt.NDArray[np.int64]
+    efo_xrefs: npt.NDArray[np.int32]
+    via_replaced_by: npt.NDArray[np.bool_]
+    """Whether each mapping in efo_xrefs was only ascertained from an obsolete term."""
+    xref_indptr: npt.NDArray[np.int64]
+    xref_efos: npt.NDArray[np.int32]
+    replaced_ids: npt.NDArray[np.str_]
+    replaced_by: npt.NDArray[np.int32]
+
+    @functools.cached_property
+    def _efo_positions(self) -> dict[str, int]:
+        """Position of each current, obsolete, or alternative EFO identifier in efo_ids."""
+        positions = dict(
+            zip(self.replaced_ids.tolist(), self.replaced_by.tolist(), strict=True)
+        )
+        positions.update((efo_id, i) for i, efo_id in enumerate(self.efo_ids.tolist()))
+        return positions
+
+    @functools.cached_property
+    def _xref_positions(self) -> dict[str, int]:
+        return {xref_id: i for i, xref_id in enumerate(self.xref_ids.tolist())}
+
+    def resolve_efo_id(self, efo_id: str) -> str | None:
+        """Current EFO term of efo_id, which may be obsolete or an alternative ID."""
+        i = self._efo_positions.get(efo_id)
+        return None if i is None else str(self.efo_ids[i])
+
+    def get_xrefs(
+        self, efo_ids: Iterable[str], prefix: str | None = None
+    ) -> dict[str, list[str]]:
+        """
+        Map each of efo_ids to the sorted xrefs of its current term,
+        restricted to xrefs with prefix (case-insensitive) if provided.
+        Each identifier is resolved with a dictionary lookup, so translation time is
+        linear in the number of identifiers and mappings returned.
+        """
+        prefix_code = -1
+        if prefix is not None:
+            prefixes = [p.casefold() for p in self.xref_prefixes.tolist()]
+            if prefix.casefold() in prefixes:
+                prefix_code = prefixes.index(prefix.casefold())
+        xref_ids = self.xref_ids.tolist()
+        translations: dict[str, list[str]] = {}
+        for efo_id in efo_ids:
+            i = self._efo_positions.get(efo_id)
+            if i is None or (prefix is not None and prefix_code < 0):
+                translations[efo_id] = []
+                continue
+            xrefs = self.efo_xrefs[self.efo_indptr[i] : self.efo_indptr[i + 1]]
+            if prefix is not None:
+                xrefs = xrefs[self.xref_prefix_codes[xrefs] == prefix_code]
+            translations[efo_id] = [xref_ids[j] for j in xrefs.tolist()]
+        return translations
+
+    def get_efo_ids(self, xref_ids: Iterable[str]) -> dict[str, list[str]]:
+        """Map each of xref_ids to the sorted current EFO terms with that xref."""
+        efo_ids = self.efo_ids.tolist()
+        translations: dict[str, list[str]] = {}
+        for xref_id in xref_ids:
+            j = self._xref_positions.get(xref_id)
+            if j is None:
+                translations[xref_id] = []
+                continue
+            efos = self.xref_efos[self.xref_indptr[j] : self.xref_indptr[j + 1]]
+            translations[xref_id] = [efo_ids[i] for i in efos.tolist()]
+        return translations
+
+    def get_mesh_df(self) -> pd.DataFrame:
+        """
+        Table of the mappings between EFO terms and MeSH identifiers,
+        where in_mesh is whether the identifier is in the MeSH build.
+        """
+        efo_positions = np.repeat(
+            np.arange(len(self.efo_ids)), np.diff(self.efo_indptr)
+        )
+        mesh_prefix = [_is_mesh_prefix(p) for p in self.xref_prefixes.tolist()]
+        is_mesh = np.array(mesh_prefix, dtype=bool)[
+            self.xref_prefix_codes[self.efo_xrefs]
+        ]
+        xrefs = self.efo_xrefs[is_mesh]
+        return pd.DataFrame(
+            {
+                "efo_id": self.efo_ids[efo_positions[is_mesh]],
+                "mesh_id": [
+                    xref_id.split(":", 1)[1] for xref_id in self.xref_ids[xrefs]
+                ],
+                "in_mesh": self.xref_in_mesh[xrefs],
+                "via_replaced_by": self.via_replaced_by[is_mesh],
+            }
+        )
+
+
+def build_xref_index(
+    xrefs_df: pd.DataFrame, nodes_df: pd.DataFrame, mesh_ids: Iterable[str]
+) -> XrefIndex:
+    """
+    Build an index from the EFO xrefs table with efo_id, xref_bioregistry, and via_replaced_by columns,
+    the EFO nodes with id and replaces columns, and the identifiers of the MeSH build.
+    Xrefs that Bioregistry could not normalize and xrefs of EFO terms to themselves are excluded.
+    A mapping is via_replaced_by only when every xrefs row for it is.
+    """
+    pairs = (
+        xrefs_df[["efo_id", "xref_bioregistry", "via_replaced_by"]]
+        .dropna(subset=["efo_id", "xref_bioregistry"])
+        .query("efo_id != xref_bioregistry")
+        .fillna({"via_replaced_by": False})
+        .astype({"via_replaced_by": bool})
+        .groupby(["efo_id", "xref_bioregistry"], as_index=False)["via_replaced_by"]
+        .all()
+    )
+    efo_ids = np.array(
+        sorted(set(nodes_df["id"]) | set(pairs["efo_id"])), dtype=np.str_
+    )
+    xref_ids = np.array(sorted(set(pairs["xref_bioregistry"])), dtype=np.str_)
+    xref_prefix_list = [xref_id.split(":", 1)[0] for xref_id in xref_ids.tolist()]
+    xref_prefixes = np.array(sorted(set(xref_prefix_list)), dtype=np.str_)
+    mesh_id_set = set(mesh_ids)
+    efo_rows = np.searchsorted(efo_ids, pairs["efo_id"].to_numpy(np.str_)).astype(
+        np.int32
+    )
+    xref_columns = np.searchsorted(
+        xref_ids, pairs["xref_bioregistry"].to_numpy(np.str_)
+    ).astype(np.int32)
+    efo_indptr, efo_xrefs, efo_order = _csr(efo_rows, xref_columns, len(efo_ids))
+    xref_indptr, xref_efos, _ = _csr(xref_columns, efo_rows, len(xref_ids))
+    replaced = {
+        replaced_id: efo_id
+        for efo_id, replaces in zip(nodes_df["id"], nodes_df["replaces"], strict=True)
+        for replaced_id in replaces or []
+    }
+    replaced_ids = np.array(sorted(replaced), dtype=np.str_)
+    index = XrefIndex(
+        efo_ids=efo_ids,
+        xref_ids=xref_ids,
+        xref_prefixes=xref_prefixes,
+        xref_prefix_codes=np.searchsorted(xref_prefixes, xref_prefix_list).astype(
+            np.int32
+        ),
+        xref_in_mesh=np.array(
+            [
+                _is_mesh_prefix(prefix) and xref_id.split(":", 1)[1] in mesh_id_set
+                for prefix, xref_id in zip(
+                    xref_prefix_list, xref_ids.tolist(), strict=True
+                )
+            ],
+            dtype=bool,
+        ),
+        efo_indptr=efo_indptr,
+        efo_xrefs=efo_xrefs,
+        via_replaced_by=pairs["via_replaced_by"].to_numpy(bool)[efo_order],
+        xref_indptr=xref_indptr,
+        xref_efos=xref_efos,
+        replaced_ids=replaced_ids,
+        replaced_by=np.searchsorted(
+            efo_ids, [replaced[replaced_id] for replaced_id in replaced_ids.tolist()]
+        ).astype(np.int32),
+    )
+    logger.info(
+        f"Indexed {len(pairs):,} mappings between {len(efo_ids):,} EFO terms "
+        f"and {len(xref_ids):,} xrefs, of which {index.xref_in_mesh.sum():,} are in MeSH"
+    )
+    return index
+
+
+def write_xref_index(index: XrefIndex, path: Path) -> Path:
+    """Write index to an `.npz` file with `write_npz`."""
+    write_npz({field.name: getattr(index, field.name) for field in fields(index)}, path)
+    logger.info(f"Wrote xref index to {path}")
+    return path
+
+
+def read_xref_index(path: Path) -> XrefIndex:
+    with np.load(path, allow_pickle=False) as arrays:
+        return XrefIndex(
+            **{field.name: arrays[field.name] for field in fields(XrefIndex)}
+        )
+
+
+def get_xref_index_inputs(efo_name: str) -> dict[str, Path] | None:
+    """Paths of the EFO and MeSH outputs that the index is built from, or None if any are not built."""
+    efo_dir = get_source_output_dir("efo")
+    # ontologies are gzipped by write_ontology when they are large
+    nodes_path = efo_dir.joinpath(f"{efo_name}.json")
+    if not nodes_path.exists():
+        nodes_path = nodes_path.with_name(f"{efo_name}.json.gz")
+    paths = {
+        "efo_nodes": nodes_path,
+        "efo_xrefs": efo_dir.joinpath(f"{efo_name}_xrefs.json.gz"),
+        "mesh_identifiers": get_source_output_dir("mesh").joinpath(
+            "mesh_identifiers.json.gz"
+        ),
+    }
+    if not all(path.exists() for path in paths.values()):
+        return None
+    return paths
+
+
+def _read_nodes_df(path: Path) -> pd.DataFrame:
+    """Identifiers and replaced terms of the nodes of a node-link ontology."""
+    return pd.DataFrame(
+        [
+            {"id": node["id"], "replaces": node.get("replaces")}
+            for node in iter_node_link_array(path, "nodes")
+        ],
+        columns=["id", "replaces"],
+    )
+
+
+def export_xref_index(efo_name: str = "efo_otar_profile", resume: bool = False) -> None:
+    """
+    Export the mappings of an EFO build to `output/mappings` from the EFO and MeSH outputs,
+    which must be built first:
+    `{efo_name}_xref_index.npz` with the index read by `read_xref_index`
+    and `{efo_name}_mesh.json.gz` with the mappings to MeSH identifiers and their labels and classes.
+    resume: reuse checkpointed stages when the EFO and MeSH outputs are unchanged.
+    """
+    input_paths = get_xref_index_inputs(efo_name)
+    if input_paths is None:
+        raise FileNotFoundError(
+            f"Build mesh and {efo_name} before exporting their xref index."
+        )
+    output_dir = get_source_output_dir("mappings")
+    pipeline = Pipeline(get_checkpoint_dir("mappings", efo_name), resume=resume)
+    sources = {
+        name: pipeline.source(name, content_key=get_file_sha256(path), value=path)
+        for name, path in input_paths.items()
+    }
+    mesh_df = pipeline.stage(
+        "read_mesh_identifiers",
+        lambda path: pd.read_json(path, dtype=False)[
+            ["mesh_id", "mesh_label", "mesh_class"]
+        ],
+        sources["mesh_identifiers"],
+        persist=False,
+    )
+    index = pipeline.stage(
+        "build_xref_index",
+        lambda nodes_path, xrefs_path, mesh_df: build_xref_index(
+            # dtype=False keeps numeric accessions as strings
+            xrefs_df=pd.read_json(xrefs_path, dtype=False),
+            nodes_df=_read_nodes_df(nodes_path),
+            mesh_ids=mesh_df["mesh_id"],
+        ),
+        sources["efo_nodes"],
+        sources["efo_xrefs"],
+        mesh_df,
+        code=[build_xref_index, _csr, _is_mesh_prefix, _read_nodes_df],
+    )
+    write_params = {"output_dir": output_dir.as_posix()}
+    pipeline.output(
+        "write_xref_index",
+        lambda index: write_xref_index(
+            index, output_dir.joinpath(f"{efo_name}_xref_index.npz")
+        ),
+        index,
+        code=[write_xref_index, write_npz],
+        params=write_params,
+    )
+    pipeline.output(
+        "write_mesh_mappings",
+        lambda index, mesh_df: write_dataframe(
+            index.get_mesh_df().merge(mesh_df, how="left", on="mesh_id"),
+            output_dir.joinpath(f"{efo_name}_mesh.json.gz"),
+        ),
+        index,
+        mesh_df,
+        code=[XrefIndex.get_mesh_df, write_dataframe],
+        params=write_params,
+    )
+    pipeline.run()